@@ -0,0 +1,314 @@
+"""Optional local HTTP API for submitting and monitoring download jobs.
+
+    python api_server.py --port 8765 --workers 2 --queue-size 50
+
+    POST   /jobs              submit {"url": ..., "format": "mp4", "quality": "720p", ...}
+                              (429 with Retry-After when the queue is full)
+    GET    /jobs              list all jobs with their status
+    GET    /jobs/<id>         status of one job
+    DELETE /jobs/<id>         cancel a queued or running job
+    GET    /jobs/<id>/events  server-sent events (progress and job events) until the job ends
+    GET    /metrics           stage timings and download totals in the Prometheus text format
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from yt_dlp.utils import parse_bytes
+
+import job_store
+from download_engine import DownloadEngine
+
+# Events after which a job produces no further output
+TERMINAL_EVENTS = {'complete': job_store.FINISHED, 'error': job_store.FAILED,
+                   'cancelled': job_store.CANCELLED}
+
+# Options a client may set, mapped to DownloadEngine.options arguments
+JOB_OPTIONS = {'format': 'format_type', 'quality': 'quality', 'template': 'template',
+               'output_dir': 'output_dir', 'playlist': 'playlist', 'start': 'start',
+               'end': 'end', 'workers': 'workers', 'stream_audio': 'stream_audio'}
+
+REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 409: 'Conflict', 429: 'Too Many Requests'}
+
+
+class Job:
+    def __init__(self, job_id, options):
+        self.id = job_id
+        self.options = options
+        self.status = job_store.QUEUED
+        self.engine = None
+        self.events = []
+        self.progress = {}
+        self.subscribers = set()
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+
+    def summary(self):
+        return {
+            'id': self.id,
+            'url': self.options['url'],
+            'status': self.status,
+            'progress': {str(k): v for k, v in self.progress.items()},
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class DownloadService:
+    """Runs submitted jobs on a bounded worker pool and fans their events out to subscribers.
+
+    Engine callbacks arrive on download threads and are handed to the event
+    loop with ``call_soon_threadsafe``; all job state is only touched on the
+    loop thread.
+
+    Clients choose output directories and templates inside ``output_dir``
+    only; anything pointing outside it is refused.
+    """
+
+    def __init__(self, workers=2, queue_size=50, output_dir='.', ydl_params=None, bandwidth_limit=0,
+                 trace_path=None, scratch_dir=None):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.output_dir = output_dir
+        self.ydl_params = ydl_params
+        self.bandwidth_limit = bandwidth_limit
+        self.trace_path = trace_path
+        self.scratch_dir = scratch_dir
+        self.jobs = {}
+        self.queue = None
+        self.loop = None
+        self.shared = None
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+
+    async def start(self, host='127.0.0.1', port=8765):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(self.queue_size)
+        # Owns the caches, stores and bandwidth budget every job engine shares
+        self.shared = DownloadEngine(lambda *args: None, lambda *args: None,
+                                     bandwidth_limit=self.bandwidth_limit, trace_path=self.trace_path,
+                                     scratch_dir=self.scratch_dir)
+        for _ in range(self.workers):
+            self.loop.create_task(self._worker())
+        return await asyncio.start_server(self._handle, host, port)
+
+    def submit(self, options):
+        """Queue a job; returns None when the queue is full"""
+        if self.queue.full():
+            return None
+        job = Job(self.shared.job_store.add_job(options), options)
+        self.jobs[job.id] = job
+        self.queue.put_nowait(job)
+        return job
+
+    def cancel(self, job):
+        if job.status == job_store.QUEUED:
+            self.shared.job_store.set_job_status(job.id, job_store.CANCELLED)
+            self._publish(job, 'cancelled', time.time(), "Download cancelled")
+        elif job.engine:
+            job.engine.cancel()
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            if job.status != job_store.QUEUED:
+                continue
+            job.status = job_store.RUNNING
+            job.started = time.time()
+            job.engine = DownloadEngine(
+                lambda msg_type, msg, job=job: self._from_thread(job, msg_type, msg),
+                # Every job has its own events, so downloads are keyed by playlist index alone
+                lambda key, state, job=job: self._from_thread(job, 'progress', {'key': key[1], 'state': state}),
+                shared=self.shared, ydl_params=self.ydl_params)
+            try:
+                await self.loop.run_in_executor(self.executor, job.engine.download, job.id, job.options)
+            except Exception as e:
+                # The job ends here; the worker goes on with the next one
+                self.shared.job_store.set_job_status(job.id, job_store.FAILED)
+                self._publish(job, 'error', time.time(), f"Download failed: {e}")
+
+    def _from_thread(self, job, event, data):
+        self.loop.call_soon_threadsafe(self._publish, job, event, time.time(), data)
+
+    def _publish(self, job, event, emitted, data):
+        record = {'event': event, 'job': job.id, 'time': emitted, 'data': data}
+        if event == 'progress':
+            # Only the latest state per download is kept
+            if data['state'] is None:
+                job.progress.pop(data['key'], None)
+            else:
+                job.progress[data['key']] = data['state']
+        else:
+            job.events.append(record)
+            if event in TERMINAL_EVENTS:
+                job.status = TERMINAL_EVENTS[event]
+                job.finished = emitted
+        for subscriber in job.subscribers:
+            if subscriber.full():
+                if event == 'progress':
+                    continue  # slow client; it still receives the final events
+                subscriber.get_nowait()
+            subscriber.put_nowait(record)
+
+    async def _handle(self, reader, writer):
+        try:
+            method, path, _ = (await reader.readline()).decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length') or 0))
+            await self._route(method, path.split('?')[0].rstrip('/'), body, writer)
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body, writer):
+        parts = path.strip('/').split('/')
+        if parts == ['metrics'] and method == 'GET':
+            return await self._respond_text(writer, 200, self.shared.metrics.prometheus())
+        if parts[0] != 'jobs' or len(parts) > 3:
+            return await self._respond(writer, 404, {'error': 'not found'})
+        if len(parts) == 1:
+            if method == 'GET':
+                return await self._respond(writer, 200, [job.summary() for job in self.jobs.values()])
+            if method == 'POST':
+                return await self._submit(body, writer)
+            return await self._respond(writer, 405, {'error': 'method not allowed'})
+
+        job = self.jobs.get(int(parts[1])) if parts[1].isdigit() else None
+        if job is None:
+            return await self._respond(writer, 404, {'error': 'unknown job'})
+        if len(parts) == 3:
+            if parts[2] != 'events' or method != 'GET':
+                return await self._respond(writer, 404, {'error': 'not found'})
+            return await self._stream_events(job, writer)
+        if method == 'GET':
+            return await self._respond(writer, 200, job.summary())
+        if method == 'DELETE':
+            if job.status not in (job_store.QUEUED, job_store.RUNNING):
+                return await self._respond(writer, 409, {'error': f'job is {job.status}'})
+            self.cancel(job)
+            return await self._respond(writer, 202, job.summary())
+        return await self._respond(writer, 405, {'error': 'method not allowed'})
+
+    async def _submit(self, body, writer):
+        try:
+            request = json.loads(body or b'{}')
+            url = request['url']
+            if not isinstance(url, str) or not url:
+                raise ValueError
+        except (ValueError, KeyError, TypeError):
+            return await self._respond(writer, 400, {'error': 'expected a JSON object with a "url"'})
+        kwargs = {arg: request[key] for key, arg in JOB_OPTIONS.items() if key in request}
+        if kwargs.get('format_type') == 'mp3':
+            kwargs.setdefault('quality', '192kbps')
+        options = DownloadEngine.options(url, **kwargs)
+        try:
+            DownloadEngine.check_options(options)
+            options['output_dir'] = self._confine(options['output_dir'], options['template'])
+        except ValueError as e:
+            return await self._respond(writer, 400, {'error': str(e)})
+        job = self.submit(options)
+        if job is None:
+            return await self._respond(writer, 429, {'error': 'job queue is full'}, {'Retry-After': '1'})
+        return await self._respond(writer, 202, job.summary())
+
+    def _confine(self, output_dir, template):
+        """The output directory inside the service's root; ValueError if it or the template leads outside"""
+        root = os.path.realpath(self.output_dir)
+        path = os.path.realpath(os.path.join(root, output_dir))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError("output_dir must be inside the server's output directory")
+        if os.path.isabs(template) or os.path.splitdrive(template)[0] or \
+                '..' in os.path.normpath(template).replace('\\', '/').split('/'):
+            raise ValueError("template must be a relative path without '..'")
+        return path
+
+    async def _stream_events(self, job, writer):
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n'
+                     b'Cache-Control: no-cache\r\nConnection: close\r\n\r\n')
+        # Replay what already happened, then follow live events
+        backlog = list(job.events) + [
+            {'event': 'progress', 'job': job.id, 'time': time.time(), 'data': {'key': k, 'state': v}}
+            for k, v in job.progress.items()]
+        subscriber = asyncio.Queue(256)
+        if job.status in (job_store.QUEUED, job_store.RUNNING):
+            job.subscribers.add(subscriber)
+        try:
+            for record in backlog:
+                self._write_event(writer, record)
+            await writer.drain()
+            while subscriber in job.subscribers:
+                record = await subscriber.get()
+                self._write_event(writer, record)
+                await writer.drain()
+                if record['event'] in TERMINAL_EVENTS:
+                    break
+        finally:
+            job.subscribers.discard(subscriber)
+
+    @staticmethod
+    def _write_event(writer, record):
+        writer.write(f"event: {record['event']}\ndata: {json.dumps(record)}\n\n".encode())
+
+    @staticmethod
+    async def _respond(writer, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        head = [f'HTTP/1.1 {status} {REASONS[status]}', 'Content-Type: application/json',
+                f'Content-Length: {len(body)}', 'Connection: close']
+        head.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + body)
+        await writer.drain()
+
+    @staticmethod
+    async def _respond_text(writer, status, text):
+        body = text.encode()
+        writer.write((f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+                      'Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+                      f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n').encode() + body)
+        await writer.drain()
+
+
+async def serve(args):
+    service = DownloadService(workers=args.workers, queue_size=args.queue_size,
+                              output_dir=args.output, ydl_params={'verbose': False, 'noprogress': True},
+                              bandwidth_limit=args.limit_rate, trace_path=args.trace,
+                              scratch_dir=args.scratch_dir)
+    server = await service.start(args.host, args.port)
+    print(f"Listening on http://{args.host}:{args.port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP API for the download engine.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=2, help="jobs downloaded at the same time")
+    parser.add_argument('--queue-size', type=int, default=50, help="queued jobs before submissions get 429")
+    parser.add_argument('-o', '--output', default='.', help="default output directory")
+    parser.add_argument('--limit-rate', type=parse_bytes, default=0, metavar='RATE',
+                        help="bandwidth shared by all jobs in bytes/sec, e.g. 500K or 4M")
+    parser.add_argument('--trace', metavar='FILE',
+                        help="append a JSON line per job stage (extract, download, ...) with its timing")
+    parser.add_argument('--scratch-dir', metavar='DIR',
+                        help="download and post-process on this fast local directory (SSD, tmpfs), "
+                             "then move finished files to the output directory")
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import os
+import subprocess
+import tempfile
+import threading
+
+CHUNK_SIZE = 64 * 1024
+
+# Progressive formats ffmpeg can decode from a pipe; anything else is downloaded to disk first
+STREAMABLE_PROTOCOLS = ('http', 'https')
+
+
+class AudioStreamer:
+    """Encode audio to MP3 while it downloads instead of after.
+
+    The selected audio format is downloaded by yt-dlp's own downloader, with
+    its chunked requests, retries, rate limit and ``.part`` resume, and every
+    block it writes is fed on to an ffmpeg process encoding to MP3, so
+    encoding overlaps the transfer. Once both are done the MP3 replaces the
+    downloaded file. Every transcode is its own ffmpeg process; at most
+    ``encoders`` run at once (one per core by default). When none is free,
+    or ffmpeg cannot decode the stream from a pipe, the downloaded file is
+    kept and the regular FFmpegExtractAudio post-processor converts it,
+    without downloading it again.
+    """
+
+    def __init__(self, ffmpeg='ffmpeg', bitrate='192', encoders=None):
+        self.ffmpeg = ffmpeg
+        self.bitrate = bitrate
+        self.slots = threading.BoundedSemaphore(encoders or os.cpu_count() or 1)
+        self.streamed = 0
+        self.fallbacks = 0
+
+    def can_stream(self, info):
+        return (info.get('protocol') or 'https') in STREAMABLE_PROTOCOLS and bool(info.get('url')) \
+            and not info.get('requested_formats')
+
+    def download(self, ydl, filename, info, download):
+        """Download ``info`` into ``filename`` with ``download()`` and encode it on the way.
+
+        ``download`` is yt-dlp's regular download of the format, whose result
+        is returned. ``ydl.audio_feed`` is set to a progress hook for the
+        duration (see ``CountingYoutubeDL``).
+        """
+        if not self.slots.acquire(blocking=False):
+            self.fallbacks += 1
+            return download()
+        try:
+            result, encoded = self._transcode(ydl, filename, download)
+            if encoded:
+                self.streamed += 1
+            else:
+                self.fallbacks += 1
+            return result
+        finally:
+            self.slots.release()
+
+    def _transcode(self, ydl, filename, download):
+        encoded = filename + '.encoding'
+        with tempfile.TemporaryFile() as errors:
+            # ffmpeg's messages go to a file: a pipe read only at the end could fill up and stall the encode
+            process = subprocess.Popen(
+                [self.ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', '-i', 'pipe:0',
+                 '-vn', '-codec:a', 'libmp3lame', '-b:a', f'{self.bitrate}k', '-f', 'mp3', encoded],
+                stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=errors)
+            feed = _Feed(process.stdin)
+            ydl.audio_feed = feed.hook
+            try:
+                result = download()
+                # What the last progress update left behind, now in the finished file
+                if result[0] and os.path.exists(filename):
+                    feed.follow(filename)
+            except BaseException:
+                # The downloaded part stays for the next attempt to continue
+                self._stop(process, encoded)
+                raise
+            finally:
+                ydl.audio_feed = None
+            if not result[0] or feed.broken:
+                self._stop(process, encoded)
+                return result, False
+            feed.close()
+            if process.wait() != 0:
+                # The reason is at the end
+                errors.seek(max(0, errors.seek(0, os.SEEK_END) - 2000))
+                message = errors.read().decode(errors='replace').strip()
+                # Typically an MP4 whose index is at the end, which needs a seekable input
+                ydl.report_warning(f'Streaming MP3 encode failed, converting the downloaded file: {message}')
+                self._remove(encoded)
+                return result, False
+        os.replace(encoded, filename)
+        return result, True
+
+    def _stop(self, process, encoded):
+        process.kill()
+        process.wait()
+        self._remove(encoded)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class _Feed:
+    """Copies what the downloader wrote to its file on to ffmpeg's stdin.
+
+    Runs in the progress hook, on the thread that writes the file, which
+    is only opened for the moment of reading it so the downloader can
+    rename it when it finishes.
+    """
+
+    def __init__(self, stdin):
+        self.stdin = stdin
+        self.offset = 0
+        self.broken = False
+
+    def hook(self, d):
+        if d['status'] == 'downloading':
+            self.follow(d.get('tmpfilename') or d.get('filename'))
+
+    def follow(self, path):
+        if self.broken or not path:
+            return
+        try:
+            with open(path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() < self.offset:
+                    # The download started over: what ffmpeg was sent no longer matches
+                    self.broken = True
+                    return
+                f.seek(self.offset)
+                for data in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    self.stdin.write(data)
+                    self.offset += len(data)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # ffmpeg gave up on the input; the download goes on and is converted afterwards
+            self.broken = True
+
+    def close(self):
+        try:
+            self.stdin.close()
+        except OSError:
+            pass
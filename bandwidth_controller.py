@@ -0,0 +1,184 @@
+import random
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+# Protocols yt-dlp downloads in fragments, several at once; the others use one connection
+FRAGMENTED_PROTOCOLS = ('m3u8_native', 'http_dash_segments', 'http_dash_segments_generator', 'ism', 'f4m', 'mhtml')
+
+
+class _LinkState:
+    """What the controller knows about one YoutubeDL instance"""
+
+    def __init__(self, fragments):
+        self.fragments = fragments
+        self.samples = {}  # fragment count -> smoothed throughput of downloads at that count
+        self.active = False
+        self.fragmented = False
+        self.updated = 0.0
+        self.last_bytes = {}
+        self.peak = 0.0
+        self.slow_since = None
+        self.throttled = False
+        self.capped = False
+
+
+class BandwidthController:
+    """Tunes fragment concurrency and shares a bandwidth budget between downloads.
+
+    Every YoutubeDL passed to ``attach`` reports its progress here. While a
+    download runs, its speed is compared with the best speed it reached; a
+    sustained drop below ``throttle_ratio`` of it is treated as throttling.
+    When a fragmented (DASH/HLS) download ends, its throughput is recorded
+    for the fragment count it used and the next download of that instance
+    climbs one fragment higher while that keeps paying off, steps back when
+    it does not, probes lower when neither helps, and halves after throttling. yt-dlp reads the fragment count
+    when a format starts, so a new value applies from the next format or
+    playlist entry on.
+
+    ``max_connections`` caps the fragments in flight across all attached
+    downloads together: every fragmented download holds its fragment count
+    in slots of that budget, any other download one slot (see
+    ``connections``), and gets fewer, or waits, when the other downloads
+    already use it up.
+
+    ``budget`` (bytes/sec, 0 for none) is shared by every attached download:
+    the progress hook runs on the thread that receives the data, so it
+    throttles the download by sleeping there once the shared token bucket
+    is empty. This also covers fragments, whose own yt-dlp downloaders take
+    a copy of ``ratelimit`` when they start.
+    """
+
+    def __init__(self, budget=0, min_fragments=1, max_fragments=8, max_connections=16,
+                 throttle_ratio=0.3, throttle_window=5.0):
+        self.budget = budget
+        self.min_fragments = min_fragments
+        self.max_fragments = max_fragments
+        self.max_connections = max_connections
+        self.throttle_ratio = throttle_ratio
+        self.throttle_window = throttle_window
+        self.lock = threading.Lock()
+        self.slots_free = threading.Condition(self.lock)
+        self.in_flight = 0
+        self.links = weakref.WeakKeyDictionary()
+        self.tokens = 0.0
+        self.refilled = time.monotonic()
+        self.throttle_events = 0
+
+    def attach(self, ydl):
+        """Let the controller observe and tune ``ydl``; returns ``ydl``"""
+        fragments = ydl.params.get('concurrent_fragment_downloads') or 1
+        with self.lock:
+            self.links[ydl] = _LinkState(fragments)
+        ydl.params['concurrent_fragment_downloads'] = fragments
+        ydl.params['retry_sleep_functions'] = {'http': self.retry_sleep, 'fragment': self.retry_sleep}
+        ydl.add_progress_hook(lambda d: self.hook(ydl, d))
+        return ydl
+
+    @contextmanager
+    def connections(self, ydl, info):
+        """Hold slots of the connection budget while ``ydl`` downloads the format ``info``.
+
+        A fragmented download gets the fragment count the controller chose
+        for ``ydl``, or as many slots as are left, and waits while none is.
+        """
+        fragmented = bool(info.get('fragments')) or any(
+            protocol in FRAGMENTED_PROTOCOLS for protocol in (info.get('protocol') or '').split('+'))
+        wanted = max(1, ydl.params.get('concurrent_fragment_downloads') or 1) if fragmented else 1
+        with self.slots_free:
+            while self.in_flight >= self.max_connections:
+                self.slots_free.wait()
+            granted = min(wanted, self.max_connections - self.in_flight)
+            self.in_flight += granted
+            link = self.links.get(ydl)
+            if link is not None:
+                # A throughput sample at fewer fragments than chosen says nothing about the choice
+                link.capped = granted < wanted
+        ydl.params['concurrent_fragment_downloads'] = granted
+        try:
+            yield granted
+        finally:
+            with self.slots_free:
+                self.in_flight -= granted
+                self.slots_free.notify_all()
+                ydl.params['concurrent_fragment_downloads'] = link.fragments if link is not None else wanted
+
+    @staticmethod
+    def retry_sleep(n):
+        """Exponential backoff with jitter so retries from parallel downloads spread out"""
+        return min(60, 2 ** n) * random.uniform(0.5, 1.0)
+
+    def hook(self, ydl, d):
+        link = self.links.get(ydl)
+        if link is None:
+            return
+        now = time.monotonic()
+        key = d.get('tmpfilename') or d.get('filename')
+        if d['status'] == 'downloading':
+            with self.lock:
+                if not link.active:
+                    link.active = True
+                    link.peak = 0.0
+                    link.slow_since = None
+                    link.throttled = False
+                link.updated = now
+                link.fragmented = link.fragmented or d.get('fragment_count') is not None
+                downloaded = d.get('downloaded_bytes') or 0
+                received = max(0, downloaded - link.last_bytes.get(key, 0))
+                link.last_bytes[key] = downloaded
+                self._watch_speed(link, d.get('speed'), now)
+                delay = self._take_tokens(received, now)
+            if delay:
+                time.sleep(delay)
+        elif d['status'] in ('finished', 'error'):
+            with self.lock:
+                link.last_bytes.pop(key, None)
+                if link.active and link.fragmented and not link.capped and d['status'] == 'finished':
+                    elapsed = d.get('elapsed')
+                    size = d.get('total_bytes') or d.get('downloaded_bytes')
+                    if elapsed and size:
+                        self._adapt(link, size / elapsed)
+                link.active = False
+                link.fragmented = False
+                ydl.params['concurrent_fragment_downloads'] = link.fragments
+
+    def _watch_speed(self, link, speed, now):
+        if not speed:
+            return
+        link.peak = max(link.peak, speed)
+        # A download slowed down by our own budget is not being throttled
+        if speed >= link.peak * self.throttle_ratio or (self.budget and self.tokens < 0):
+            link.slow_since = None
+        elif link.slow_since is None:
+            link.slow_since = now
+        elif not link.throttled and now - link.slow_since >= self.throttle_window:
+            link.throttled = True
+            self.throttle_events += 1
+
+    def _take_tokens(self, received, now):
+        """Return how long the caller must sleep to stay within the budget"""
+        if not self.budget or not received:
+            return 0
+        # Allow at most a quarter of a second of burst
+        self.tokens = min(self.budget / 4, self.tokens + (now - self.refilled) * self.budget)
+        self.refilled = now
+        self.tokens -= received
+        return -self.tokens / self.budget if self.tokens < 0 else 0
+
+    def _adapt(self, link, throughput):
+        level = link.fragments
+        previous = link.samples.get(level)
+        current = link.samples[level] = throughput if previous is None else (previous + throughput) / 2
+        below = link.samples.get(level - 1)
+        above = link.samples.get(level + 1)
+        if link.throttled:
+            link.fragments = max(self.min_fragments, level // 2)
+        elif below is not None and current < below * 1.05:
+            # The last step up did not pay off
+            link.fragments = max(self.min_fragments, level - 1)
+        elif (above is None or above > current * 1.05) and self.in_flight < self.max_connections:
+            link.fragments = min(self.max_fragments, level + 1)
+        elif below is None:
+            # Going up did not help either; see whether fewer connections do better
+            link.fragments = max(self.min_fragments, level - 1)
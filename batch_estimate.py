@@ -0,0 +1,119 @@
+import shutil
+import threading
+import time
+
+# Typical download bitrates (kbps, audio included) used when an entry has no sizes yet
+QUALITY_BITRATES = {
+    'best': 2700, '1080p': 2700, '720p': 1500, '480p': 800,
+    '320kbps': 320, '192kbps': 192, '128kbps': 128, '64kbps': 64,
+}
+
+
+class BatchEstimate:
+    """Size, time and disk estimate for a playlist job, refined while it runs.
+
+    Only metadata that was already fetched is used. An entry's size comes
+    from its record (``playlist_entries.EntryRecord``) when the listing had
+    formats or a file size, otherwise from its duration at the bitrate the downloads so far
+    averaged per second of media (a typical bitrate for the quality until
+    the first entry finishes). Entries not enumerated yet count as the
+    average entry. The time estimate uses the throughput measured since the
+    job started, or ``throughput`` (bytes/sec) until a file has finished.
+
+    Only playlist indices from ``start`` to ``end`` are counted, every
+    ``step``-th of them for a sharded job; ``total`` is the number of
+    entries in that range when it is known up front.
+    """
+
+    def __init__(self, format_type, quality, output_dir, total=None, start=1, end=None,
+                 throughput=None, step=1):
+        self.format_type = format_type
+        self.quality = quality
+        self.output_dir = output_dir
+        self.total = total
+        self.start = start
+        self.end = end
+        self.step = step
+        self.assumed_throughput = throughput
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.entries = {}  # playlist index -> (estimated bytes or None, duration or None)
+        self.finished = {}  # playlist index -> downloaded bytes
+        self.skipped = set()
+        self.downloaded = 0
+
+    def add_entry(self, record):
+        """Record an enumerated entry"""
+        index = record.index
+        if index < self.start or (self.end and index > self.end) or (index - self.start) % self.step:
+            return
+        with self.lock:
+            self.entries[index] = (record.size, record.duration)
+
+    def add_downloaded(self, index, size):
+        """Count bytes of a finished file (a merge finishes two) towards the entry"""
+        with self.lock:
+            self.downloaded += size
+            self.finished[index] = self.finished.get(index, 0) + size
+
+    def skip(self, index):
+        with self.lock:
+            self.skipped.add(index)
+
+    def expected_bytes(self, index):
+        """Estimated size of an enumerated entry, None when nothing is known yet"""
+        with self.lock:
+            size, duration = self.entries.get(index, (None, None))
+            if not size and duration:
+                size = duration * self._bytes_per_second()
+            if not size:
+                known = [s for s, _ in self.entries.values() if s]
+                size = sum(known) / len(known) if known else None
+            return size
+
+    def _bytes_per_second(self):
+        """Bytes per second of media, measured on finished entries when possible"""
+        measured = [(size, self.entries[i][1]) for i, size in self.finished.items()
+                    if i in self.entries and self.entries[i][1]]
+        if measured:
+            return sum(s for s, _ in measured) / sum(d for _, d in measured)
+        return QUALITY_BITRATES.get(self.quality, 1500) * 1000 / 8
+
+    def snapshot(self):
+        with self.lock:
+            rate = self._bytes_per_second()
+            sizes = {}
+            for index, (size, duration) in self.entries.items():
+                if index in self.skipped:
+                    continue
+                if index in self.finished:
+                    size = self.finished[index]
+                elif not size and duration:
+                    size = duration * rate
+                sizes[index] = size
+            known = [s for s in sizes.values() if s]
+            average = sum(known) / len(known) if known else None
+            pending = [s or average for i, s in sizes.items() if i not in self.finished]
+            unlisted = max(0, (self.total or 0) - len(self.entries))
+            remaining = None
+            if average is not None and all(pending):
+                remaining = sum(pending) + unlisted * average
+            elapsed = time.monotonic() - self.started
+            throughput = (self.downloaded / elapsed if self.downloaded and elapsed
+                          else self.assumed_throughput)
+            try:
+                free = shutil.disk_usage(self.output_dir).free
+            except OSError:
+                free = None
+            return {
+                'entries': len(self.entries),
+                'total': self.total or len(self.entries),
+                'finished': len(self.finished),
+                'skipped': len(self.skipped),
+                'downloaded_bytes': self.downloaded,
+                'remaining_bytes': int(remaining) if remaining is not None else None,
+                'throughput': throughput,
+                'eta': remaining / throughput if remaining is not None and throughput else None,
+                'free_bytes': free,
+                'fits': None if remaining is None or free is None else remaining <= free,
+            }
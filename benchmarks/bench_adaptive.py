@@ -0,0 +1,93 @@
+"""Compare static fragment settings with the adaptive bandwidth controller.
+
+    python benchmarks/bench_adaptive.py --videos 12 --fragments 16
+
+Downloads the same DASH-style videos from the local media stand-in under
+three conditions: a link whose capacity exceeds what the static fragment
+count can use, a server that throttles clients opening too many
+connections, and two jobs sharing a global bandwidth budget.
+"""
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import yt_dlp
+
+from bandwidth_controller import BandwidthController
+from media_server import MediaServer, fragmented_video
+
+MB = 1024 * 1024
+STATIC_FRAGMENTS = 3
+
+
+def download_videos(ydl, server, prefix, args):
+    for i in range(args.videos):
+        ydl.process_ie_result(fragmented_video(server, f'{prefix}{i:03d}', args.fragments,
+                                               args.fragment_size), download=True)
+
+
+def run(server, args, controller=None, jobs=1):
+    """Return achieved MB/s and the final fragment count of each job"""
+    with tempfile.TemporaryDirectory() as output_dir:
+        ydls = []
+        for job in range(jobs):
+            ydl = yt_dlp.YoutubeDL({
+                'quiet': True,
+                'noprogress': True,
+                'paths': {'home': output_dir},
+                'concurrent_fragment_downloads': STATIC_FRAGMENTS,
+            })
+            ydls.append(controller.attach(ydl) if controller else ydl)
+        threads = [threading.Thread(target=download_videos, args=(ydl, server, f'job{job}-', args))
+                   for job, ydl in enumerate(ydls)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        for ydl in ydls:
+            ydl.close()
+    total = jobs * args.videos * args.fragments * args.fragment_size
+    return total / MB / elapsed, [ydl.params['concurrent_fragment_downloads'] for ydl in ydls]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--videos', type=int, default=12, help='videos per job')
+    parser.add_argument('--fragments', type=int, default=16, help='fragments per video')
+    parser.add_argument('--fragment-size', type=int, default=256 * 1024)
+    parser.add_argument('--rate-limit', type=float, default=1, help='MB/s per connection')
+    parser.add_argument('--link', type=float, default=8, help='MB/s of the whole link')
+    parser.add_argument('--budget', type=float, default=3, help='MB/s shared by two jobs')
+    args = parser.parse_args()
+
+    scenarios = [
+        (f"link {args.link:g} MB/s, {args.rate_limit:g} MB/s per connection", 1, 0,
+         {'rate_limit': int(args.rate_limit * MB), 'link_rate': int(args.link * MB)}),
+        (f"throttled above 2 connections, {args.rate_limit:g} MB/s per connection", 1, 0,
+         {'rate_limit': int(args.rate_limit * MB), 'throttle_above': 2, 'throttle_rate': MB // 2}),
+        (f"2 jobs, budget {args.budget:g} MB/s, link {args.link:g} MB/s", 2, args.budget,
+         {'rate_limit': int(args.rate_limit * MB), 'link_rate': int(args.link * MB)}),
+    ]
+    for title, jobs, budget, server_args in scenarios:
+        print(title)
+        server = MediaServer(**server_args).start()
+        try:
+            static, _ = run(server, args, jobs=jobs)
+            print(f"{'static':>10}: {static:6.2f} MB/s with {STATIC_FRAGMENTS} fragments")
+            controller = BandwidthController(budget=int(budget * MB))
+            adaptive, fragments = run(server, args, controller, jobs=jobs)
+            print(f"{'adaptive':>10}: {adaptive:6.2f} MB/s, ended at {fragments} fragments, "
+                  f"{controller.throttle_events} throttling events")
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
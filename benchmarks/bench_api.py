@@ -0,0 +1,103 @@
+"""Load test the HTTP API against the local media server.
+
+    python benchmarks/bench_api.py --jobs 40 --workers 4 --queue-size 8
+
+Submits jobs as fast as the API accepts them (retrying on 429), follows each
+job's event stream and reports jobs/sec and event delivery latency.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api_server import DownloadService, TERMINAL_EVENTS
+from media_server import MediaServer
+
+# Benchmark jobs must not wait on the engine's anti-throttling sleeps
+YDL_PARAMS = {'sleep_interval': 0, 'max_sleep_interval': 0, 'verbose': False,
+              'noprogress': True, 'quiet': True}
+
+
+async def http(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\n'
+                 f'Content-Length: {len(body)}\r\n\r\n'.encode() + body)
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+async def follow(port, job_id, latencies):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET /jobs/{job_id}/events HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+    final = None
+    async for line in reader:
+        if line.startswith(b'data: '):
+            record = json.loads(line[6:])
+            latencies.append(time.time() - record['time'])
+            if record['event'] in TERMINAL_EVENTS:
+                final = record['event']
+                break
+    writer.close()
+    return final
+
+
+async def run(args, media):
+    service = DownloadService(workers=args.workers, queue_size=args.queue_size,
+                              output_dir='out', ydl_params=YDL_PARAMS)
+    server = await service.start(port=0)
+    port = server.sockets[0].getsockname()[1]
+    latencies, followers, rejected = [], [], 0
+
+    started = time.perf_counter()
+    for i in range(args.jobs):
+        url = media.media_url(f'job{i:04d}', args.size)
+        while True:
+            status, payload = await http(port, 'POST', '/jobs', {'url': url})
+            if status != 429:
+                break
+            rejected += 1
+            await asyncio.sleep(0.05)
+        followers.append(asyncio.create_task(follow(port, payload['id'], latencies)))
+    results = await asyncio.gather(*followers)
+    elapsed = time.perf_counter() - started
+    server.close()
+
+    latencies.sort()
+    print(f"{args.jobs} jobs in {elapsed:.2f}s: {args.jobs / elapsed:.2f} jobs/s "
+          f"({results.count('complete')} complete, {rejected} submissions got 429)")
+    print(f"event latency over {len(latencies)} events: "
+          f"p50 {statistics.median(latencies) * 1e3:.2f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1e3:.2f} ms, "
+          f"max {latencies[-1] * 1e3:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=40)
+    parser.add_argument('--size', type=int, default=512 * 1024, help='bytes per video')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--queue-size', type=int, default=8)
+    args = parser.parse_args()
+
+    media = MediaServer(rate_limit=8 * 1024 * 1024).start()
+    with tempfile.TemporaryDirectory() as workdir:
+        # The engine keeps its stores in the working directory
+        os.chdir(workdir)
+        try:
+            asyncio.run(run(args, media))
+        finally:
+            media.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Compare the fixed format strings with the format planner on a batch of videos.
+
+    python benchmarks/bench_format_plan.py --videos 200 --muxed-share 0.5
+
+Builds YouTube-like format lists (DASH video-only and audio-only streams
+for every height, plus a muxed 360p MP4 and, for ``--muxed-share`` of the
+videos, a muxed 720p MP4), runs yt-dlp's format selection with both and
+totals what would be downloaded, requested and merged.
+"""
+import argparse
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import yt_dlp
+
+from format_planner import FormatPlan, FormatPlanner
+
+FORMAT_STRINGS = {
+    'best': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
+    '720p': 'bestvideo[height<=720][ext=mp4]+bestaudio[ext=m4a]/best[height<=720][ext=mp4]/best[ext=mp4]',
+    '480p': 'bestvideo[height<=480][ext=mp4]+bestaudio[ext=m4a]/best[height<=480][ext=mp4]/best[ext=mp4]',
+}
+
+# height -> video bitrate in kbps
+VIDEO_BITRATES = {144: 80, 240: 150, 360: 300, 480: 600, 720: 1300, 1080: 2500}
+
+
+def video_formats(duration, muxed_720):
+    formats = [{'format_id': '140', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a.40.2', 'abr': 129}]
+    for height, vbr in VIDEO_BITRATES.items():
+        formats.append({'format_id': f'v{height}', 'ext': 'mp4', 'vcodec': 'avc1', 'acodec': 'none',
+                        'height': height, 'width': height * 16 // 9, 'fps': 30, 'vbr': vbr, 'tbr': vbr})
+    formats.append({'format_id': '18', 'ext': 'mp4', 'vcodec': 'avc1', 'acodec': 'mp4a.40.2',
+                    'height': 360, 'width': 640, 'fps': 30, 'tbr': 400})
+    if muxed_720:
+        formats.append({'format_id': '22', 'ext': 'mp4', 'vcodec': 'avc1', 'acodec': 'mp4a.40.2',
+                        'height': 720, 'width': 1280, 'fps': 30, 'tbr': 1400})
+    for f in formats:
+        f.update(protocol='https', url=f"https://example.invalid/{f['format_id']}",
+                 filesize_approx=int(f['tbr' if 'tbr' in f else 'abr'] * 1000 / 8 * duration))
+    return formats
+
+
+def select(ydl, selector, formats):
+    chosen = ydl._select_formats(formats, selector)[0]
+    return FormatPlan(chosen.get('requested_formats') or [chosen])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--videos', type=int, default=200)
+    parser.add_argument('--muxed-share', type=float, default=0.5,
+                        help='share of videos that still have a muxed 720p format')
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    batch = [video_formats(rng.randint(120, 1200), rng.random() < args.muxed_share)
+             for _ in range(args.videos)]
+    with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
+        for quality, format_string in FORMAT_STRINGS.items():
+            fixed = ydl.build_format_selector(format_string)
+            planned = FormatPlanner('mp4', quality, format_string).selector(ydl)
+            for label, selector in (('fixed', fixed), ('planner', planned)):
+                plans = [select(ydl, selector, formats) for formats in batch]
+                print(f"{quality:>5} {label:>8}: {sum(p.bytes for p in plans) / 1024 ** 3:7.2f} GiB, "
+                      f"{sum(p.requests for p in plans):4d} requests, "
+                      f"{sum(p.merge for p in plans):4d} merges, "
+                      f"estimated {sum(p.cost for p in plans) / 60:6.1f} min")
+
+
+if __name__ == '__main__':
+    main()
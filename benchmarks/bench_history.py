@@ -0,0 +1,78 @@
+"""Time history queries on a large store, as the history view issues them.
+
+    python benchmarks/bench_history.py --entries 100000
+
+Fills a scratch history with synthetic downloads, then times counting and
+fetching a window of rows (at the top, the middle and the end) with no
+filter, an incremental text search and a date range.
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from history_store import HistoryStore
+
+WORDS = ('music', 'live', 'tutorial', 'python', 'concert', 'review', 'podcast', 'trailer',
+         'official', 'video', 'remix', 'interview', 'highlights', 'lecture', 'cooking')
+WINDOW = 40  # rows on screen
+
+
+def fill(store, entries):
+    rng = random.Random(1)
+    start = datetime(2020, 1, 1)
+    rows = []
+    for i in range(entries):
+        date = start + timedelta(minutes=i * 15)
+        title = ' '.join(rng.choice(WORDS) for _ in range(4)) + f' {i}'
+        format_type, quality = rng.choice((('mp4', 'best'), ('mp4', '720p'), ('mp3', '192kbps')))
+        rows.append((date.strftime('%Y-%m-%d %H:%M:%S'), title, format_type, quality))
+    with store.lock:
+        store.conn.executemany('INSERT INTO history (date, title, format, quality) VALUES (?, ?, ?, ?)', rows)
+        store.conn.commit()
+
+
+def timed(label, query, repeat=5):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = query()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    size = result if isinstance(result, int) else len(result)
+    print(f"{label:>44}: {best * 1000:7.2f} ms ({size} {'matches' if isinstance(result, int) else 'rows'})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        store = HistoryStore(str(Path(workdir) / 'history.sqlite'), str(Path(workdir) / 'none.json'))
+        started = time.perf_counter()
+        fill(store, args.entries)
+        print(f"Inserted {args.entries} entries in {time.perf_counter() - started:.2f}s (full-text index: {store.fts})")
+
+        for name, filters in (('all', {}),
+                              ('text "py"', {'text': 'py'}),
+                              ('text "python conc"', {'text': 'python conc'}),
+                              ('text "mp3 live"', {'text': 'mp3 live'}),
+                              ('2021-03-01..2021-06-30', {'date_from': '2021-03-01', 'date_to': '2021-06-30'}),
+                              ('text "remix" in 2021', {'text': 'remix', 'date_from': '2021-01-01',
+                                                        'date_to': '2021-12-31'})):
+            total = store.count(**filters)
+            timed(f"count {name}", lambda: store.count(**filters))
+            for where, offset in (('top', 0), ('middle', total // 2), ('end', max(0, total - WINDOW))):
+                timed(f"window at {where} of {name}",
+                      lambda: store.search(offset=offset, limit=WINDOW, **filters))
+        store.conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Latency of single videos queued while a playlist downloads, with and without priority lanes.
+
+    python benchmarks/bench_lanes.py --entries 24 --singles 5
+
+A playlist of ``--entries`` videos is queued first, then a single video
+every ``--interval`` seconds, all through a JobQueue against the local
+media server, whose link (``--link-rate``) all downloads share. Modes:
+``one lane`` queues everything behind the playlist, as when jobs ran one
+after the other; ``lanes`` runs single videos in their own lane next to
+the playlist; ``lanes + preemption`` also pauses the playlist's entries
+while they run. Reported per mode: how long the single videos waited in
+their lane and took from submission to completion, the playlist's time
+and pauses, and how many files came out complete.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_suite import StandInIE
+from media_server import MediaServer
+
+MB = 1024 * 1024
+
+
+def run(args, one_lane, preempt):
+    from download_engine import DownloadEngine
+    from job_queue import BULK, JobQueue
+
+    class StandInEngine(DownloadEngine):
+        def make_ydl(self, params):
+            ydl = super().make_ydl(params)
+            ydl.add_info_extractor(StandInIE())
+            return ydl
+
+    server = MediaServer(link_rate=args.link_rate).start()
+    errors = []
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            # The engine keeps its stores in the working directory
+            os.chdir(workdir)
+            engine = StandInEngine(lambda msg_type, msg: msg_type == 'error' and errors.append(msg),
+                                   lambda key, state: None, dedup=False,
+                                   ydl_params={
+                                       # Only the stub extractor, so the generic one never claims the pages
+                                       'allowed_extractors': ['standin'],
+                                       'quiet': True, 'noprogress': True, 'verbose': False,
+                                       'sleep_interval': 0, 'max_sleep_interval': 0,
+                                   })
+            jobs = JobQueue(engine, preempt=preempt)
+
+            def submit(options):
+                job_id = engine.job_store.add_job(options)
+                jobs.submit(job_id, options, BULK if one_lane else None)
+                return job_id
+
+            started = time.monotonic()
+            playlist_job = submit(DownloadEngine.options(
+                f'{server.base_url}/playlist/bulk?count={args.entries}&size={args.size}',
+                output_dir='out', playlist=True, workers=str(args.workers)))
+            for i in range(args.singles):
+                time.sleep(args.interval)
+                submit(DownloadEngine.options(f'{server.base_url}/watch/single{i}?size={args.single_size}',
+                                              output_dir='out'))
+            while len(jobs.finished) < 1 + args.singles:
+                time.sleep(0.05)
+            bulk_seconds = time.monotonic() - started
+            sizes = [p.stat().st_size for p in Path('out').rglob('*') if p.is_file()]
+            complete = sum(size in (args.size, args.single_size) for size in sizes)
+    finally:
+        os.chdir(cwd)
+        server.stop()
+    singles = [job for job in jobs.finished if job['job_id'] != playlist_job]
+    return {
+        'wait_mean': sum(job['wait'] for job in singles) / len(singles),
+        'wait_max': max(job['wait'] for job in singles),
+        'latency_mean': sum(job['seconds'] for job in singles) / len(singles),
+        'latency_max': max(job['seconds'] for job in singles),
+        'total_seconds': bulk_seconds,
+        'pauses': jobs.pauses,
+        'complete': complete,
+        'files': len(sizes),
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=24, help="playlist videos")
+    parser.add_argument('--size', type=int, default=4 * MB, help="bytes per playlist video")
+    parser.add_argument('--workers', type=int, default=3, help="playlist videos downloaded at the same time")
+    parser.add_argument('--singles', type=int, default=5, help="single videos queued during the playlist")
+    parser.add_argument('--single-size', type=int, default=MB)
+    parser.add_argument('--interval', type=float, default=1.5, help="seconds between single videos")
+    parser.add_argument('--link-rate', type=int, default=8 * MB, help="bytes/sec shared by all downloads")
+    args = parser.parse_args()
+
+    # yt-dlp's own output would drown the results
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    results = {name: run(args, one_lane, preempt) for name, one_lane, preempt in (
+        ('one lane', True, False), ('lanes', False, False), ('lanes + preemption', False, True))}
+    sys.stdout = stdout
+    print(f"{args.entries} x {args.size / MB:.1f} MB playlist, {args.singles} x {args.single_size / MB:.1f} MB "
+          f"single videos, {args.link_rate / MB:.1f} MB/s link")
+    for name, result in results.items():
+        print(f"{name:>18}: singles waited {result['wait_mean']:5.2f}s (max {result['wait_max']:5.2f}s), "
+              f"done after {result['latency_mean']:5.2f}s (max {result['latency_max']:5.2f}s); "
+              f"all done in {result['total_seconds']:5.1f}s, {result['pauses']} pauses, "
+              f"{result['complete']}/{args.entries + args.singles} files complete, {result['errors']} errors")
+
+
+if __name__ == '__main__':
+    main()
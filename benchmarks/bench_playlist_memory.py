@@ -0,0 +1,147 @@
+"""Peak RSS of a job on a huge playlist whose listing carries full entry metadata.
+
+    python benchmarks/bench_playlist_memory.py --entries 10000
+
+A stub extractor returns a synthetic playlist whose entries are complete
+info dicts (``--formats`` formats with headers, thumbnails, a description),
+as some sites list them, either all at once (``list``) or while the
+listing is paged through (``lazy``). The job runs through the real
+DownloadEngine with downloads skipped, so what is measured is the metadata
+the engine keeps while it works through the entries. Each mode runs in a
+fresh subprocess; reported are the peak RSS above the process's RSS right
+before the job, and the wall time.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+MB = 1024 * 1024
+
+
+def full_entry(i, formats):
+    video_id = f'mem{i:06d}'
+    return {
+        'id': video_id,
+        'title': f'Synthetic video {i}',
+        'duration': 180 + i % 600,
+        'webpage_url': f'memtest:video:{video_id}',
+        'extractor_key': 'MemoryTest',
+        'description': f'Description of video {i}. ' * 20,
+        'thumbnails': [{'url': f'http://127.0.0.1:1/thumb/{video_id}/{n}.jpg', 'width': 120 * n,
+                        'height': 90 * n, 'id': str(n)} for n in range(1, 9)],
+        'formats': [{
+            'format_id': str(100 + n),
+            'url': f'http://127.0.0.1:1/media/{video_id}-{n}.mp4?expire=1700000000&signature={"0" * 64}',
+            'ext': 'mp4' if n % 3 else 'm4a',
+            'vcodec': 'avc1.64001F' if n % 3 else 'none',
+            'acodec': 'none' if n % 3 else 'mp4a.40.2',
+            'height': 144 * (1 + n % 6) if n % 3 else None,
+            'tbr': 100.0 * (1 + n),
+            'filesize': 1000000 * (1 + n),
+            'protocol': 'https',
+            'http_headers': {'User-Agent': 'Mozilla/5.0', 'Accept': '*/*', 'Accept-Language': 'en-us,en;q=0.5'},
+        } for n in range(formats)],
+    }
+
+
+def run_child(mode, entries, formats):
+    from yt_dlp.extractor.common import InfoExtractor
+
+    from download_engine import DownloadEngine
+
+    class MemoryTestIE(InfoExtractor):
+        IE_NAME = 'memtest'
+        _VALID_URL = r'memtest:(?P<kind>list|lazy|video)(?::mem(?P<id>\d+))?'
+
+        def _real_extract(self, url):
+            kind, video_id = self._match_valid_url(url).group('kind', 'id')
+            if kind == 'video':
+                return full_entry(int(video_id), formats)
+            listing = (full_entry(i, formats) for i in range(1, entries + 1))
+            return self.playlist_result(list(listing) if kind == 'list' else listing,
+                                        'memtest', 'Memory test playlist')
+
+    class MemoryTestEngine(DownloadEngine):
+        def make_ydl(self, params):
+            ydl = super().make_ydl(params)
+            ydl.add_info_extractor(MemoryTestIE())
+            return ydl
+
+    engine = MemoryTestEngine(lambda msg_type, msg: None, lambda key, state: None,
+                              ydl_params={
+                                  'allowed_extractors': ['memtest'],
+                                  'skip_download': True,
+                                  'quiet': True, 'noprogress': True, 'verbose': False,
+                                  'sleep_interval': 0, 'max_sleep_interval': 0,
+                              })
+    with tempfile.TemporaryDirectory() as output_dir:
+        options = DownloadEngine.options(f'memtest:{mode}', output_dir=output_dir, playlist=True, workers='4')
+        job_id = engine.job_store.add_job(options)
+        before = rss_mb()
+        started = time.perf_counter()
+        engine.download(job_id, options)
+        wall_time = time.perf_counter() - started
+    return {'peak_rss_mb': round(peak_rss_mb() - before, 1), 'wall_time': round(wall_time, 1)}
+
+
+def rss_mb():
+    """Current RSS (Linux), falling back to the peak so far"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / MB
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    if not resource:
+        return 0
+    # kilobytes on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (MB if sys.platform == 'darwin' else 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=10000)
+    parser.add_argument('--formats', type=int, default=20, help="formats per entry")
+    parser.add_argument('--modes', default='list,lazy', help="comma-separated: list, lazy")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # stdout carries the result; yt-dlp and engine output go to stderr
+        stdout, sys.stdout = sys.stdout, sys.stderr
+        stdout.write(json.dumps(run_child(args.child, args.entries, args.formats)) + '\n')
+        return 0
+    if not resource:
+        sys.exit("Peak RSS needs the resource module (not available on Windows)")
+
+    for mode in args.modes.split(','):
+        with tempfile.TemporaryDirectory() as workdir:
+            # The engine keeps its stores in the working directory
+            child = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode,
+                                    '--entries', str(args.entries), '--formats', str(args.formats)],
+                                   cwd=workdir, capture_output=True, text=True)
+        if child.returncode:
+            print(f"{mode:>5}: failed: {(child.stderr.strip().splitlines() or ['no output'])[-1]}")
+            continue
+        result = json.loads(child.stdout.strip().splitlines()[-1])
+        print(f"{mode:>5}: peak RSS +{result['peak_rss_mb']:7.1f} MB, {result['wall_time']:6.1f}s "
+              f"({args.entries} entries, {args.formats} formats each)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Compare inline post-processing with the post-processing pool on a playlist.
+
+    python benchmarks/bench_postprocess.py --videos 12 --workers 2 --transcode 0.5
+
+Every entry gets a stand-in transcode: an external process that runs for
+``--transcode`` seconds, like ffmpeg would. Inline, a worker waits for it
+before downloading its next entry; with the pool the download continues.
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import yt_dlp
+from yt_dlp.postprocessor import PostProcessor
+
+from download_engine import CountingYoutubeDL
+from download_scheduler import DownloadScheduler
+from media_server import MediaServer, synthetic_playlist
+from post_process_pool import PostProcessPool
+
+
+class SimulatedTranscodePP(PostProcessor):
+    def __init__(self, seconds):
+        super().__init__()
+        self.seconds = seconds
+
+    def run(self, info):
+        subprocess.run([sys.executable, '-c', f'import time; time.sleep({self.seconds})'], check=True)
+        return [], info
+
+
+def run(server, args, split):
+    pool = PostProcessPool(args.postprocess_workers) if split else None
+
+    def make_ydl(params):
+        ydl = CountingYoutubeDL(params)
+        ydl.postprocess_pool = pool
+        ydl.add_post_processor(SimulatedTranscodePP(args.transcode))
+        return ydl
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        ydl_opts = {
+            'quiet': True,
+            'noprogress': True,
+            'outtmpl': '%(playlist_index)s. %(title)s.%(ext)s',
+            'paths': {'home': output_dir},
+        }
+        started = time.perf_counter()
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            scheduler = DownloadScheduler(make_ydl, ydl_opts, workers=args.workers)
+            scheduler.run(ydl, synthetic_playlist(server, args.videos, args.size))
+        if pool:
+            pool.close()
+        elapsed = time.perf_counter() - started
+        files = len(list(Path(output_dir).iterdir()))
+    return elapsed, files, pool.stats() if pool else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--videos', type=int, default=12)
+    parser.add_argument('--size', type=int, default=1024 * 1024, help='bytes per video')
+    parser.add_argument('--workers', type=int, default=2, help='download workers')
+    parser.add_argument('--postprocess-workers', type=int, default=2)
+    parser.add_argument('--transcode', type=float, default=0.5, help='seconds per transcode')
+    parser.add_argument('--rate-limit', type=int, default=2 * 1024 * 1024,
+                        help='per-connection bytes/sec served by the stand-in')
+    args = parser.parse_args()
+
+    server = MediaServer(rate_limit=args.rate_limit).start()
+    try:
+        for label, split in (('inline', False), ('pool', True)):
+            elapsed, files, stats = run(server, args, split)
+            print(f"{label:>7}: {elapsed:6.2f}s for {files} files"
+                  + (f", post-processing {stats}" if stats else ""))
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
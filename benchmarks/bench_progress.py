@@ -0,0 +1,122 @@
+"""Measure progress hook overhead per MB downloaded from the local media server.
+
+    python benchmarks/bench_progress.py --size-mb 64
+
+Compares no hook, the old one-queue-message-per-chunk hook and the
+coalescing ProgressChannel, each drained by a consumer polling at the UI
+frame rate like the Tk loop does.
+"""
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from queue import Empty, Queue
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import yt_dlp
+
+from media_server import MediaServer
+from progress_channel import ProgressChannel
+
+
+class QueueHook:
+    """The previous design: every chunk becomes a message for the UI"""
+
+    def __init__(self):
+        self.queue = Queue()
+        self.calls = 0
+        self.redraws = 0
+
+    def hook(self, d):
+        self.calls += 1
+        total = d.get('total_bytes') or 0
+        if d['status'] == 'downloading' and total:
+            self.queue.put(('progress', d['downloaded_bytes'] / total * 100))
+
+    def drain(self):
+        try:
+            while True:
+                self.queue.get_nowait()
+                self.redraws += 1
+        except Empty:
+            pass
+
+
+class ChannelHook:
+    def __init__(self):
+        self.channel = ProgressChannel()
+        self.calls = 0
+        self.redraws = 0
+
+    def hook(self, d):
+        self.calls += 1
+        total = d.get('total_bytes') or 0
+        if d['status'] == 'downloading' and total:
+            self.channel.publish(None, d['downloaded_bytes'] / total * 100)
+
+    def drain(self):
+        if self.channel.drain():
+            self.redraws += 1
+
+
+def run(server, size, consumer, frame_rate):
+    stop = threading.Event()
+
+    def poll():
+        while not stop.is_set():
+            if consumer:
+                consumer.drain()
+            time.sleep(1 / frame_rate)
+
+    poller = threading.Thread(target=poll)
+    poller.start()
+    with tempfile.TemporaryDirectory() as output_dir:
+        opts = {
+            'quiet': True,
+            'noprogress': True,
+            'paths': {'home': output_dir},
+            'progress_hooks': [consumer.hook] if consumer else [],
+        }
+        info = {'id': 'bench', 'title': 'bench', 'ext': 'mp4', 'url': server.media_url('bench', size),
+                'extractor': 'benchmark', 'extractor_key': 'Benchmark', 'webpage_url': server.base_url}
+        cpu, wall = time.process_time(), time.perf_counter()
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            ydl.process_ie_result(info, download=True)
+        cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    stop.set()
+    poller.join()
+    if consumer:
+        consumer.drain()
+    return cpu, wall, consumer.calls if consumer else 0, consumer.redraws if consumer else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=64)
+    parser.add_argument('--frame-rate', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    server = MediaServer().start()
+    try:
+        baseline = None
+        for label, factory in (('no hook', lambda: None), ('queue', QueueHook), ('channel', ChannelHook)):
+            results = [run(server, size, factory(), args.frame_rate) for _ in range(args.rounds)]
+            cpu = min(r[0] for r in results)
+            wall = min(r[1] for r in results)
+            calls, redraws = results[0][2:]
+            baseline = cpu if baseline is None else baseline
+            print(f"{label:>8}: cpu {cpu / args.size_mb * 1e3:7.3f} ms/MB "
+                  f"(+{(cpu - baseline) / args.size_mb * 1e3:6.3f} over no hook), "
+                  f"wall {wall:5.2f}s, hook calls {calls / args.size_mb:7.2f}/MB, "
+                  f"UI updates {redraws / args.size_mb:7.2f}/MB")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
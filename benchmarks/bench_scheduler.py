@@ -0,0 +1,62 @@
+"""Compare serial and parallel playlist downloads against the local media server.
+
+    python benchmarks/bench_scheduler.py --videos 16 --workers 4
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import yt_dlp
+
+from download_scheduler import DownloadScheduler
+from media_server import MediaServer, synthetic_playlist
+
+
+def run(server, videos, size, workers):
+    with tempfile.TemporaryDirectory() as output_dir:
+        ydl_opts = {
+            'quiet': True,
+            'noprogress': True,
+            'outtmpl': '%(playlist_index)s. %(title)s.%(ext)s',
+            'paths': {'home': output_dir},
+        }
+        started = time.perf_counter()
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = synthetic_playlist(server, videos, size)
+            if workers == 1:
+                ydl.process_ie_result(info, download=True)
+            else:
+                DownloadScheduler(yt_dlp.YoutubeDL, ydl_opts, workers=workers).run(ydl, info)
+        elapsed = time.perf_counter() - started
+        files = sorted(p.name for p in Path(output_dir).iterdir())
+    return elapsed, files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--videos', type=int, default=16)
+    parser.add_argument('--size', type=int, default=2 * 1024 * 1024, help='bytes per video')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rate-limit', type=int, default=4 * 1024 * 1024,
+                        help='per-connection bytes/sec served by the stand-in')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds before each response')
+    args = parser.parse_args()
+
+    server = MediaServer(latency=args.latency, rate_limit=args.rate_limit).start()
+    try:
+        total_mb = args.videos * args.size / 1024 / 1024
+        for workers in (1, args.workers):
+            elapsed, files = run(server, args.videos, args.size, workers)
+            label = 'serial' if workers == 1 else f'{workers} workers'
+            print(f"{label:>10}: {elapsed:6.2f}s  {total_mb / elapsed:7.2f} MB/s  "
+                  f"{len(files)} files, first={files[0]!r} last={files[-1]!r}")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""Bytes written to the output directory by a fragmented playlist, with and without a scratch directory.
+
+    python benchmarks/bench_scratch.py --entries 20 --fragments 40
+
+A stub extractor lists ``--entries`` DASH-style videos of ``--fragments``
+fragments each, served by the local media server, and the job runs through
+the real DownloadEngine, once downloading straight into the output
+directory and once with ``--scratch`` (tmpfs by default) as its scratch
+directory. Every byte written through Python file objects or sendfile is
+attributed to the directory it lands in; reported per mode are the bytes
+and files written under the output directory, the bytes copied from
+scratch and the wall time. Each mode runs in a fresh subprocess.
+"""
+import argparse
+import builtins
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+MB = 1024 * 1024
+
+
+class WriteCounter:
+    """Counts what is written to files under ``root``"""
+
+    def __init__(self, root):
+        self.root = os.path.realpath(root) + os.sep
+        self.lock = threading.Lock()
+        self.bytes = 0
+        self.files = set()
+
+    def under_root(self, path):
+        return os.path.realpath(path).startswith(self.root)
+
+    def add(self, path, size):
+        with self.lock:
+            self.bytes += size
+            self.files.add(os.path.basename(path))
+
+    def install(self):
+        real_open, real_sendfile = builtins.open, os.sendfile
+        counter = self
+
+        class CountingFile:
+            def __init__(self, f, path):
+                self._f, self._path = f, path
+
+            def write(self, data):
+                written = self._f.write(data)
+                counter.add(self._path, len(data) if written is None else written)
+                return written
+
+            def __getattr__(self, name):
+                return getattr(self._f, name)
+
+            def __iter__(self):
+                return iter(self._f)
+
+            def __enter__(self):
+                self._f.__enter__()
+                return self
+
+            def __exit__(self, *exc_info):
+                return self._f.__exit__(*exc_info)
+
+        def counting_open(file, mode='r', *args, **kwargs):
+            f = real_open(file, mode, *args, **kwargs)
+            if not set(mode) & set('wax+'):
+                return f
+            # yt-dlp opens its downloads with os.open and os.fdopen
+            path = os.readlink(f'/proc/self/fd/{file}') if isinstance(file, int) else os.fsdecode(file)
+            return CountingFile(f, path) if counter.under_root(path) else f
+
+        def counting_sendfile(out_fd, in_fd, offset, count):
+            sent = real_sendfile(out_fd, in_fd, offset, count)
+            path = os.readlink(f'/proc/self/fd/{out_fd}')
+            if counter.under_root(path):
+                counter.add(path, sent)
+            return sent
+
+        builtins.open = io.open = counting_open
+        os.sendfile = counting_sendfile
+
+
+def run_child(scratch_root, output_root, entries, fragments, fragment_size):
+    from yt_dlp.extractor.common import InfoExtractor
+
+    from download_engine import DownloadEngine
+    from media_server import MediaServer, fragmented_video
+
+    server = MediaServer().start()
+
+    class ScratchTestIE(InfoExtractor):
+        IE_NAME = 'scratchtest'
+        _VALID_URL = r'scratchtest:(?P<kind>list|video)(?::(?P<id>\d+))?'
+
+        def _real_extract(self, url):
+            kind, number = self._match_valid_url(url).group('kind', 'id')
+            if kind == 'video':
+                return fragmented_video(server, f'scratch{number}', fragments, fragment_size)
+            return self.playlist_result(
+                [self.url_result(f'scratchtest:video:{i}', ScratchTestIE, f'scratch{i}', f'scratch{i}')
+                 for i in range(1, entries + 1)], 'scratchtest', 'Scratch test playlist')
+
+    class ScratchTestEngine(DownloadEngine):
+        def make_ydl(self, params):
+            ydl = super().make_ydl(params)
+            ydl.add_info_extractor(ScratchTestIE())
+            return ydl
+
+    events = {}
+    errors = []
+
+    def emit(msg_type, msg):
+        events[msg_type] = msg
+        if msg_type == 'error':
+            errors.append(msg)
+
+    engine = ScratchTestEngine(emit, lambda key, state: None, dedup=False, scratch_dir=scratch_root,
+                               scratch_min_free=0,
+                               ydl_params={
+                                   'allowed_extractors': ['scratchtest'],
+                                   'quiet': True, 'noprogress': True, 'verbose': False,
+                                   'sleep_interval': 0, 'max_sleep_interval': 0,
+                               })
+    try:
+        with tempfile.TemporaryDirectory(dir=output_root) as output_dir:
+            counter = WriteCounter(output_dir)
+            counter.install()
+            options = DownloadEngine.options('scratchtest:list', output_dir=output_dir, playlist=True,
+                                             workers='3')
+            job_id = engine.job_store.add_job(options)
+            started = time.perf_counter()
+            engine.download(job_id, options)
+            wall_time = time.perf_counter() - started
+            finished = [p for p in Path(output_dir).rglob('*') if p.is_file()]
+            complete = sum(p.stat().st_size == fragments * fragment_size for p in finished)
+    finally:
+        server.stop()
+    scratch = (events.get('stats') or {}).get('scratch') or {}
+    return {
+        'output_bytes': counter.bytes,
+        'output_files': len(counter.files),
+        'copied_bytes': scratch.get('copied_bytes', 0),
+        'complete': complete,
+        'leftover': len(finished) - complete,
+        'errors': len(errors),
+        'wall_time': round(wall_time, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=20)
+    parser.add_argument('--fragments', type=int, default=40, help="fragments per video")
+    parser.add_argument('--fragment-size', type=int, default=256 * 1024)
+    parser.add_argument('--scratch', default='/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+                        help="where the scratch directory is created (default: tmpfs when available)")
+    parser.add_argument('--output', default=tempfile.gettempdir(),
+                        help="where the output directory is created (stands in for the share)")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # stdout carries the result; yt-dlp and engine output go to stderr
+        stdout, sys.stdout = sys.stdout, sys.stderr
+        scratch_root = args.scratch if args.child == 'scratch' else None
+        stdout.write(json.dumps(run_child(scratch_root, args.output, args.entries, args.fragments,
+                                          args.fragment_size)) + '\n')
+        return 0
+
+    video_mb = args.fragments * args.fragment_size / MB
+    same_fs = os.stat(args.scratch).st_dev == os.stat(args.output).st_dev
+    print(f"{args.entries} videos of {video_mb:.1f} MB ({args.fragments} fragments); scratch {args.scratch}, "
+          f"output {args.output}{' (same filesystem)' if same_fs else ''}")
+    results = {}
+    for mode in ('direct', 'scratch'):
+        with tempfile.TemporaryDirectory(dir=args.scratch) as scratch, tempfile.TemporaryDirectory() as workdir:
+            # The engine keeps its stores in the working directory
+            child = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode,
+                                    '--entries', str(args.entries), '--fragments', str(args.fragments),
+                                    '--fragment-size', str(args.fragment_size),
+                                    '--scratch', scratch, '--output', args.output],
+                                   cwd=workdir, capture_output=True, text=True)
+        if child.returncode:
+            print(f"{mode:>8}: failed: {(child.stderr.strip().splitlines() or ['no output'])[-1]}")
+            continue
+        result = results[mode] = json.loads(child.stdout.strip().splitlines()[-1])
+        print(f"{mode:>8}: {result['output_bytes'] / MB:8.1f} MB written to output "
+              f"({result['output_bytes'] / MB / (args.entries * video_mb):.2f}x the videos) "
+              f"in {result['output_files']} files, {result['copied_bytes'] / MB:.1f} MB copied from scratch, "
+              f"{result['complete']}/{args.entries} complete, {result['leftover']} leftover files, "
+              f"{result['errors']} errors, {result['wall_time']:.1f}s")
+    if len(results) == 2:
+        saved = results['direct']['output_bytes'] - results['scratch']['output_bytes']
+        print(f"{'saved':>8}: {saved / MB:8.1f} MB of writes to the output directory")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
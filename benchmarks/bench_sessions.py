@@ -0,0 +1,93 @@
+"""Per-job overhead of many short downloads, with and without the session pool.
+
+    python benchmarks/bench_sessions.py --jobs 1000
+
+Queues ``--jobs`` single-video jobs of a few kilobytes each against the
+local media server (keep-alive on, like a real CDN) and runs them one after
+the other through one DownloadEngine, once creating a YoutubeDL per job
+and once reusing pooled sessions. Reported per mode: time per job, HTTP
+connections the server accepted per job and the pool's counters.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_suite import StandInIE
+from media_server import MediaServer
+
+
+def run(jobs, size, reuse_sessions):
+    from download_engine import DownloadEngine
+
+    class StandInEngine(DownloadEngine):
+        def make_ydl(self, params):
+            ydl = super().make_ydl(params)
+            # All extractors stay enabled, as in the app; the stub goes first so
+            # the generic extractor does not claim the pages
+            ydl.add_info_extractor(StandInIE())
+            ydl._ies = {'StandIn': ydl._ies.pop('StandIn'), **ydl._ies}
+            return ydl
+
+    random.seed(0)
+    server = MediaServer(keep_alive=True).start()
+    errors = []
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            # The engine keeps its stores in the working directory
+            os.chdir(workdir)
+            engine = StandInEngine(lambda msg_type, msg: msg_type == 'error' and errors.append(msg),
+                                   lambda key, state: None, reuse_sessions=reuse_sessions, dedup=False,
+                                   ydl_params={
+                                       'quiet': True, 'noprogress': True, 'verbose': False,
+                                       'sleep_interval': 0, 'max_sleep_interval': 0,
+                                   })
+            queued = []
+            for i in range(jobs):
+                options = DownloadEngine.options(f'{server.base_url}/watch/short{i:05d}?size={size}',
+                                                 output_dir='out')
+                queued.append((engine.job_store.add_job(options), options))
+            started = time.perf_counter()
+            engine.run_jobs(queued)
+            elapsed = time.perf_counter() - started
+            sessions = engine.sessions.stats() if engine.sessions else None
+            if engine.sessions:
+                engine.sessions.close()
+    finally:
+        os.chdir(cwd)
+        server.stop()
+    return {
+        'per_job_ms': elapsed / jobs * 1000,
+        'connections_per_job': server.connections_opened / jobs,
+        'errors': len(errors),
+        'sessions': sessions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=1000)
+    parser.add_argument('--size', type=int, default=16 * 1024, help="bytes per video")
+    args = parser.parse_args()
+
+    # yt-dlp's own output would drown the results
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    results = {name: run(args.jobs, args.size, reuse)
+               for name, reuse in (('new YoutubeDL per job', False), ('session pool', True))}
+    sys.stdout = stdout
+    for name, result in results.items():
+        print(f"{name:>22}: {result['per_job_ms']:6.1f} ms/job, "
+              f"{result['connections_per_job']:.2f} connections/job, {result['errors']} errors"
+              + (f", sessions {result['sessions']}" if result['sessions'] else ""))
+    fresh, pooled = results.values()
+    print(f"{'saved':>22}: {fresh['per_job_ms'] - pooled['per_job_ms']:6.1f} ms/job")
+
+
+if __name__ == '__main__':
+    main()
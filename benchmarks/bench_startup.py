@@ -0,0 +1,50 @@
+"""Measure the GUI's cold start: imports, first paint and engine ready.
+
+    python benchmarks/bench_startup.py --runs 5
+
+Starts ``yt-download.py --startup-time`` repeatedly; each run prints its
+timings (seconds since the script started) and quits once the window has
+been drawn and the download engine is loaded. Every run starts twice in a
+fresh directory: cold, with no stores or cached FFmpeg probe yet, then
+warm, with what the first start left behind. Needs a display.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+APP = Path(__file__).resolve().parent.parent / 'yt-download.py'
+
+
+def start_app(workdir):
+    child = subprocess.run([sys.executable, str(APP), '--startup-time'], cwd=workdir,
+                           capture_output=True, text=True, timeout=60)
+    if child.returncode:
+        sys.exit(f"yt-download.py failed: {child.stderr.strip()}")
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    runs = {'cold': [], 'warm': []}
+    for _ in range(args.runs):
+        # Stores in a scratch directory, so the real history is left alone
+        with tempfile.TemporaryDirectory() as workdir:
+            for start in ('cold', 'warm'):
+                runs[start].append(start_app(workdir))
+    for start, timings in runs.items():
+        print(f"{start}:")
+        for name in ('import', 'first_paint', 'ready'):
+            values = [run[name] for run in timings]
+            print(f"{name:>11}: median {statistics.median(values) * 1000:7.1f} ms, "
+                  f"min {min(values) * 1000:7.1f} ms, max {max(values) * 1000:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Run the download engine through fixed scenarios and compare with a stored baseline.
+
+    python benchmarks/bench_suite.py                   # run all, compare with the baseline
+    python benchmarks/bench_suite.py --save-baseline   # run all, store the results as the baseline
+    python benchmarks/bench_suite.py playlist flaky --tolerance 0.3
+
+Everything runs offline: the local media server stands in for the site,
+serving JSON watch and playlist pages that a stub extractor reads, and the
+media itself. Each scenario runs the real DownloadEngine in a fresh
+subprocess (with its own stores and output directory), so its CPU time and
+peak RSS are its own; the server stays in this process. Random retry
+jitter is seeded, failures are injected at fixed request counts.
+
+Reported per scenario: wall time, throughput, CPU time, peak RSS,
+extractor calls, media requests and injected failures. The baseline is a
+JSON file (``benchmarks/baseline.json`` by default); as timings depend on
+the machine, save one per machine before changing the code. A metric that
+is worse than the baseline by more than ``--tolerance`` is a regression
+and makes the exit status 1.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from yt_dlp.extractor.common import InfoExtractor
+
+from media_server import MediaServer
+
+MB = 1024 * 1024
+BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+
+# name -> (MediaServer arguments, playlist entries or None for a single video,
+#          bytes per video, format, playlist workers)
+SCENARIOS = {
+    'single': ({}, None, 128 * MB, 'mp4', 1),
+    'playlist': ({}, 200, 256 * 1024, 'mp4', 4),
+    'mp3': ({}, 8, 2 * MB, 'mp3', 2),
+    'throttled': ({'throttle_above': 2, 'throttle_rate': 2 * MB}, 8, MB, 'mp4', 4),
+    'flaky': ({'fail_every': 5}, 20, MB, 'mp4', 4),
+}
+
+# Metrics compared with the baseline; lower is better for all of them
+COMPARED = ('wall_time', 'cpu_time', 'peak_rss_mb', 'extractor_calls')
+
+
+class StandInIE(InfoExtractor):
+    """Reads the media server's JSON watch and playlist pages"""
+    IE_NAME = 'standin'
+    _VALID_URL = r'http://127\.0\.0\.1:\d+/(?P<kind>watch|playlist)/(?P<id>[\w-]+)'
+
+    def _real_extract(self, url):
+        kind, page_id = self._match_valid_url(url).group('kind', 'id')
+        page = self._download_json(url, page_id)
+        if kind == 'watch':
+            return page
+        entries = (self.url_result(entry['url'], StandInIE, entry['id'], entry['title'])
+                   for entry in page['entries'])
+        return self.playlist_result(entries, page['id'], page['title'])
+
+
+def run_scenario(name, base_url, ffmpeg):
+    """Download one scenario with the engine in this process; returns its measurements"""
+    import download_engine
+    from download_engine import DownloadEngine
+
+    if ffmpeg:
+        download_engine.FFMPEG_PATH = ffmpeg
+        download_engine.FFPROBE_PATH = shutil.which('ffprobe', path=os.path.dirname(ffmpeg)) or ffmpeg
+    random.seed(0)
+    _, entries, size, format_type, workers = SCENARIOS[name]
+    if entries:
+        url = f'{base_url}/playlist/{name}?count={entries}&size={size}'
+    else:
+        url = f'{base_url}/watch/{name}?size={size}'
+
+    class StandInEngine(DownloadEngine):
+        def make_ydl(self, params):
+            ydl = super().make_ydl(params)
+            ydl.add_info_extractor(StandInIE())
+            return ydl
+
+    events = {}
+    engine = StandInEngine(lambda msg_type, msg: events.setdefault(msg_type, msg), lambda key, state: None,
+                           ydl_params={
+                               # Only the stub extractor, so the generic one never claims the pages
+                               'allowed_extractors': ['standin'],
+                               'quiet': True, 'noprogress': True, 'verbose': False,
+                               'sleep_interval': 0, 'max_sleep_interval': 0,
+                           })
+    with tempfile.TemporaryDirectory() as output_dir:
+        options = DownloadEngine.options(url, format_type=format_type,
+                                         quality='192kbps' if format_type == 'mp3' else 'best',
+                                         output_dir=output_dir, playlist=bool(entries),
+                                         workers=str(workers))
+        job_id = engine.job_store.add_job(options)
+        started, cpu_started = time.perf_counter(), time.process_time()
+        engine.download(job_id, options)
+        wall_time = time.perf_counter() - started
+        cpu_time = time.process_time() - cpu_started
+        downloaded = sum(f.stat().st_size for f in Path(output_dir).rglob('*') if f.is_file())
+    peak_rss = None
+    if resource:
+        # kilobytes on Linux, bytes on macOS
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (MB if sys.platform == 'darwin' else 1024)
+    return {
+        'ok': 'complete' in events,
+        'error': events.get('error'),
+        'wall_time': round(wall_time, 3),
+        'throughput_mb_s': round(downloaded / MB / wall_time, 2),
+        'cpu_time': round(cpu_time, 3),
+        'peak_rss_mb': round(peak_rss, 1) if peak_rss else None,
+        'extractor_calls': (events.get('stats') or {}).get('extractor_calls'),
+        'downloaded_mb': round(downloaded / MB, 1),
+    }
+
+
+def measure(name, ffmpeg):
+    server_args = SCENARIOS[name][0]
+    server = MediaServer(**server_args).start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            # The engine keeps its stores in the working directory
+            child = subprocess.run([sys.executable, __file__, '--child', name, '--base-url', server.base_url]
+                                   + (['--ffmpeg', ffmpeg] if ffmpeg else []),
+                                   cwd=workdir, capture_output=True, text=True)
+        if child.returncode:
+            return {'ok': False, 'error': (child.stderr.strip().splitlines() or ['no output'])[-1]}
+        result = json.loads(child.stdout.strip().splitlines()[-1])
+        result.update(media_requests=server.requests, page_requests=server.page_requests,
+                      failures=server.failures)
+        return result
+    finally:
+        server.stop()
+
+
+def compare(results, baseline, tolerance):
+    """Print every scenario next to its baseline; returns the regressed ``(scenario, metric)`` pairs"""
+    regressions = []
+    for name, result in results.items():
+        print(f"{name}:")
+        if result.get('skipped'):
+            print(f"  skipped: {result['skipped']}")
+            continue
+        if not result.get('ok'):
+            print(f"  failed: {result.get('error')}")
+            continue
+        before = baseline.get(name) or {}
+        for metric, value in result.items():
+            if metric in ('ok', 'error'):
+                continue
+            line = f"  {metric:>16}: {value}"
+            old = before.get(metric)
+            if metric in COMPARED and value is not None and old:
+                change = (value - old) / old
+                line += f" (baseline {old}, {change:+.0%})"
+                if change > tolerance:
+                    line += "  REGRESSION"
+                    regressions.append((name, metric))
+            print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('scenarios', nargs='*',
+                        help=f"scenarios to run: {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store the results as the baseline instead of comparing")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="relative slowdown that counts as a regression")
+    parser.add_argument('--ffmpeg', default=shutil.which('ffmpeg'),
+                        help="ffmpeg for the mp3 scenario (default: the one on PATH)")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    if args.child:
+        # stdout carries the result; yt-dlp and engine output go to stderr
+        stdout, sys.stdout = sys.stdout, sys.stderr
+        result = run_scenario(args.child, args.base_url, args.ffmpeg)
+        stdout.write(json.dumps(result) + '\n')
+        return 0
+
+    results = {}
+    for name in args.scenarios or SCENARIOS:
+        if SCENARIOS[name][3] == 'mp3' and not args.ffmpeg:
+            results[name] = {'ok': False, 'skipped': 'ffmpeg not found'}
+            continue
+        results[name] = measure(name, args.ffmpeg)
+
+    if args.save_baseline:
+        baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        baseline.update({name: result for name, result in results.items() if result.get('ok')})
+        args.baseline.write_text(json.dumps(baseline, indent=2) + '\n')
+        compare(results, {}, args.tolerance)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if not baseline:
+        print(f"No baseline at {args.baseline}; run with --save-baseline first")
+    regressions = compare(results, baseline, args.tolerance)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
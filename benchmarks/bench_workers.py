@@ -0,0 +1,139 @@
+"""Aggregate throughput of worker processes sharing a work queue, and recovery from a dead worker.
+
+    python benchmarks/bench_workers.py --workers 1,2,4 --store server
+
+A playlist of ``--entries`` videos is submitted to a work queue, split
+into one shard per worker, and ``N`` worker processes (each with its own
+stores, like separate hosts, and one download at a time) download it from
+the local media server into a shared output directory. Every connection
+is capped at ``--rate``, as a CDN caps a client, so one worker cannot use
+the whole link. The queue is a SQLite file (``--store sqlite``) or the
+stand-in queue server (``--store server``). Reported per worker count:
+throughput from the first worker being ready to the last one exiting,
+speedup over one worker and complete files. With ``--kill``, one worker
+is killed halfway through and another takes over its shard once the
+lease runs out.
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from media_server import MediaServer
+
+MB = 1024 * 1024
+
+
+def run_child(queue_spec, lease):
+    from bench_suite import StandInIE
+    from download_engine import DownloadEngine
+    from download_worker import DownloadWorker
+    from work_queue import open_work_queue
+
+    class StandInEngine(DownloadEngine):
+        def make_ydl(self, params):
+            ydl = super().make_ydl(params)
+            ydl.add_info_extractor(StandInIE())
+            return ydl
+
+    engine = StandInEngine(lambda msg_type, msg: None, lambda key, state: None, dedup=False,
+                           ydl_params={
+                               # Only the stub extractor, so the generic one never claims the pages
+                               'allowed_extractors': ['standin'],
+                               'quiet': True, 'noprogress': True, 'verbose': False,
+                               'sleep_interval': 0, 'max_sleep_interval': 0,
+                           })
+    worker = DownloadWorker(open_work_queue(queue_spec), engine, lease=lease, heartbeat=lease / 4, poll=0.2)
+    ready = time.time()
+    worker.run(until_drained=True)
+    return {'ready': ready, 'ended': time.time(), 'tasks': worker.tasks}
+
+
+def run(args, workers, kill=False):
+    from download_engine import DownloadEngine
+    from work_queue import SQLiteWorkQueue, WorkQueueServer
+
+    server = MediaServer(rate_limit=args.rate).start()
+    with tempfile.TemporaryDirectory() as shared:
+        queue = SQLiteWorkQueue(os.path.join(shared, 'work_queue.sqlite'))
+        queue_server = WorkQueueServer(queue).start() if args.store == 'server' else None
+        queue_spec = queue_server.url if queue_server else os.path.join(shared, 'work_queue.sqlite')
+        output_dir = os.path.join(shared, 'videos')
+        queue.submit(DownloadEngine.options(f'{server.base_url}/playlist/bulk?count={args.entries}&size={args.size}',
+                                            output_dir=output_dir, playlist=True, workers='1'), shards=workers)
+        children, workdirs = [], []
+        for _ in range(workers):
+            # Every worker keeps its own stores in its working directory, like a separate host
+            workdirs.append(tempfile.TemporaryDirectory())
+            children.append(subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), '--child', queue_spec, '--lease', str(args.lease)],
+                cwd=workdirs[-1].name, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True))
+        if kill:
+            # Halfway through the first worker's shard
+            time.sleep(1 + args.entries / workers * args.size / args.rate / 2)
+            children[0].send_signal(signal.SIGKILL)
+        results = []
+        for child in children:
+            out, _ = child.communicate()
+            if child.returncode == 0:
+                results.append(json.loads(out.strip().splitlines()[-1]))
+        for workdir in workdirs:
+            workdir.cleanup()
+        sizes = [p.stat().st_size for p in Path(output_dir).rglob('*') if p.is_file()]
+        counts = queue.counts()
+        if queue_server:
+            queue_server.stop()
+        queue.close()
+    server.stop()
+    wall_time = max(r['ended'] for r in results) - min(r['ready'] for r in results)
+    return {
+        'throughput': server.bytes_sent / wall_time,
+        'wall_time': wall_time,
+        'complete': sizes.count(args.size),
+        'tasks': counts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4', help="comma-separated worker counts")
+    parser.add_argument('--entries', type=int, default=32)
+    parser.add_argument('--size', type=int, default=2 * MB, help="bytes per video")
+    parser.add_argument('--rate', type=int, default=4 * MB, help="bytes/sec per connection")
+    parser.add_argument('--store', choices=['sqlite', 'server'], default='server')
+    parser.add_argument('--lease', type=float, default=3.0, help="seconds")
+    parser.add_argument('--kill', action='store_true', help="also run the most workers with one killed halfway")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # stdout carries the result; yt-dlp and engine output go to stderr
+        stdout, sys.stdout = sys.stdout, sys.stderr
+        stdout.write(json.dumps(run_child(args.child, args.lease)) + '\n')
+        return 0
+
+    counts = [int(n) for n in args.workers.split(',')]
+    runs = [(n, False) for n in counts] + ([(max(counts), True)] if args.kill else [])
+    print(f"{args.entries} x {args.size / MB:.1f} MB playlist, {args.rate / MB:.1f} MB/s per connection, "
+          f"{args.store} queue")
+    single = None
+    for workers, kill in runs:
+        result = run(args, workers, kill)
+        if workers == 1 and not kill:
+            single = result['throughput']
+        speedup = f"{result['throughput'] / single:4.2f}x" if single else "  -  "
+        name = f"{workers} worker{'s' if workers > 1 else ''}" + (", one killed" if kill else "")
+        print(f"{name:>20}: {result['throughput'] / MB:6.1f} MB/s ({speedup}), {result['wall_time']:5.1f}s, "
+              f"{result['complete']}/{args.entries} complete, tasks {result['tasks']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""Local HTTP stand-in that serves synthetic media for the benchmarks."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHUNK_SIZE = 64 * 1024
+
+
+class MediaHandler(BaseHTTPRequestHandler):
+    """Serves ``/<name>.<ext>?size=<bytes>`` as zero-filled media.
+
+    Range requests are honoured so yt-dlp can resume ``.part`` files.
+    ``/watch/<id>?size=<bytes>`` and ``/playlist/<id>?count=<n>&size=<bytes>``
+    are JSON pages describing a video's formats and a playlist's entries,
+    for an extractor to fetch.
+    """
+
+    def setup(self):
+        super().setup()
+        if self.server.keep_alive:
+            self.protocol_version = 'HTTP/1.1'
+        with self.server.lock:
+            self.server.connections_opened += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        path, _, query = self.path.partition('?')
+        params = dict(p.split('=', 1) for p in query.split('&') if '=' in p)
+        size = int(params.get('size', server.default_size))
+        if path.startswith(('/watch/', '/playlist/')):
+            return self._send_page(server, path, params, size)
+
+        start = 0
+        range_header = self.headers.get('Range')
+        if range_header and range_header.startswith('bytes='):
+            first, _, last = range_header[6:].partition('-')
+            start = int(first or 0)
+            end = int(last) if last else size - 1
+        else:
+            end = size - 1
+
+        if server.latency:
+            time.sleep(server.latency)
+        cut_after = None
+        with server.lock:
+            server.requests += 1
+            server.connections += 1
+            # Every fail_every-th media request breaks off halfway
+            if server.fail_every and server.requests % server.fail_every == 0:
+                server.failures += 1
+                cut_after = (end - start + 1) // 2
+        try:
+            self._send(server, path, range_header, start, end, size, cut_after)
+        finally:
+            with server.lock:
+                server.connections -= 1
+
+    def _send_page(self, server, path, params, size):
+        kind, _, page_id = path.strip('/').partition('/')
+        if kind == 'watch':
+            page = video_page(server, page_id, size)
+        else:
+            count = int(params.get('count', 10))
+            page = {'id': page_id, 'title': f'Playlist {page_id}', 'entries': [
+                {'id': f'{page_id}-{i:05d}', 'title': f'Video {i}',
+                 'url': f'{server.base_url}/watch/{page_id}-{i:05d}?size={size}'}
+                for i in range(1, count + 1)]}
+        body = json.dumps(page).encode()
+        if server.latency:
+            time.sleep(server.latency)
+        with server.lock:
+            server.page_requests += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send(self, server, path, range_header, start, end, size, cut_after=None):
+        self.send_response(206 if range_header else 200)
+        self.send_header('Content-Type', 'video/mp4' if path.endswith('.mp4') else 'audio/mp4')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        if range_header:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.end_headers()
+
+        chunk = b'\0' * CHUNK_SIZE
+        remaining = end - start + 1
+        if cut_after is not None:
+            # The connection closes before the promised length arrives
+            remaining = cut_after
+            self.close_connection = True
+        while remaining > 0:
+            data = chunk[:min(CHUNK_SIZE, remaining)]
+            # Pace before writing so the connection closes right after its last byte
+            rate = server.rate_limit
+            if server.throttle_above and server.connections > server.throttle_above:
+                # Too many parallel connections from one client get throttled
+                rate = server.throttle_rate / server.connections
+            if rate:
+                # Per-connection bandwidth cap, like a throttled CDN edge
+                time.sleep(len(data) / rate)
+            if server.link_rate:
+                server.wait_for_link(len(data))
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            remaining -= len(data)
+            with server.lock:
+                server.bytes_sent += len(data)
+
+
+class MediaServer(ThreadingHTTPServer):
+    """``rate_limit`` caps each connection and ``link_rate`` all of them together
+    (bytes/sec, 0 for none). With ``throttle_above`` set, all connections
+    together drop to ``throttle_rate`` while more than that many are open.
+    With ``fail_every`` set, every so many media requests are cut off
+    halfway, like a flaky link. With ``keep_alive``, connections stay open
+    for further requests (HTTP/1.1); ``connections_opened`` counts them.
+    """
+    daemon_threads = True
+
+    def __init__(self, latency=0.0, rate_limit=0, default_size=1024 * 1024,
+                 link_rate=0, throttle_above=0, throttle_rate=64 * 1024, fail_every=0, keep_alive=False):
+        super().__init__(('127.0.0.1', 0), MediaHandler)
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.default_size = default_size
+        self.link_rate = link_rate
+        self.throttle_above = throttle_above
+        self.throttle_rate = throttle_rate
+        self.fail_every = fail_every
+        self.keep_alive = keep_alive
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.page_requests = 0
+        self.failures = 0
+        self.bytes_sent = 0
+        self.connections = 0
+        self.connections_opened = 0
+        self.link_free = time.monotonic()
+
+    def wait_for_link(self, size):
+        """Queue ``size`` bytes on the shared link and sleep until they are sent"""
+        with self.lock:
+            now = time.monotonic()
+            self.link_free = max(self.link_free, now) + size / self.link_rate
+            delay = self.link_free - now
+        time.sleep(delay)
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def media_url(self, name, size=None, ext='mp4'):
+        return f'{self.base_url}/{name}.{ext}?size={size or self.default_size}'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def video_page(server, video_id, size):
+    """Metadata of a stand-in video: a muxed MP4 and an M4A audio stream of ``size`` bytes each"""
+    return {
+        'id': video_id,
+        'title': f'Video {video_id}',
+        'duration': 60,
+        'formats': [
+            {'format_id': '18', 'url': server.media_url(video_id, size), 'ext': 'mp4',
+             'vcodec': 'avc1.42001E', 'acodec': 'mp4a.40.2', 'height': 360, 'width': 640,
+             'filesize': size},
+            {'format_id': '140', 'url': server.media_url(f'{video_id}-audio', size, 'm4a'), 'ext': 'm4a',
+             'vcodec': 'none', 'acodec': 'mp4a.40.2', 'abr': 128, 'filesize': size},
+        ],
+    }
+
+
+def synthetic_playlist(server, count, size=None, title='Benchmark Playlist'):
+    """Build a yt-dlp playlist info dict whose entries point at ``server``"""
+    def entries():
+        for i in range(1, count + 1):
+            yield {
+                'id': f'video{i:05d}',
+                'title': f'Video {i}',
+                'url': server.media_url(f'video{i:05d}', size),
+                'ext': 'mp4',
+                'duration': 60,
+                'extractor': 'benchmark',
+                'extractor_key': 'Benchmark',
+                'webpage_url': f'{server.base_url}/watch/{i}',
+            }
+    return {
+        '_type': 'playlist',
+        'id': 'benchmark',
+        'title': title,
+        'entries': entries(),
+        'playlist_count': count,
+        'extractor': 'benchmark',
+        'extractor_key': 'Benchmark',
+        'webpage_url': f'{server.base_url}/playlist',
+    }
+
+
+def fragmented_video(server, name, fragments, fragment_size):
+    """Build a DASH-style info dict that yt-dlp downloads fragment by fragment"""
+    return {
+        'id': name,
+        'title': name,
+        'ext': 'mp4',
+        'protocol': 'http_dash_segments',
+        'url': server.media_url(name, fragment_size),
+        'fragments': [{'url': server.media_url(f'{name}-{i}', fragment_size)} for i in range(fragments)],
+        'extractor': 'benchmark',
+        'extractor_key': 'Benchmark',
+        'webpage_url': f'{server.base_url}/watch/{name}',
+    }
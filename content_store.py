@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Read size while hashing a finished download
+HASH_CHUNK = 1024 * 1024
+
+# Fields of a download's info that describe the download itself or the playlist it came
+# from rather than the video, left out of what is kept for naming links
+LOCAL_FIELDS = ('url', 'manifest_url', 'fragment_base_url', 'filepath', 'filename', 'webpage_url_basename')
+
+
+def template_fields(info):
+    """The plain fields of a download's info that a filename template can use for another copy"""
+    return {key: value for key, value in info.items()
+            if isinstance(value, (str, int, float)) and not key.startswith(('_', 'playlist'))
+            and key not in LOCAL_FIELDS}
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentStore:
+    """Index of downloaded media files keyed like the download archive.
+
+    Every finished download is recorded under its archive key (extractor,
+    video ID, format and quality) with its path, size and SHA-256, and how
+    long it took to download. When the same video turns up again, e.g. in
+    another playlist, ``link`` puts a hardlink to the stored file in the new
+    folder instead of downloading it again; where the filesystem cannot
+    hardlink (another drive, FAT), a line in the folder's ``manifest.jsonl``
+    points to the stored file instead.
+
+    Stored files are checked against their recorded size before they are
+    reused; one that was moved, deleted or changed is forgotten. The video's
+    own fields (see ``template_fields``) are kept with it, so a link can be
+    named by any filename template. A new file
+    with the same hash as a stored one is replaced by a hardlink to it, so
+    identical media is kept once on disk however it was requested.
+    """
+
+    MANIFEST = 'manifest.jsonl'
+
+    def __init__(self, path='content_store.sqlite'):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS media (
+                key TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                title TEXT,
+                seconds REAL NOT NULL,
+                added REAL NOT NULL,
+                fields TEXT
+            );
+            CREATE INDEX IF NOT EXISTS media_sha256 ON media (sha256, size);
+        ''')
+        if 'fields' not in [row[1] for row in self.conn.execute('PRAGMA table_info(media)')]:
+            # Stores created before the fields were kept
+            self.conn.execute('ALTER TABLE media ADD COLUMN fields TEXT')
+        self.conn.commit()
+
+    def lookup(self, key):
+        """Return ``{'path', 'size', 'sha256', 'title', 'seconds', 'fields'}`` for a stored file that is still intact, or None"""
+        with self.lock:
+            row = self.conn.execute('SELECT path, size, sha256, title, seconds, fields FROM media WHERE key = ?',
+                                    (key,)).fetchone()
+        if row is None:
+            return None
+        stored = dict(zip(('path', 'size', 'sha256', 'title', 'seconds'), row))
+        stored['fields'] = json.loads(row[5]) if row[5] else {}
+        try:
+            intact = os.path.getsize(stored['path']) == stored['size']
+        except OSError:
+            intact = False
+        if not intact:
+            self.forget(key)
+            return None
+        return stored
+
+    def add(self, key, path, title=None, seconds=0, fields=None):
+        """Record a finished download; returns the bytes saved by deduplicating it against an identical stored file"""
+        path = os.path.abspath(path)
+        size = os.path.getsize(path)
+        sha256 = file_hash(path)
+        saved = 0
+        with self.lock:
+            same = self.conn.execute(
+                'SELECT path FROM media WHERE sha256 = ? AND size = ? AND path != ?',
+                (sha256, size, path)).fetchall()
+        for (original,) in same:
+            try:
+                if os.path.samefile(original, path):
+                    break
+                if os.path.getsize(original) != size:
+                    continue
+                self._replace_with_link(original, path)
+            except OSError:
+                continue
+            saved = size
+            break
+        with self.lock:
+            self.conn.execute('INSERT OR REPLACE INTO media (key, path, size, sha256, title, seconds, added, fields) '
+                              'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                              (key, path, size, sha256, title, seconds, time.time(),
+                               json.dumps(fields) if fields else None))
+            self.conn.commit()
+        return saved
+
+    def forget(self, key):
+        with self.lock:
+            self.conn.execute('DELETE FROM media WHERE key = ?', (key,))
+            self.conn.commit()
+
+    def link(self, stored, dest):
+        """Make the stored file available at ``dest``; returns ``'hardlink'``, ``'manifest'`` or None if already there.
+
+        Raises FileExistsError when another file (e.g. a different video
+        whose title comes out the same) already has that name, in the folder
+        or in its manifest.
+        """
+        if os.path.exists(dest):
+            # An earlier copy (or the stored file itself) is left alone
+            if os.path.samefile(stored['path'], dest) or (
+                    os.path.getsize(dest) == stored['size'] and file_hash(dest) == stored['sha256']):
+                return None
+            raise FileExistsError(f"{dest} is another file")
+        os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+        try:
+            os.link(stored['path'], dest)
+            return 'hardlink'
+        except OSError:
+            pass
+        manifest = os.path.join(os.path.dirname(dest), self.MANIFEST)
+        with self.lock:
+            listed = self._listed(manifest, os.path.basename(dest))
+            if listed:
+                if listed['sha256'] == stored['sha256']:
+                    return None
+                raise FileExistsError(f"{dest} is another file in {manifest}")
+            with open(manifest, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'file': os.path.basename(dest), 'source': stored['path'],
+                                    'size': stored['size'], 'sha256': stored['sha256']}) + '\n')
+        return 'manifest'
+
+    @staticmethod
+    def _listed(manifest, name):
+        """The manifest line for the file ``name``, None if there is none"""
+        try:
+            with open(manifest, encoding='utf-8') as f:
+                for line in f:
+                    listed = json.loads(line)
+                    if listed['file'] == name:
+                        return listed
+        except FileNotFoundError:
+            pass
+        return None
+
+    @staticmethod
+    def _replace_with_link(original, path):
+        # Link under a temporary name first, so ``path`` is never missing
+        temp = path + '.link'
+        os.link(original, temp)
+        try:
+            os.replace(temp, path)
+        except OSError:
+            os.remove(temp)
+            raise
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
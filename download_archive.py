@@ -0,0 +1,68 @@
+import os
+import threading
+
+from yt_dlp.utils import make_archive_id
+
+from metadata_cache import url_id
+
+
+class DownloadArchive:
+    """Set of downloaded videos keyed by extractor, video ID, format and quality.
+
+    The file uses yt-dlp's ``download_archive`` line format with the format
+    and quality appended (``youtube dQw4w9WgXcQ mp4 720p``). It is read once
+    into a set, so every lookup is O(1), and new entries are appended.
+    """
+
+    def __init__(self, path='download_archive.txt'):
+        self.path = path
+        self.lock = threading.Lock()
+        self.keys = set()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.keys.update(line.strip() for line in f if line.strip())
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key):
+        with self.lock:
+            if key in self.keys:
+                return
+            self.keys.add(key)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(key + '\n')
+
+    def view(self, format_type, quality):
+        """Return the archive as yt-dlp sees it for one format/quality combination"""
+        return ArchiveView(self, f"{format_type} {quality}")
+
+
+class ArchiveView:
+    """Container passed as yt-dlp's ``download_archive`` option.
+
+    yt-dlp looks up and records plain ``extractor id`` strings; the view adds
+    the format and quality so the same video can still be fetched as MP3
+    after it was downloaded as MP4.
+    """
+
+    def __init__(self, archive, variant):
+        self.archive = archive
+        self.variant = variant
+
+    def __contains__(self, archive_id):
+        return f"{archive_id} {self.variant}" in self.archive
+
+    def __len__(self):
+        return len(self.archive)
+
+    def add(self, archive_id):
+        self.archive.add(f"{archive_id} {self.variant}")
+
+    def contains_url(self, url):
+        """Check a URL against the archive before it is extracted"""
+        ie_key, video_id = url_id(url.strip())
+        return bool(video_id) and make_archive_id(ie_key, video_id) in self
@@ -0,0 +1,944 @@
+import copy
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+import yt_dlp
+from yt_dlp.postprocessor import MoveFilesAfterDownloadPP
+from yt_dlp.utils import DownloadCancelled, PostProcessingError, make_archive_id
+
+import job_store
+from audio_stream import AudioStreamer
+from bandwidth_controller import BandwidthController
+from batch_estimate import BatchEstimate
+from content_store import ContentStore, template_fields
+from download_archive import DownloadArchive
+from download_scheduler import DownloadScheduler, EntryPaused
+from ffmpeg_probe import FFMPEG_PATH, FFPROBE_PATH
+from format_planner import FormatPlanner
+from history_store import HistoryStore
+from job_metrics import JobMetrics, JobTracer
+from metadata_cache import MetadataCache, cache_key
+from playlist_entries import EntryRecord, as_entries, compact_entries, compact_entry
+from post_process_pool import PostProcessPool
+from session_pool import JOB_KEYS, SessionPool
+from staging import ScratchSpace, StagedMovePP
+
+# Qualities offered per output format, best first
+QUALITIES = {
+    'mp4': ('best', '1080p', '720p', '480p'),
+    'mp3': ('320kbps', '192kbps', '128kbps', '64kbps'),
+}
+
+def plain_copy(value):
+    """Copy of nested dicts and lists; any other object (futures, post-processors) is shared"""
+    if isinstance(value, dict):
+        return {key: plain_copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [plain_copy(item) for item in value]
+    return value
+
+class CountingYoutubeDL(yt_dlp.YoutubeDL):
+    """YoutubeDL that counts how many extractor calls a job makes.
+
+    With ``audio_streamer`` set, audio formats that can be piped are encoded
+    to MP3 while they download; ``audio_feed`` is its progress hook while a
+    download is being encoded. With ``postprocess_pool`` set, merging and
+    conversion run on the pool and each downloaded format carries the
+    future under ``__postprocess``; the video is only added to the download
+    archive once all of them succeeded. With ``tracer`` set, extraction and
+    format selection are recorded as spans of the job. With ``session_pool``
+    set, closing the instance hands it back to the pool for the next job.
+    With ``bandwidth`` set, every download holds its fragments in the
+    controller's connection budget. With ``scratch`` set, files leave the temporary directory through
+    ``StagedMovePP``.
+
+    Progress, post-processor and post hooks belong to the job: yt-dlp (and
+    every post-processor) only holds one hook of each kind calling those in
+    ``job_hooks``, which ``reuse`` starts over.
+    """
+    def __init__(self, params=None, auto_init=True):
+        # Filled by YoutubeDL.__init__ with the hooks of the params
+        self.job_hooks = {'progress': [], 'postprocessor': [], 'post': []}
+        super().__init__(params, auto_init)
+        super().add_progress_hook(lambda d: self.call_hooks('progress', d))
+        # Also reaches the post-processors created above, as later ones get it from set_downloader
+        super().add_postprocessor_hook(lambda d: self.call_hooks('postprocessor', d))
+        super().add_post_hook(lambda filename: self.call_hooks('post', filename))
+        self.extractor_calls = 0
+        self.audio_streamer = None
+        self.audio_feed = None
+        self.add_progress_hook(self.feed_audio)
+        self.postprocess_pool = None
+        self.pending_postprocess = []
+        self.pool_thread = threading.local()
+        self.tracer = None
+        self.extracting = None
+        self.traced_entry = {}
+        self.selecting = False
+        self.session_pool = None
+        self.bandwidth = None
+        self.scratch = None
+        
+    def reuse(self, params):
+        """Start a new job on this instance with the job's own options (see ``session_pool.JOB_KEYS``)"""
+        for key in JOB_KEYS:
+            self.params.pop(key, None)
+        self.params.update({key: params[key] for key in JOB_KEYS if key in params})
+        self._parse_outtmpl()
+        self.format_selector = (
+            self.params.get('format') if self.params.get('format') in (None, '-')
+            else self.build_format_selector(self.params['format']))
+        self.job_hooks = {kind: [] for kind in self.job_hooks}
+        for hook in self.params.get('progress_hooks', []):
+            self.add_progress_hook(hook)
+        self.add_progress_hook(self.feed_audio)
+        for hook in self.params.get('postprocessor_hooks', []):
+            self.add_postprocessor_hook(hook)
+        for hook in self.params.get('post_hooks', []):
+            self.add_post_hook(hook)
+        # The engine passes its archive as a container, never as a file name; an empty one is falsy
+        archive = self.params.get('download_archive')
+        self.archive = set() if archive is None else archive
+        # autonumber counts the downloads of the job
+        self._num_downloads = 0
+        self.extractor_calls = 0
+        self.pending_postprocess = []
+        self.tracer = None
+        self.extracting = None
+        self.traced_entry = {}
+        self.selecting = False
+        
+    def add_progress_hook(self, ph):
+        self.job_hooks['progress'].append(ph)
+
+    def add_postprocessor_hook(self, ph):
+        self.job_hooks['postprocessor'].append(ph)
+
+    def add_post_hook(self, ph):
+        self.job_hooks['post'].append(ph)
+
+    def call_hooks(self, kind, *args):
+        for hook in self.job_hooks[kind]:
+            hook(*args)
+
+    def close(self):
+        if self.session_pool and self.session_pool.release(self):
+            return
+        super().close()
+        
+    def extract_info(self, url, *args, **kwargs):
+        self.extractor_calls += 1
+        if not self.tracer or self.extracting:
+            return super().extract_info(url, *args, **kwargs)
+        # The span ends where processing starts, so it leaves out the download
+        self.extracting = (time.time(), time.perf_counter(), url)
+        try:
+            return super().extract_info(url, *args, **kwargs)
+        finally:
+            self.end_extract({})
+            
+    def end_extract(self, info):
+        if self.extracting:
+            started, clock, url = self.extracting
+            self.extracting = None
+            self.tracer.record('extract', started, time.perf_counter() - clock,
+                               url=url, **JobTracer.entry_attrs(info))
+        
+    def _select_formats(self, formats, selector):
+        if not self.tracer or self.selecting:
+            return super()._select_formats(formats, selector)
+        self.selecting = True
+        try:
+            with self.tracer.span('format_selection', **self.traced_entry) as attrs:
+                selected = super()._select_formats(formats, selector)
+                attrs['formats'] = [f.get('format_id') for f in selected]
+                return selected
+        finally:
+            self.selecting = False
+        
+    def process_info(self, info_dict):
+        if self.audio_streamer and self.audio_streamer.can_stream(info_dict):
+            # Name the file after what the encoder writes; FFmpegExtractAudio then
+            # finds it already in MP3 and leaves it alone
+            info_dict['ext'] = 'mp3'
+            info_dict['__stream_audio'] = True
+            info_dict.pop('container', None)
+        return super().process_info(info_dict)
+        
+    def process_video_result(self, info_dict, download=True):
+        self.pending_postprocess = []
+        if self.tracer:
+            self.end_extract(info_dict)
+            self.traced_entry = JobTracer.entry_attrs(info_dict)
+        return super().process_video_result(info_dict, download)
+        
+    def post_process(self, filename, info, files_to_move=None):
+        if not self.postprocess_pool:
+            return super().post_process(filename, info, files_to_move)
+        info['filepath'] = filename
+        # The pool works on a copy down to the nested format and download dicts: this
+        # thread goes on using (and comparing) ``info`` while post-processors change theirs
+        future = self.postprocess_pool.submit(self._post_process, filename, plain_copy(info),
+                                              plain_copy(files_to_move))
+        self.pending_postprocess.append(future)
+        info['__postprocess'] = future
+        return info
+        
+    def _post_process(self, filename, info, files_to_move):
+        self.pool_thread.active = True
+        try:
+            return super().post_process(filename, info, files_to_move)
+        except PostProcessingError as e:
+            self.report_error(f'Postprocessing: {e}')
+            raise
+        finally:
+            self.pool_thread.active = False
+        
+    def run_pp(self, pp, infodict):
+        if self.scratch and type(pp) is MoveFilesAfterDownloadPP:
+            pp = StagedMovePP(self, self.scratch, pp._downloaded)
+        elif getattr(self.pool_thread, 'active', False):
+            # Post-processors keep state while they run, and other pool threads run the same ones
+            pp = copy.copy(pp)
+        return super().run_pp(pp, infodict)
+        
+    def record_download_archive(self, info_dict):
+        pending, self.pending_postprocess = self.pending_postprocess, []
+        if self.postprocess_pool and pending:
+            self.postprocess_pool.after(pending, lambda: super(CountingYoutubeDL, self).record_download_archive(info_dict))
+        else:
+            super().record_download_archive(info_dict)
+        
+    def _forceprint(self, key, info_dict):
+        if info_dict is None or self.params['forceprint'].get(key) or self.params['print_to_file'].get(key):
+            return super()._forceprint(key, info_dict)
+        # Nothing to print at this stage: skip rendering the format, thumbnail and
+        # subtitle tables for the templates, which costs more than choosing the formats
+        info_copy = info_dict.copy()
+        info_copy.setdefault('filename', self.prepare_filename(info_dict))
+        if info_dict.get('requested_formats') is not None:
+            info_copy['urls'] = '\n'.join(f['url'] + f.get('play_path', '') for f in info_dict['requested_formats'])
+        elif info_dict.get('url'):
+            info_copy['urls'] = info_dict['url'] + info_dict.get('play_path', '')
+        return info_copy
+        
+    def dl(self, name, info, subtitle=False, test=False):
+        if not self.bandwidth or subtitle or test:
+            return self._dl(name, info, subtitle, test)
+        with self.bandwidth.connections(self, info):
+            return self._dl(name, info, subtitle, test)
+            
+    def _dl(self, name, info, subtitle=False, test=False):
+        if info.get('__stream_audio') and not subtitle and not test:
+            return self.audio_streamer.download(
+                self, name, info, lambda: super(CountingYoutubeDL, self).dl(name, info, subtitle, test))
+        return super().dl(name, info, subtitle, test)
+        
+    def feed_audio(self, d):
+        if self.audio_feed:
+            self.audio_feed(d)
+
+
+class DownloadEngine:
+    """Runs download jobs without any user interface.
+
+    ``emit(msg_type, msg)`` receives the job events ('info', 'error', 'plan',
+    'video_complete', 'postprocess', 'history', 'stats', 'complete',
+    'cancelled') and ``on_progress(key, state)`` the latest progress of each
+    download, keyed by ``(job_id, playlist_index)`` (the index is None for a
+    single video) as engines sharing one callback run side by side; a state
+    of None means the download for that key ended.
+    Both are called from the download threads.
+
+    An engine runs one job at a time. To run jobs concurrently, create one
+    engine per job with ``shared`` set to an existing engine so they all use
+    the same caches and stores. ``ydl_params`` override the default yt-dlp
+    options for every job. ``bandwidth_limit`` (bytes/sec, 0 for none) is
+    shared by all downloads of the engines sharing this one. Playlist entries
+    are merged and converted on a pool of ``postprocess_workers`` (one per
+    core by default) with up to ``postprocess_queue`` entries waiting.
+    Every job is traced into ``metrics`` (see ``JobMetrics``): spans go to
+    ``trace_path`` and the totals to ``metrics_path`` when given.
+    With ``dedup``, finished downloads are recorded in a ``ContentStore`` and
+    playlist entries already downloaded for another playlist are linked into
+    the new playlist folder instead of being downloaded again.
+    With ``reuse_sessions``, YoutubeDL instances are kept in a ``SessionPool``
+    and reused by later jobs with the same options, along with their
+    extractors, cookies and open connections.
+    With ``scratch_dir``, partial files, fragments and post-processing go to
+    a ``ScratchSpace`` there (a local SSD or tmpfs) and only finished files
+    are moved to the output directory. Playlist entries wait for scratch
+    space before they start; ``scratch_min_free`` bytes are kept free.
+    With ``lanes`` set (a ``job_queue.JobQueue``, for playlist jobs of its
+    bulk lane), playlist entries pause while ``lanes.bulk_paused()`` and
+    wait in ``lanes.wait_for_bulk``.
+    """
+
+    def __init__(self, emit, on_progress, shared=None, ydl_params=None, bandwidth_limit=0,
+                 postprocess_workers=None, postprocess_queue=None, trace_path=None, metrics_path=None,
+                 dedup=True, reuse_sessions=True, scratch_dir=None, scratch_min_free=512 * 1024 * 1024):
+        self.emit = emit
+        self.on_progress = on_progress
+        self.ydl_params = ydl_params or {}
+        self.current_video_number = 0
+        self.total_playlist_videos = 0
+        self.current_job_id = None
+        self.partial_entries = set()
+        self.cancelled = threading.Event()
+        self.scheduler = None
+        self.audio_streamer = None
+        self.format_planner = None
+        self.postprocess_workers = postprocess_workers
+        self.postprocess_queue = postprocess_queue
+        self.postprocess_pool = None
+        self.estimate = None
+        self.estimate_emitted = 0
+        self.tracer = None
+        self.archive_variant = None
+        self.download_seconds = {}
+        self.dedup_lock = threading.Lock()
+        self.dedup = None
+        self.lanes = None
+        self.fragment_seen = {}
+        if shared:
+            self.metadata_cache = shared.metadata_cache
+            self.job_store = shared.job_store
+            self.download_archive = shared.download_archive
+            self.history_store = shared.history_store
+            self.content_store = shared.content_store
+            self.sessions = shared.sessions
+            self.scratch = shared.scratch
+            self.bandwidth = shared.bandwidth
+            self.metrics = shared.metrics
+            return
+        self.bandwidth = BandwidthController(budget=bandwidth_limit)
+        self.metrics = JobMetrics(trace_path, metrics_path)
+        self.metadata_cache = MetadataCache()
+        self.job_store = job_store.JobStore()
+        self.download_archive = DownloadArchive()
+        self.content_store = ContentStore() if dedup else None
+        self.sessions = SessionPool() if reuse_sessions else None
+        self.scratch = ScratchSpace(scratch_dir, scratch_min_free) if scratch_dir else None
+        try:
+            self.history_store = HistoryStore()
+        except Exception as e:
+            print(f"Error loading history: {e}")
+            self.history_store = None
+            
+    @staticmethod
+    def options(url, format_type='mp4', quality='best', template='%(title)s.%(ext)s',
+                output_dir='.', playlist=False, start='1', end='', workers='3', stream_audio=True,
+                shard=None):
+        """Build the options dict of a job, as stored in the job queue.
+
+        ``shard`` is ``[k, n]`` for a job that downloads only every n-th
+        playlist entry of the range, starting with the k-th (from 0), while
+        other workers download the rest (see ``download_worker``).
+        """
+        return {
+            'url': url,
+            'format': format_type,
+            'quality': quality,
+            'template': template,
+            'output_dir': output_dir,
+            'playlist': playlist,
+            'start': start,
+            'end': end,
+            'workers': workers,
+            'stream_audio': stream_audio,
+            'shard': shard,
+        }
+        
+    @staticmethod
+    def check_options(options):
+        """Raise ValueError naming the first option of a job that cannot be downloaded as given"""
+        def count(key, minimum=1):
+            value = options.get(key)
+            if value in ('', None):
+                return None
+            if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).isdigit() \
+                    or int(value) < minimum:
+                raise ValueError(f"{key} must be a whole number of at least {minimum}")
+            return int(value)
+            
+        if not isinstance(options.get('url'), str) or not options['url']:
+            raise ValueError("url must be a non-empty string")
+        if options.get('format') not in QUALITIES:
+            raise ValueError(f"format must be one of {', '.join(QUALITIES)}")
+        if options.get('quality') not in QUALITIES[options['format']]:
+            raise ValueError(f"quality for {options['format']} must be one of "
+                             f"{', '.join(QUALITIES[options['format']])}")
+        for key in ('template', 'output_dir'):
+            if not isinstance(options.get(key), str) or not options[key]:
+                raise ValueError(f"{key} must be a non-empty string")
+        for key in ('playlist', 'stream_audio'):
+            if not isinstance(options.get(key, False), bool):
+                raise ValueError(f"{key} must be true or false")
+        start, end = count('start'), count('end')
+        if start and end and end < start:
+            raise ValueError("end must not come before start")
+        count('workers')
+        shard = options.get('shard')
+        if shard is not None and not (
+                isinstance(shard, (list, tuple)) and len(shard) == 2
+                and all(isinstance(n, int) and not isinstance(n, bool) for n in shard)
+                and 0 <= shard[0] < shard[1]):
+            raise ValueError("shard must be [k, n] with 0 <= k < n")
+        
+    def add_to_history(self, title, format_type, quality):
+        """Append a finished download to the history"""
+        entry = {
+            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'title': title,
+            'format': format_type,
+            'quality': quality
+        }
+        try:
+            with self.tracer.span('history_write'):
+                self.history_store.add(entry)
+        except Exception as e:
+            print(f"Error saving history: {e}")
+        self.emit('history', entry)
+        
+    def get_video_info(self, ydl, url, format_type='mp4', quality='best'):
+        """Extract the URL once without resolving formats or playlist entries.
+
+        The returned info dict is handed back to ``ydl.process_ie_result`` for
+        the actual download, so the URL is never extracted a second time.
+        Results are served from the metadata cache when still fresh. The
+        entries of a playlist listed up front come back as ``EntryRecord``s
+        sized for ``format_type`` and ``quality``.
+        """
+        try:
+            key = cache_key(url)
+            info = self.metadata_cache.get(key)
+            if info:
+                if isinstance(info.get('entries'), list):
+                    info['entries'] = compact_entries(info['entries'], format_type, quality, self.resolver(ydl))
+                return info
+                
+            info = ydl.extract_info(url, download=False, process=False)
+            # Follow plain redirects so the title and duration are available
+            while info and info.get('_type') == 'url':
+                info = ydl.extract_info(info['url'], download=False, process=False,
+                                        ie_key=info.get('ie_key'))
+            if not info:
+                self.emit('error', f"Could not extract information from {url}")
+            elif isinstance(info.get('entries', []), list):
+                # Lazy playlists are cached once their entries are enumerated
+                if 'entries' in info:
+                    # The full entry dicts go right away, before anything copies them
+                    info['entries'] = compact_entries(info['entries'], format_type, quality, self.resolver(ydl))
+                    self.metadata_cache.put(key, ydl.sanitize_info({**info, 'entries': as_entries(info['entries'])}))
+                else:
+                    self.metadata_cache.put(key, ydl.sanitize_info(dict(info)))
+            return info
+        except Exception as e:
+            self.emit('error', str(e))
+            return None
+            
+    def download(self, job_id, options):
+        self.tracer = self.metrics.tracer(job_id)
+        with self.tracer.span('job', url=options['url']) as attrs:
+            self.run_job(job_id, options)
+            attrs['status'] = self.job_store.job_status(job_id)
+        if self.scratch:
+            self.scratch.release_all((job_id,))
+            # Partial files of a cancelled or failed job are kept for the next run
+            if attrs['status'] == job_store.FINISHED:
+                self.scratch.remove_job_dir(job_id)
+        self.metrics.write_metrics()
+            
+    def run_job(self, job_id, options):
+        url = options['url']
+        if not url:
+            self.emit('error', "Please enter a YouTube URL")
+            self.job_store.set_job_status(job_id, job_store.FAILED)
+            return
+        try:
+            self.check_options(options)
+        except ValueError as e:
+            self.emit('error', f"Invalid job options: {e}")
+            self.job_store.set_job_status(job_id, job_store.FAILED)
+            return
+            
+        # Reset playlist counters
+        self.current_video_number = 0
+        self.total_playlist_videos = 0
+        self.current_job_id = job_id
+        self.partial_entries = set()
+        self.fragment_seen = {}
+        self.download_seconds = {}
+        self.dedup = {'linked': 0, 'manifest': 0, 'bytes_saved': 0, 'seconds_saved': 0.0}
+        self.job_store.set_job_status(job_id, job_store.RUNNING)
+        
+        # Skip videos that were already fetched in this format and quality
+        archive = self.download_archive.view(options['format'], options['quality'])
+        self.archive_variant = archive.variant
+        if archive.contains_url(url):
+            self.job_store.set_job_status(job_id, job_store.FINISHED)
+            self.emit('complete', "This video has already been downloaded in this format and quality.")
+            return
+            
+        # Configure yt-dlp options
+        output_dir = options['output_dir']
+        
+        ydl_opts = {
+            'outtmpl': options['template'],
+            'paths': {'home': output_dir},
+            'quiet': True,
+            'progress': True,
+            'progress_hooks': [self.progress_hook],
+            # Add retry options
+            'retries': 10,  # Number of retries for network errors
+            'fragment_retries': 10,  # Number of retries for fragment downloads
+            'retry_sleep': 5,  # Sleep time between retries
+            'socket_timeout': 30,  # Socket timeout in seconds
+            'extractor_retries': 3,  # Number of retries for extractor errors
+            'ignoreerrors': True,  # Continue on download errors
+            'no_warnings': False,  # Show warnings for debugging
+            'verbose': True,  # Show verbose output for debugging
+            'no_check_certificates': True,  # Skip HTTPS certificate validation
+            'prefer_insecure': True,  # Prefer insecure connections if available
+            'throttledratelimit': 100000,  # Rate limit for throttled requests
+            'concurrent_fragment_downloads': 3,  # Starting point, tuned by the bandwidth controller
+            'download_archive': archive,  # Record finished videos and skip them next time
+        }
+        if self.scratch:
+            # Downloads and post-processing happen on scratch; finished files move to output_dir
+            ydl_opts['paths']['temp'] = self.scratch.job_dir(job_id)
+        
+        # Add FFmpeg options if available
+        if os.path.exists(FFMPEG_PATH):
+            ydl_opts.update({
+                'ffmpeg_location': FFMPEG_PATH,
+                'ffprobe_location': FFPROBE_PATH,
+            })
+        
+        # Add playlist options if enabled
+        shard, shards = options.get('shard') or (0, 1)
+        if options['playlist']:
+            start = int(options['start']) if options['start'] else 1
+            end = int(options['end']) if options['end'] else ''
+            ydl_opts.update({
+                # The range (this worker's slice of it, if sharded) is applied
+                # while the playlist is being enumerated
+                'playlist_items': f"{start + shard}:{end}" + (f":{shards}" if shards > 1 else ""),
+                # Start downloading each entry as soon as it is enumerated
+                'lazy_playlist': True,
+            })
+        
+        if options['format'] == "mp3":
+            if not os.path.exists(FFMPEG_PATH):
+                self.emit('error', "FFmpeg is required for MP3 downloads. Please install FFmpeg first.")
+                self.job_store.set_job_status(job_id, job_store.FAILED)
+                return
+            ydl_opts.update({
+                # Plain HTTP(S) audio can be encoded while it downloads
+                'format': 'bestaudio[protocol=https]/bestaudio[protocol=http]/bestaudio/best',
+                'postprocessors': [{
+                    'key': 'FFmpegExtractAudio',
+                    'preferredcodec': 'mp3',
+                    'preferredquality': options['quality'].replace('kbps', ''),
+                }],
+            })
+        else:
+            quality = options['quality']
+            if quality == "best":
+                format_str = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best'
+            else:
+                height = quality.replace('p', '')
+                format_str = f'bestvideo[height<={height}][ext=mp4]+bestaudio[ext=m4a]/best[height<={height}][ext=mp4]/best[ext=mp4]'
+            ydl_opts['format'] = format_str
+        ydl_opts.update(self.ydl_params)
+        self.audio_streamer = None
+        if options['format'] == "mp3" and options.get('stream_audio', True):
+            self.audio_streamer = AudioStreamer(FFMPEG_PATH, options['quality'].replace('kbps', ''))
+        # The format string stays as the fallback for videos the planner cannot judge
+        self.format_planner = None
+        if 'format' not in self.ydl_params:
+            self.format_planner = FormatPlanner(options['format'], options['quality'], ydl_opts['format'],
+                                                on_plan=lambda plan: self.emit('plan', plan.summary()))
+            
+        try:
+            with self.make_ydl(ydl_opts) as ydl:
+                # Single extraction pass shared by the info display, the
+                # playlist setup and the download itself
+                info = self.get_video_info(ydl, url, options['format'], options['quality'])
+                if not info:
+                    self.job_store.set_job_status(job_id, job_store.FAILED)
+                    return
+                    
+                title = info.get('title') or 'Unknown Title'
+                self.emit('info', {
+                    'title': title,
+                    'duration': int(info.get('duration') or 0)
+                })
+                
+                # If playlist download is enabled, create a playlist folder
+                if options['playlist'] and 'entries' in info:
+                    try:
+                        playlist_title = info.get('title') or 'Playlist'
+                        # Clean the playlist title to make it a valid folder name
+                        playlist_title = re.sub(r'[<>:"/\\|?*]', '_', playlist_title)
+                        if not playlist_title.strip('. '):
+                            # The title comes from the site: '..' would be the output folder's parent
+                            playlist_title = re.sub(r'[. ]', '_', playlist_title) or '_'
+                        playlist_dir = os.path.join(output_dir, playlist_title)
+                        os.makedirs(playlist_dir, exist_ok=True)
+                        ydl.params['paths']['home'] = playlist_dir
+                        
+                        # Entries stay lazy; each one is resolved just before it downloads
+                        if not isinstance(info['entries'], (list, yt_dlp.utils.PagedList)):
+                            info['entries'] = self.record_entries(ydl, info, info['entries'], cache_key(url),
+                                                                  options['format'], options['quality'])
+                        
+                        # Get playlist information (0 when the size is not known up front)
+                        total_videos = info.get('playlist_count') or (
+                            len(info['entries']) if isinstance(info['entries'], list) else 0)
+                        self.total_playlist_videos = total_videos
+                        start_idx = int(options['start']) - 1 if options['start'] else 0
+                        end_idx = int(options['end']) - 1 if options['end'] else total_videos or '?'
+                        
+                        # Pre-flight estimate from the listing; entries enumerated
+                        # later are added as they arrive
+                        end = int(options['end']) if options['end'] else None
+                        last = min(filter(None, (end, total_videos)), default=None)
+                        self.estimate = BatchEstimate(
+                            options['format'], options['quality'], playlist_dir,
+                            total=len(range(start_idx + 1 + shard, last + 1, shards)) if last else None,
+                            start=start_idx + 1 + shard, end=end, step=shards,
+                            throughput=self.bandwidth.budget or None)
+                        if isinstance(info['entries'], list):
+                            for index, entry in enumerate(info['entries'], 1):
+                                if entry:
+                                    self.estimate.add_entry(EntryRecord.from_entry(
+                                        index, entry, options['format'], options['quality']))
+                        
+                        # Update status with playlist information
+                        self.emit('info', {
+                            'title': f"Playlist: {playlist_title}",
+                            'duration': 0,
+                            'total_videos': total_videos or '?',
+                            'start_idx': start_idx + 1,
+                            'end_idx': end_idx,
+                            'current_video': start_idx + 1
+                        })
+                        self.emit_estimate(force=True)
+                        
+                        # Modify template to include video number for playlists
+                        template = options['template']
+                        if '%(playlist_index)s' not in template:
+                            # Add playlist index at the start of the filename
+                            template = '%(playlist_index)s. ' + template
+                        ydl.params['outtmpl']['default'] = template
+                    except Exception as e:
+                        self.emit('error', f"Error getting playlist info: {str(e)}")
+                        self.job_store.set_job_status(job_id, job_store.FAILED)
+                        return
+                
+                if options['playlist'] and 'entries' in info:
+                    workers = int(options['workers']) if options['workers'] else 1
+                    # Entries finished by an earlier run of this job are skipped
+                    finished = self.job_store.finished_entries(job_id)
+                    scheduler = DownloadScheduler(self.make_ydl, {
+                        **ydl_opts,
+                        'paths': dict(ydl.params['paths']),
+                        'outtmpl': ydl.params['outtmpl']['default'],
+                    }, workers=workers, skip=finished.__contains__,
+                       on_finished=lambda index, result: self.finish_entry(job_id, index, result),
+                       on_skipped=self.skip_entry,
+                       reuse=(lambda entry, extra_info: self.reuse_entry(ydl, job_id, entry, extra_info))
+                       if self.content_store else None,
+                       admit=(lambda playlist_index: self.admit_entry(job_id, playlist_index, scheduler.stopped))
+                       if self.scratch else None,
+                       on_failed=(lambda playlist_index: self.scratch.release((job_id, playlist_index)))
+                       if self.scratch else None,
+                       hold=self.lanes.wait_for_bulk if self.lanes else None)
+                    self.scheduler = scheduler
+                    # Workers hand merges and conversions to the pool and go on downloading
+                    pool = self.postprocess_pool = PostProcessPool(
+                        self.postprocess_workers, self.postprocess_queue,
+                        on_progress=lambda state: self.emit('postprocess', state))
+                    try:
+                        scheduler.run(ydl, info)
+                    finally:
+                        try:
+                            # Entries still being converted are part of the job
+                            pool.close(cancel=self.cancelled.is_set())
+                        finally:
+                            # Only once the conversions and their archive records are done with them
+                            scheduler.close()
+                        self.postprocess_pool = None
+                        self.emit_estimate(force=True)
+                        self.estimate = None
+                    if self.cancelled.is_set():
+                        raise DownloadCancelled()
+                    skipped = scheduler.skipped
+                    extractor_calls = ydl.extractor_calls + scheduler.extractor_calls
+                    postprocess = pool.stats()
+                    # Entries that failed to download or to convert are left for the next run
+                    failures = scheduler.failures + postprocess['failed']
+                else:
+                    if isinstance(info.get('entries'), list):
+                        # A playlist downloaded without the playlist option
+                        info['entries'] = as_entries(info['entries'])
+                    result = ydl.process_ie_result(info, download=True)
+                    if result and result.get('requested_downloads'):
+                        self.store_content(result['requested_downloads'][-1])
+                    skipped = 0
+                    extractor_calls = ydl.extractor_calls
+                    postprocess = None
+                    failures = 0
+            self.emit('stats', {
+                'url': url,
+                'extractor_calls': extractor_calls,
+                'skipped': skipped,
+                'failures': failures,
+                'metadata_cache': self.metadata_cache.stats(),
+                'postprocess': postprocess,
+                'dedup': dict(self.dedup),
+                'sessions': self.sessions.stats() if self.sessions else None,
+                'scratch': self.scratch.stats() if self.scratch else None,
+            })
+            if failures:
+                # Resumed with the rest of the unfinished jobs; its partial files stay
+                self.job_store.set_job_status(job_id, job_store.PARTIAL)
+                self.emit('error', f"{failures} playlist video(s) could not be downloaded; "
+                                   "resume the download to try them again")
+                return
+            self.job_store.set_job_status(job_id, job_store.FINISHED)
+            self.add_to_history(title, options['format'], options['quality'])
+            self.emit('complete', "Download completed successfully!")
+        except DownloadCancelled:
+            self.job_store.set_job_status(job_id, job_store.CANCELLED)
+            self.emit('cancelled', "Download cancelled")
+        except Exception as e:
+            self.job_store.set_job_status(job_id, job_store.FAILED)
+            self.emit('error', str(e))
+            
+    def make_ydl(self, params):
+        """Create (or take from the session pool) a YoutubeDL whose retries, fragments and bandwidth the controller manages"""
+        if self.sessions:
+            ydl = self.sessions.acquire(params, CountingYoutubeDL)
+            ydl.session_pool = self.sessions
+        else:
+            ydl = CountingYoutubeDL(params)
+        ydl.audio_streamer = self.audio_streamer
+        ydl.postprocess_pool = self.postprocess_pool
+        ydl.scratch = self.scratch
+        ydl.bandwidth = self.bandwidth
+        if self.format_planner:
+            ydl.format_selector = self.format_planner.selector(ydl)
+        self.bandwidth.attach(ydl)
+        if self.tracer:
+            # After the controller, whose retry backoff the tracer counts
+            ydl.tracer = self.tracer
+            self.tracer.attach(ydl)
+        return ydl
+        
+    def cancel(self):
+        """Stop the running job at the next progress update; safe to call from any thread"""
+        self.cancelled.set()
+        if self.scheduler:
+            self.scheduler.stop()
+            
+    def finish_entry(self, job_id, playlist_index, result):
+        downloads = result.get('requested_downloads') or [{}]
+        
+        def record():
+            # The post-processed info names the final file
+            future = downloads[-1].get('__postprocess')
+            final = future.result() if future else downloads[-1]
+            self.job_store.set_entry_status(job_id, playlist_index, job_store.FINISHED,
+                                            final.get('filepath'))
+            self.store_content(final)
+            self.emit_estimate()
+            
+        # An entry only counts as finished once its post-processing succeeded
+        futures = [d['__postprocess'] for d in downloads if d.get('__postprocess')]
+        if self.postprocess_pool:
+            self.postprocess_pool.after(futures, record)
+        else:
+            record()
+        if self.scratch:
+            # Its scratch space is free once its files left, whether post-processing succeeded or not
+            def release(_=None):
+                self.scratch.release((job_id, playlist_index))
+            for future in futures:
+                future.add_done_callback(release)
+            if not futures:
+                release()
+            
+    def admit_entry(self, job_id, playlist_index, stopped):
+        """Wait until the scratch space can take a playlist entry of the size the estimate expects"""
+        size = self.estimate.expected_bytes(playlist_index) if self.estimate else None
+        # The separate video and audio downloads of a merge sit next to the merged file
+        self.scratch.acquire((job_id, playlist_index), 2 * (size or 0), stopped)
+            
+    def store_content(self, info):
+        """Record a finished download in the content store, hashing the final file"""
+        path = info.get('filepath')
+        seconds = self.download_seconds.pop(info.get('id'), 0)
+        if not self.content_store or not path or not info.get('extractor_key') or not os.path.exists(path):
+            return
+        key = f"{make_archive_id(info['extractor_key'], info['id'])} {self.archive_variant}"
+        try:
+            saved = self.content_store.add(key, path, info.get('title'), seconds, template_fields(info))
+        except Exception as e:
+            print(f"Error recording {path} in the content store: {e}")
+            return
+        if saved:
+            with self.dedup_lock:
+                self.dedup['bytes_saved'] += saved
+                
+    def reuse_entry(self, ydl, job_id, entry, extra_info):
+        """Link a playlist entry stored by an earlier download into this playlist's folder"""
+        archive_id = ydl._make_archive_id(entry)
+        stored = archive_id and self.content_store.lookup(f"{archive_id} {self.archive_variant}")
+        if not stored:
+            return False
+        # Named by this job's template, as if it had been downloaded here; the playlist
+        # entry is only a compact record (its title may be the listing's), the stored
+        # download has the fields the real download was named from
+        dest = ydl.prepare_filename({
+            **entry, **stored['fields'], **extra_info,
+            'title': stored['title'] or entry.get('title'),
+            'ext': os.path.splitext(stored['path'])[1][1:],
+        })
+        if os.path.dirname(os.path.abspath(stored['path'])) == os.path.dirname(os.path.abspath(dest)):
+            # Downloaded into this folder already, e.g. by an earlier run of the playlist:
+            # nothing to link, the download archive skips it
+            return False
+        try:
+            how = self.content_store.link(stored, dest)
+        except OSError as e:
+            print(f"Error linking {stored['path']} to {dest}: {e}")
+            return False
+        self.job_store.set_entry_status(job_id, extra_info['playlist_index'], job_store.FINISHED, dest)
+        if how:
+            with self.dedup_lock:
+                self.dedup['linked' if how == 'hardlink' else 'manifest'] += 1
+                self.dedup['bytes_saved'] += stored['size']
+                self.dedup['seconds_saved'] += stored['seconds']
+        return True
+        
+    def skip_entry(self, playlist_index):
+        if self.estimate:
+            self.estimate.skip(playlist_index)
+            self.emit_estimate()
+            
+    def emit_estimate(self, force=False):
+        """Send the current batch estimate, at most a couple of times per second unless forced"""
+        estimate = self.estimate
+        if not estimate or not force and time.monotonic() - self.estimate_emitted < 0.5:
+            return
+        self.estimate_emitted = time.monotonic()
+        self.emit('estimate', estimate.snapshot())
+        
+    def run_jobs(self, jobs):
+        for job_id, options in jobs:
+            self.download(job_id, options)
+            
+    @staticmethod
+    def resolver(ydl):
+        """Check whether a complete playlist entry's page extracts to the same video again"""
+        def resolvable(url, ie_key):
+            # The generic extractor would find the whole playlist on the page
+            if not ie_key or ie_key == 'Generic':
+                return False
+            try:
+                return ydl.get_info_extractor(ie_key).suitable(url)
+            except Exception:
+                return False
+        return resolvable
+        
+    def record_entries(self, ydl, info, source, key, format_type, quality):
+        """Yield playlist entries as compact records as they are enumerated, caching the listing once complete"""
+        entries = []
+        resolvable = self.resolver(ydl)
+        for index, entry in enumerate(source, 1):
+            entry = compact_entry(index, entry, format_type, quality, resolvable)
+            entries.append(entry)
+            if self.estimate and entry:
+                self.estimate.add_entry(EntryRecord.from_entry(index, entry, format_type, quality))
+                self.emit_estimate()
+            yield entry
+        self.emit_estimate(force=True)
+        self.metadata_cache.put(key, ydl.sanitize_info({**info, 'entries': as_entries(entries)}))
+        
+    def pause_point(self, playlist_index, d):
+        """Whether the entry should pause at this progress update.
+
+        A fragmented download pauses when a new fragment starts, the earlier
+        ones being complete in the partial file, and a plain one anywhere
+        (it resumes with a range request). That includes an MP3 encoded while
+        it downloads: its encoder is stopped, the partial download is kept
+        and the resumed download is encoded from its start again (see
+        ``audio_stream.AudioStreamer``). Fragments downloaded in parallel
+        report from yt-dlp's threads, where the download cannot be stopped
+        cleanly; such a download runs to its end.
+        """
+        key = d.get('tmpfilename')
+        fragment = d.get('fragment_index')
+        boundary = fragment is None or self.fragment_seen.get(key, fragment) != fragment
+        self.fragment_seen[key] = fragment
+        return (boundary and self.lanes.bulk_paused()
+                and self.scheduler is not None and self.scheduler.current_entry() == playlist_index)
+        
+    def progress_hook(self, d):
+        if self.cancelled.is_set():
+            raise DownloadCancelled()
+        # Playlist workers report their own entry through the info dict
+        playlist_index = d.get('info_dict', {}).get('playlist_index')
+        if d['status'] == 'downloading':
+            if playlist_index and self.lanes and self.pause_point(playlist_index, d):
+                self.on_progress((self.current_job_id, playlist_index), None)
+                raise EntryPaused()
+            try:
+                total = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+                downloaded = d.get('downloaded_bytes', 0)
+                if total > 0:
+                    progress = (downloaded / total) * 100
+                    # Add playlist index to progress message if available
+                    if playlist_index:
+                        # Remember the partial file so a restart can continue it
+                        if playlist_index not in self.partial_entries:
+                            self.partial_entries.add(playlist_index)
+                            self.job_store.set_entry_status(self.current_job_id, playlist_index,
+                                                            job_store.DOWNLOADING,
+                                                            d.get('tmpfilename'))
+                        # Update current video number
+                        current_video = playlist_index
+                        if current_video != self.current_video_number:
+                            self.current_video_number = current_video
+                        self.on_progress((self.current_job_id, current_video), {
+                            'progress': progress,
+                            'playlist_index': current_video,
+                            'title': d.get('filename', ''),
+                            'total_videos': self.total_playlist_videos
+                        })
+                    else:
+                        self.on_progress((self.current_job_id, None), progress)
+            except:
+                pass
+        elif d['status'] == 'finished':
+            # Video finished downloading; the content store keeps how long it took
+            self.fragment_seen.pop(d.get('tmpfilename'), None)
+            video_id = d.get('info_dict', {}).get('id')
+            self.download_seconds[video_id] = self.download_seconds.get(video_id, 0) + (d.get('elapsed') or 0)
+            if playlist_index:
+                if self.estimate:
+                    self.estimate.add_downloaded(
+                        playlist_index, d.get('total_bytes') or d.get('downloaded_bytes') or 0)
+                self.on_progress((self.current_job_id, playlist_index), None)
+                self.emit('video_complete', {
+                    'job_id': self.current_job_id,
+                    'playlist_index': playlist_index,
+                    'total_videos': self.total_playlist_videos
+                })
+            else:
+                self.on_progress((self.current_job_id, None), None)
@@ -0,0 +1,186 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from yt_dlp.utils import DownloadCancelled, PlaylistEntries
+
+from playlist_entries import EntryRecord
+
+
+class EntryPaused(DownloadCancelled):
+    """Raised from a progress hook to pause the entry downloading on this thread"""
+
+
+class DownloadScheduler:
+    """Download playlist entries in parallel on a bounded pool of workers.
+
+    Every worker thread owns its own YoutubeDL instance created by
+    ``ydl_factory(params)``; the factory is where connections are budgeted
+    (see ``BandwidthController.connections``), so adding workers never
+    multiplies the number of open connections.
+
+    Entries found in the download archive of ``ydl`` are left out before any
+    network work, as are those for which ``skip(playlist_index)`` is true,
+    and ``on_skipped(playlist_index)`` is called for each of them;
+    ``on_finished(playlist_index, result)`` is called from the worker once an
+    entry has been downloaded. Before that, ``reuse(entry, extra_info)`` may
+    provide an entry from an earlier download instead; when it returns true
+    the entry counts as reused and skipped. ``admit(playlist_index)`` is
+    called before an entry is dispatched and may block until there is room
+    for it (see ``staging.ScratchSpace``); ``on_failed(playlist_index)`` is
+    called for entries that were dispatched but not downloaded.
+
+    ``hold(stopped)`` blocks while playlist entries should give way to more
+    urgent downloads (see ``job_queue.JobQueue``); no entry is dispatched
+    meanwhile. An entry whose download raises ``EntryPaused`` waits there
+    too and is then downloaded again, continuing from its partial file.
+    """
+
+    def __init__(self, ydl_factory, ydl_opts, workers=3, skip=None, on_finished=None, on_skipped=None,
+                 reuse=None, admit=None, on_failed=None, hold=None):
+        self.ydl_factory = ydl_factory
+        self.skip = skip
+        self.reuse = reuse
+        self.on_skipped = on_skipped
+        self.on_finished = on_finished
+        self.admit = admit
+        self.on_failed = on_failed
+        self.hold = hold
+        self.workers = max(1, workers)
+        self.ydl_opts = dict(ydl_opts)
+        self.local = threading.local()
+        self.instances = []
+        self.instances_lock = threading.Lock()
+        self.closed_extractor_calls = 0
+        self.failures = 0
+        self.skipped = 0
+        self.reused = 0
+        self.paused = 0
+        self.stopped = threading.Event()
+
+    def _worker_ydl(self):
+        ydl = getattr(self.local, 'ydl', None)
+        if ydl is None:
+            ydl = self.local.ydl = self.ydl_factory(self.ydl_opts)
+            with self.instances_lock:
+                self.instances.append(ydl)
+        return ydl
+
+    def _download_entry(self, entry, extra_info):
+        if self.stopped.is_set():
+            if self.on_failed:
+                self.on_failed(extra_info['playlist_index'])
+            return
+        self.local.entry = extra_info['playlist_index']
+        try:
+            while True:
+                try:
+                    result = self._worker_ydl().process_ie_result(entry, download=True, extra_info=extra_info)
+                    break
+                except EntryPaused:
+                    pass
+                # Out of the handler, so the paused download's connection is already closed
+                with self.instances_lock:
+                    self.paused += 1
+                if self.hold:
+                    self.hold(self.stopped)
+                if self.stopped.is_set():
+                    result = None
+                    break
+        except Exception as e:
+            if not self.stopped.is_set():
+                print(f"Error downloading playlist item {extra_info['playlist_index']}: {e}")
+            result = None
+        finally:
+            self.local.entry = None
+        if not result:
+            with self.instances_lock:
+                self.failures += 1
+            if self.on_failed:
+                self.on_failed(extra_info['playlist_index'])
+        elif self.on_finished:
+            self.on_finished(extra_info['playlist_index'], result)
+
+    def run(self, ydl, info):
+        """Download the requested entries of the playlist ``info``.
+
+        ``ydl`` is only used to enumerate the entries, honouring its
+        ``playlist_items`` range lazily; nothing is downloaded through it.
+        Returns the number of entries that were dispatched.
+        """
+        playlist_count = info.get('playlist_count')
+        playlist_extra = {
+            'playlist': info.get('title') or info.get('id'),
+            'playlist_id': info.get('id'),
+            'playlist_title': info.get('title'),
+            'playlist_count': playlist_count,
+            'n_entries': playlist_count,
+            # Keeps the playlist_index zero-padding consistent across workers
+            '__last_playlist_index': playlist_count or 0,
+        }
+        # Bound the backlog so enumeration stays only a little ahead of the workers
+        slots = threading.BoundedSemaphore(self.workers * 2)
+        dispatched = 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='download') as pool:
+            for autonumber, (playlist_index, entry) in enumerate(
+                    PlaylistEntries(ydl, info).get_requested_items(), 1):
+                if self.stopped.is_set():
+                    break
+                if not entry:
+                    continue
+                if isinstance(entry, EntryRecord):
+                    entry = entry.as_entry()
+                extra_info = {
+                    **playlist_extra,
+                    'playlist_index': playlist_index,
+                    'playlist_autonumber': autonumber,
+                }
+                if self.skip and self.skip(playlist_index):
+                    reused = False
+                elif self.reuse and self.reuse(entry, extra_info):
+                    reused = True
+                elif ydl.in_download_archive(entry):
+                    reused = False
+                else:
+                    slots.acquire()
+                    if self.hold:
+                        self.hold(self.stopped)
+                    if self.admit:
+                        self.admit(playlist_index)
+                    future = pool.submit(self._download_entry, entry, extra_info)
+                    future.add_done_callback(lambda _: slots.release())
+                    dispatched += 1
+                    continue
+                self.skipped += 1
+                self.reused += reused
+                if self.on_skipped:
+                    self.on_skipped(playlist_index)
+        return dispatched
+
+    def close(self):
+        """Close the workers' YoutubeDL instances.
+
+        Not done by ``run``: post-processing handed off by the workers goes on
+        with their instances (and their download archive) after it returns.
+        """
+        with self.instances_lock:
+            instances, self.instances = self.instances, []
+            # Counted now: a session back in the pool starts over for its next job
+            self.closed_extractor_calls += sum(getattr(ydl, 'extractor_calls', 0) for ydl in instances)
+        for worker_ydl in instances:
+            worker_ydl.close()
+
+    def current_entry(self):
+        """Playlist index of the entry this thread downloads, None off the worker threads
+
+        Progress hooks of fragments downloaded in parallel run on yt-dlp's own
+        threads and get None: only the thread driving a download can stop it cleanly.
+        """
+        return getattr(self.local, 'entry', None)
+
+    def stop(self):
+        """Dispatch no further entries; downloads already running are not interrupted"""
+        self.stopped.set()
+
+    @property
+    def extractor_calls(self):
+        return self.closed_extractor_calls + sum(getattr(ydl, 'extractor_calls', 0) for ydl in self.instances)
@@ -0,0 +1,108 @@
+import os
+import socket
+import threading
+
+import job_store
+
+
+def worker_name():
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+class DownloadWorker:
+    """Downloads tasks claimed from a shared work queue (see ``work_queue``), one at a time.
+
+    Every task runs as a job of ``engine`` (its own job store, caches and
+    stores on this host), with the playlist shard the task was split into.
+    While it runs, the lease is renewed every ``heartbeat`` seconds; when a
+    renewal finds the task taken by another worker (this one was presumed
+    dead), the job is cancelled. Files go to the task's output directory,
+    which on shared storage lets a worker that takes over a task skip the
+    entries already downloaded and continue the partial ones.
+
+    ``on_task(task, job_id)`` is called before each task starts. A task
+    that raises is reported failed, and an unreachable queue is asked again
+    after ``poll`` seconds, so the worker keeps going either way.
+
+    ``run`` returns once ``stop()`` was called or, with ``until_drained``,
+    when no task is queued or leased any more; while other workers hold
+    leases, it keeps polling so it can take over theirs if they die.
+    """
+
+    def __init__(self, queue, engine, name=None, lease=60, heartbeat=15, poll=2.0, on_task=None):
+        self.queue = queue
+        self.engine = engine
+        self.name = name or worker_name()
+        self.lease = lease
+        self.heartbeat = heartbeat
+        self.poll = poll
+        self.on_task = on_task
+        self.stopped = threading.Event()
+        self.tasks = 0
+        self.lost = 0
+
+    def run(self, until_drained=False):
+        while not self.stopped.is_set():
+            try:
+                task = self.queue.claim(self.name, self.lease)
+                counts = None if task else self.queue.counts()
+            except Exception as e:
+                print(f"Could not reach the work queue: {e}")
+                self.stopped.wait(self.poll)
+                continue
+            if task:
+                self.run_task(task)
+                continue
+            if until_drained and not counts.get('queued') and not counts.get('leased'):
+                return
+            self.stopped.wait(self.poll)
+
+    def run_task(self, task):
+        try:
+            status = self._download(task)
+        except Exception as e:
+            print(f"Task {task['id']} failed: {e}")
+            status = job_store.FAILED
+        self.tasks += 1
+        try:
+            self.queue.complete(task['id'], self.name, status)
+        except Exception as e:
+            # The lease runs out and the task goes to the next worker
+            print(f"Could not report the end of task {task['id']}: {e}")
+
+    def _download(self, task):
+        options = dict(task['options'], shard=[task['shard'], task['shards']])
+        job_id = self.engine.job_store.add_job(options)
+        if self.on_task:
+            self.on_task(task, job_id)
+        done = threading.Event()
+        renewer = threading.Thread(target=self._renew, args=(task, done), daemon=True)
+        renewer.start()
+        try:
+            self.engine.download(job_id, options)
+        except Exception:
+            self.engine.job_store.set_job_status(job_id, job_store.FAILED)
+            raise
+        finally:
+            done.set()
+            renewer.join()
+            # A lost lease cancelled this job only
+            self.engine.cancelled.clear()
+        return self.engine.job_store.job_status(job_id)
+
+    def _renew(self, task, done):
+        while not done.wait(self.heartbeat):
+            try:
+                owned = self.queue.heartbeat(task['id'], self.name, self.lease)
+            except Exception as e:
+                # The lease may still be renewed in time; if not, the next answer says so
+                print(f"Could not renew the lease of task {task['id']}: {e}")
+                continue
+            if not owned:
+                self.lost += 1
+                self.engine.cancel()
+                return
+
+    def stop(self):
+        """Finish the running task, then return from ``run``"""
+        self.stopped.set()
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+
+# FFmpeg path configuration
+FFMPEG_PATH = r"C:\ffmpeg\bin\ffmpeg.exe"
+FFPROBE_PATH = r"C:\ffmpeg\bin\ffprobe.exe"
+
+
+def probe_ffmpeg(path=FFMPEG_PATH, cache_path='ffmpeg_probe.json'):
+    """Return ``{'path', 'available', 'version'}`` for the ffmpeg at ``path``.
+
+    Running ``ffmpeg -version`` costs a process start, so the result is kept
+    in ``cache_path`` and reused until the executable's size or modification
+    time changes (or it appears or disappears).
+    """
+    try:
+        stat = os.stat(path)
+        signature = [path, stat.st_size, stat.st_mtime]
+    except OSError:
+        return {'path': path, 'available': False, 'version': None}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('signature') == signature:
+            return cached['result']
+    except (OSError, ValueError):
+        pass
+
+    try:
+        output = subprocess.run([path, '-version'], capture_output=True, text=True, timeout=10,
+                                creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)).stdout
+        first_line = output.splitlines()[0] if output else ''
+        result = {'path': path, 'available': first_line.startswith('ffmpeg'),
+                  'version': first_line.split()[2] if len(first_line.split()) > 2 else None}
+    except (OSError, subprocess.SubprocessError):
+        result = {'path': path, 'available': False, 'version': None}
+    try:
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'signature': signature, 'result': result}, f)
+    except OSError:
+        pass
+    return result
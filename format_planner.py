@@ -0,0 +1,152 @@
+import math
+
+MB = 1024 * 1024
+
+# Rough costs used to compare plans; only their relative size matters
+ASSUMED_THROUGHPUT = 2 * MB  # bytes/sec
+REQUEST_COST = 0.15  # seconds per HTTP request
+FFMPEG_START_COST = 0.3  # seconds to start ffmpeg
+MERGE_THROUGHPUT = 100 * MB  # bytes/sec for a stream-copy merge (read and write everything once)
+TRANSCODE_THROUGHPUT = 2 * MB  # source bytes/sec encoded to MP3 on one core
+FRAGMENT_SIZE = MB  # assumed fragment size when a manifest has not been fetched yet
+
+
+def has_video(f):
+    return f.get('vcodec') not in (None, 'none') or (f.get('height') and f.get('vcodec') is None)
+
+
+def has_audio(f):
+    return f.get('acodec') not in (None, 'none') or (f.get('acodec') is None and f.get('vcodec') is None)
+
+
+def quality_number(quality, unit):
+    """The number in a quality setting such as '720p' or '192kbps', or None when it has none"""
+    try:
+        return int(quality[:-len(unit)]) if quality.endswith(unit) else None
+    except (AttributeError, ValueError):
+        return None
+
+
+def estimated_bytes(f):
+    return f.get('filesize') or f.get('filesize_approx')
+
+
+def estimated_requests(f):
+    if f.get('protocol', 'https') in ('http', 'https'):
+        return 1
+    if f.get('fragments'):
+        return len(f['fragments'])
+    return max(1, math.ceil((estimated_bytes(f) or 0) / FRAGMENT_SIZE))
+
+
+class FormatPlan:
+    """Formats to download plus what fetching and finishing them is estimated to cost"""
+
+    def __init__(self, formats, transcode=False, throughput=None):
+        self.formats = formats
+        self.merge = len(formats) > 1
+        self.transcode = transcode
+        sizes = [estimated_bytes(f) for f in formats]
+        self.bytes = sum(sizes) if all(sizes) else None
+        self.requests = sum(estimated_requests(f) for f in formats)
+        size = self.bytes if self.bytes is not None else math.inf
+        self.cost = size / (throughput or ASSUMED_THROUGHPUT) + self.requests * REQUEST_COST
+        if self.merge:
+            self.cost += FFMPEG_START_COST + size / MERGE_THROUGHPUT
+        if self.transcode:
+            self.cost += FFMPEG_START_COST + size / TRANSCODE_THROUGHPUT
+
+    @property
+    def spec(self):
+        """The plan as a yt-dlp format string"""
+        return '+'.join(f['format_id'] for f in self.formats)
+
+    def summary(self):
+        main = self.formats[0]
+        steps = ['merge' if self.merge else 'single file'] + (['transcode'] if self.transcode else [])
+        return {
+            'format': self.spec,
+            'description': f"{self.spec} ({main.get('resolution') or main.get('ext')}, {', '.join(steps)})",
+            'bytes': self.bytes,
+            'requests': self.requests,
+            'merge': self.merge,
+            'transcode': self.transcode,
+            'cost': round(self.cost, 2) if self.cost != math.inf else None,
+        }
+
+
+def plan_video(formats, quality, throughput=None):
+    """Cheapest MP4 plan reaching the best height allowed by ``quality`` ('best' or e.g. '720p')"""
+    max_height = None if quality == 'best' else quality_number(quality, 'p')
+    if quality != 'best' and max_height is None:
+        return None
+    videos = [f for f in formats if has_video(f) and f.get('height') and f.get('ext') == 'mp4'
+              and (max_height is None or f['height'] <= max_height)]
+    if not videos:
+        return None
+    height = max(f['height'] for f in videos)
+    fps = max(f.get('fps') or 0 for f in videos if f['height'] == height)
+    target = [f for f in videos if f['height'] == height and (f.get('fps') or 0) == fps]
+    audios = [f for f in formats if has_audio(f) and not has_video(f) and f.get('ext') == 'm4a']
+    best_audio = max(audios, key=lambda f: f.get('abr') or f.get('tbr') or 0, default=None)
+
+    plans = [FormatPlan([f], throughput=throughput) for f in target if has_audio(f)]
+    if best_audio:
+        plans += [FormatPlan([f, best_audio], throughput=throughput) for f in target if not has_audio(f)]
+    return min(plans, key=lambda plan: plan.cost, default=None)
+
+
+def plan_audio(formats, quality, throughput=None):
+    """Cheapest MP3 plan whose source bitrate is at least ``quality`` (e.g. '192kbps')"""
+    target = quality_number(quality, 'kbps')
+    if target is None:
+        return None
+    audios = [f for f in formats if has_audio(f) and not has_video(f)]
+    bitrate = lambda f: f.get('abr') or f.get('tbr') or 0
+    candidates = [f for f in audios if bitrate(f) >= target] or sorted(audios, key=bitrate)[-1:]
+    if not candidates:
+        # No separate audio stream: convert the smallest muxed file
+        candidates = [f for f in formats if has_audio(f)]
+    plans = [FormatPlan([f], transcode=f.get('acodec') != 'mp3', throughput=throughput) for f in candidates]
+    return min(plans, key=lambda plan: plan.cost, default=None)
+
+
+class FormatPlanner:
+    """yt-dlp format selector that downloads the cheapest plan for each video.
+
+    A ``bestvideo+bestaudio`` format string means two downloads and an
+    ffmpeg merge even when a single muxed MP4 of the same height exists.
+    The planner compares the plans that reach the best height allowed by
+    the quality setting (for MP3, a source bitrate at least as high as the
+    target) using the formats yt-dlp already extracted, so it costs no
+    extra requests.
+
+    ``on_plan(plan)`` is called with the chosen plan before the download
+    starts. When no plan fits (extractors that report no heights or
+    codecs, or a quality the planner does not understand), the job's
+    regular format string ``fallback`` decides.
+    """
+
+    def __init__(self, format_type, quality, fallback, on_plan=None, throughput=None):
+        self.format_type = format_type
+        self.quality = quality
+        self.fallback = fallback
+        self.on_plan = on_plan
+        self.throughput = throughput
+
+    def selector(self, ydl):
+        """Return a format selector for ``ydl``'s ``format_selector``"""
+        fallback = ydl.build_format_selector(self.fallback)
+
+        def select(ctx):
+            formats = [f for f in ctx['formats'] if not f.get('has_drm') and f.get('format_id')]
+            plan_formats = plan_audio if self.format_type == 'mp3' else plan_video
+            plan = plan_formats(formats, self.quality, self.throughput)
+            if plan is None:
+                yield from fallback(ctx)
+                return
+            if self.on_plan:
+                self.on_plan(plan)
+            yield from ydl.build_format_selector(plan.spec)(ctx)
+
+        return select
@@ -0,0 +1,151 @@
+import json
+import os
+import sqlite3
+import threading
+
+HISTORY_FIELDS = ('date', 'title', 'format', 'quality')
+
+# Full-text index over the searchable columns, kept in sync by triggers
+FTS_SCHEMA = '''
+    CREATE VIRTUAL TABLE history_fts USING fts5(
+        title, format, quality, content='history', content_rowid='id', prefix='2 3');
+    CREATE TRIGGER history_fts_insert AFTER INSERT ON history BEGIN
+        INSERT INTO history_fts (rowid, title, format, quality)
+        VALUES (new.id, new.title, new.format, new.quality);
+    END;
+    CREATE TRIGGER history_fts_delete AFTER DELETE ON history BEGIN
+        INSERT INTO history_fts (history_fts, rowid, title, format, quality)
+        VALUES ('delete', old.id, old.title, old.format, old.quality);
+    END;
+    INSERT INTO history_fts (history_fts) VALUES ('rebuild');
+'''
+
+
+def fts_query(text):
+    """Turn typed text into an FTS5 query where every word, the last one still being typed, is a prefix"""
+    words = text.split()
+    return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+class HistoryStore:
+    """Append-only download history in SQLite.
+
+    Finished downloads are inserted one row at a time and read back in pages,
+    newest first, so neither saving nor displaying the history grows with its
+    size. Entries from the old ``download_history.json`` are imported once.
+
+    ``search`` and ``count`` filter by words in the title, format or quality
+    (an FTS5 index, or LIKE where SQLite lacks FTS5) and by a date range
+    (an index on ``date``), and can fetch any window of the results.
+    """
+
+    def __init__(self, path='download_history.sqlite', legacy_path='download_history.json'):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date TEXT NOT NULL,
+                title TEXT NOT NULL,
+                format TEXT NOT NULL,
+                quality TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE INDEX IF NOT EXISTS history_date ON history (date);
+        ''')
+        self.fts = self.create_fts()
+        self.conn.commit()
+        self.migrate_json(legacy_path)
+
+    def create_fts(self):
+        """Create (and fill, for an existing history) the full-text index; False without FTS5"""
+        if self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'history_fts'").fetchone():
+            return True
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            return False
+        return True
+
+    def migrate_json(self, legacy_path):
+        """Import the old JSON history the first time the store is opened"""
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+                return
+            if os.path.exists(legacy_path):
+                try:
+                    with open(legacy_path, 'r') as f:
+                        entries = json.load(f)
+                    self.conn.executemany(
+                        'INSERT INTO history (date, title, format, quality) VALUES (?, ?, ?, ?)',
+                        [tuple(entry.get(k, '') for k in HISTORY_FIELDS) for entry in entries])
+                except Exception as e:
+                    print(f"Error migrating history: {e}")
+                    return
+            self.conn.execute("INSERT INTO meta VALUES ('json_migrated', '1')")
+            self.conn.commit()
+
+    def add(self, entry):
+        """Append an entry and return its row id"""
+        with self.lock:
+            cursor = self.conn.execute(
+                'INSERT INTO history (date, title, format, quality) VALUES (?, ?, ?, ?)',
+                tuple(entry[k] for k in HISTORY_FIELDS))
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def page(self, before_id=None, limit=200):
+        """Return up to ``limit`` rows ``(id, date, title, format, quality)`` older than ``before_id``"""
+        with self.lock:
+            if before_id is None:
+                return self.conn.execute(
+                    'SELECT id, date, title, format, quality FROM history ORDER BY id DESC LIMIT ?',
+                    (limit,)).fetchall()
+            return self.conn.execute(
+                'SELECT id, date, title, format, quality FROM history WHERE id < ? ORDER BY id DESC LIMIT ?',
+                (before_id, limit)).fetchall()
+
+    def _filter(self, text, date_from, date_to):
+        """WHERE clause and parameters for ``search`` and ``count``"""
+        clauses, params = [], []
+        if text and text.strip():
+            if self.fts:
+                clauses.append('id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)')
+                params.append(fts_query(text))
+            else:
+                for word in text.split():
+                    # % and _ in the search text are meant literally
+                    clauses.append("(title || ' ' || format || ' ' || quality) LIKE ? ESCAPE '\\'")
+                    word = word.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                    params.append(f'%{word}%')
+        if date_from:
+            clauses.append('date >= ?')
+            params.append(date_from)
+        if date_to:
+            clauses.append('date <= ?')
+            # A bare day includes all of that day
+            params.append(date_to + ' 23:59:59' if len(date_to) == 10 else date_to)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def search(self, text='', date_from=None, date_to=None, offset=0, limit=200):
+        """Return rows ``(id, date, title, format, quality)`` matching the filters, newest first,
+        starting at ``offset`` into the results"""
+        where, params = self._filter(text, date_from, date_to)
+        with self.lock:
+            return self.conn.execute(
+                f'SELECT id, date, title, format, quality FROM history{where} '
+                'ORDER BY id DESC LIMIT ? OFFSET ?', (*params, limit, offset)).fetchall()
+
+    def count(self, text='', date_from=None, date_to=None):
+        where, params = self._filter(text, date_from, date_to)
+        with self.lock:
+            return self.conn.execute(f'SELECT COUNT(*) FROM history{where}', params).fetchone()[0]
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute('DELETE FROM history')
+            self.conn.commit()
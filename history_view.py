@@ -0,0 +1,221 @@
+import re
+import sqlite3
+import threading
+import tkinter as tk
+from queue import Empty, Queue
+from tkinter import ttk
+
+# Rows fetched per query, centred on the visible window
+BLOCK_SIZE = 200
+
+COLUMNS = ("Date", "Title", "Format", "Quality")
+COLUMN_WIDTHS = (150, 400, 100, 100)
+
+DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# Milliseconds to wait after the last keystroke before searching
+SEARCH_DELAY = 150
+
+
+class HistoryView(ttk.Frame):
+    """Download history table that only materializes the rows on screen.
+
+    The Treeview holds one item per visible line; scrolling rewrites their
+    values from a block of rows cached around the current position, so a
+    history of 100k entries costs the same as one of 40. The search box
+    filters on words in the title, format and quality as they are typed,
+    and the From/To boxes (YYYY-MM-DD) on the date.
+
+    Counting and fetching run on a worker thread against the HistoryStore
+    given to ``set_store``; results come back through a queue the Tk loop
+    polls, and answers to an outdated search are dropped.
+    """
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.store = None
+        self.filters = {'text': '', 'date_from': None, 'date_to': None}
+        self.generation = 0
+        self.total = 0
+        self.offset = 0
+        self.block_start = 0
+        self.block = []
+        self.pending_start = None
+        self.items = []
+        self.requests = Queue()
+        self.results = Queue()
+        self.search_after = None
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        # Filter bar
+        bar = ttk.Frame(self)
+        bar.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 5))
+        bar.grid_columnconfigure(1, weight=1)
+        ttk.Label(bar, text="Search:").grid(row=0, column=0, sticky="w", padx=(0, 5))
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(bar, textvariable=self.search_var)
+        self.search_entry.grid(row=0, column=1, sticky="ew")
+        ttk.Label(bar, text="From:").grid(row=0, column=2, sticky="w", padx=5)
+        self.from_var = tk.StringVar()
+        self.from_entry = ttk.Entry(bar, textvariable=self.from_var, width=11)
+        self.from_entry.grid(row=0, column=3, sticky="w")
+        ttk.Label(bar, text="To:").grid(row=0, column=4, sticky="w", padx=5)
+        self.to_var = tk.StringVar()
+        self.to_entry = ttk.Entry(bar, textvariable=self.to_var, width=11)
+        self.to_entry.grid(row=0, column=5, sticky="w")
+        self.count_label = ttk.Label(bar, text="")
+        self.count_label.grid(row=0, column=6, sticky="e", padx=(10, 0))
+        for var in (self.search_var, self.from_var, self.to_var):
+            var.trace_add('write', self.on_filter_change)
+
+        self.tree = ttk.Treeview(self, columns=COLUMNS, show="headings", selectmode="browse", height=10)
+        for column, width in zip(COLUMNS, COLUMN_WIDTHS):
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=width)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scrollbar)
+        x_scrollbar = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=x_scrollbar.set)
+        self.tree.grid(row=1, column=0, sticky="nsew")
+        self.scrollbar.grid(row=1, column=1, sticky="ns")
+        x_scrollbar.grid(row=2, column=0, sticky="ew")
+
+        self.tree.bind('<Configure>', self.on_resize)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.tree.bind(sequence, self.on_wheel)
+        self.set_visible_rows(10)
+
+        threading.Thread(target=self.worker, daemon=True).start()
+        self.poll()
+
+    def set_store(self, store):
+        self.store = store
+        self.refresh()
+
+    def refresh(self):
+        """Query again, e.g. after a download was added or the history cleared"""
+        self.generation += 1
+        self.request(self.window_start(), count=True)
+
+    # Worker thread
+
+    def request(self, start, count=False):
+        self.pending_start = start
+        self.requests.put((self.generation, dict(self.filters), start, count))
+
+    def worker(self):
+        while True:
+            generation, filters, start, count = self.requests.get()
+            # Only the newest request is answered; a count asked for its search still is
+            while True:
+                try:
+                    newer = self.requests.get_nowait()
+                except Empty:
+                    break
+                count = newer[3] or (count and newer[0] == generation)
+                generation, filters, start = newer[:3]
+            store = self.store
+            if store is None:
+                continue
+            try:
+                total = store.count(**filters) if count else None
+                rows = store.search(offset=start, limit=BLOCK_SIZE, **filters)
+            except sqlite3.Error as e:
+                # e.g. search text FTS5 cannot parse: show no matches
+                print(f"Error searching history: {e}")
+                total, rows = (0 if count else None), []
+            self.results.put((generation, total, start, rows))
+
+    # Tk thread
+
+    def poll(self):
+        updated = False
+        while True:
+            try:
+                generation, total, start, rows = self.results.get_nowait()
+            except Empty:
+                break
+            if generation != self.generation:
+                continue
+            if total is not None:
+                self.total = total
+                self.count_label['text'] = f"{total} {'entries' if not any(self.filters.values()) else 'matches'}"
+            self.block_start, self.block = start, rows
+            if self.pending_start == start:
+                self.pending_start = None
+            updated = True
+        if updated:
+            self.scroll_to(self.offset)
+        self.after(50, self.poll)
+
+    def on_filter_change(self, *args):
+        if self.search_after:
+            self.after_cancel(self.search_after)
+        self.search_after = self.after(SEARCH_DELAY, self.apply_filters)
+
+    def apply_filters(self):
+        self.search_after = None
+        dates = [value.strip() for value in (self.from_var.get(), self.to_var.get())]
+        # Dates only count once complete
+        date_from, date_to = (value if DATE.match(value) else None for value in dates)
+        self.filters = {'text': self.search_var.get().strip(), 'date_from': date_from, 'date_to': date_to}
+        self.offset = 0
+        self.refresh()
+
+    def window_start(self):
+        """Start of the block to fetch so the visible rows sit in its middle"""
+        return max(0, self.offset - (BLOCK_SIZE - len(self.items)) // 2)
+
+    def set_visible_rows(self, count):
+        count = max(1, count)
+        while len(self.items) < count:
+            self.items.append(self.tree.insert('', 'end', values=('', '', '', '')))
+        while len(self.items) > count:
+            self.tree.delete(self.items.pop())
+        self.scroll_to(self.offset)
+
+    def on_resize(self, event):
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        heading_height = 25
+        rows = (event.height - heading_height) // row_height
+        if rows != len(self.items):
+            self.set_visible_rows(rows)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.scroll_to(round(float(amount) * self.total))
+        elif action == 'scroll':
+            step = len(self.items) if unit == 'pages' else 1
+            self.scroll_to(self.offset + int(amount) * step)
+
+    def on_wheel(self, event):
+        if event.num == 4:
+            lines = -3
+        elif event.num == 5:
+            lines = 3
+        else:
+            lines = -3 * (event.delta // 120 or (1 if event.delta > 0 else -1))
+        self.scroll_to(self.offset + lines)
+        return 'break'
+
+    def scroll_to(self, offset):
+        visible = len(self.items)
+        self.offset = max(0, min(offset, self.total - visible))
+        block_end = self.block_start + len(self.block)
+        for i, item in enumerate(self.items):
+            index = self.offset + i
+            if self.block_start <= index < block_end:
+                values = self.block[index - self.block_start][1:]
+            else:
+                values = ('', '', '', '')
+            self.tree.item(item, values=values)
+        if self.total:
+            self.scrollbar.set(self.offset / self.total, min(1.0, (self.offset + visible) / self.total))
+        else:
+            self.scrollbar.set(0, 1)
+        # Fetch the block around the new position unless it is cached or already asked for
+        last = min(self.offset + visible, self.total)
+        # A short block reaches the end of the results
+        covered = self.block_start <= self.offset and (last <= block_end or len(self.block) < BLOCK_SIZE)
+        if not covered and self.pending_start is None:
+            self.request(self.window_start())
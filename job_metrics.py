@@ -0,0 +1,201 @@
+import json
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+# Stages a job's time is split into, in the order they happen
+STAGES = ('job', 'extract', 'format_selection', 'download', 'postprocess', 'history_write')
+
+
+class JobMetrics:
+    """Timing spans of download jobs, to tell whether extraction, network or ffmpeg is slow.
+
+    Every finished span is appended to ``trace_path`` as one JSON line
+    (stage, job, playlist entry, wall-clock start, duration and the stage's
+    own attributes, e.g. bytes, average and peak speed, retries and
+    fragments for a download). Totals per stage are kept in memory and
+    rendered in the Prometheus text format by ``prometheus()``, which
+    ``write_metrics`` saves to ``metrics_path`` after every job.
+
+    Engines sharing one instance trace into the same files; each job gets
+    its own ``JobTracer`` from ``tracer(job_id)``.
+    """
+
+    def __init__(self, trace_path=None, metrics_path=None):
+        self.metrics_path = metrics_path
+        self.lock = threading.Lock()
+        self.trace = open(trace_path, 'a', encoding='utf-8') if trace_path else None
+        self.stages = {stage: [0, 0.0] for stage in STAGES}  # stage -> [count, seconds]
+        self.errors = dict.fromkeys(STAGES, 0)
+        self.jobs = {}  # final status -> count
+        self.downloaded_bytes = 0
+        self.retries = 0
+        self.fragments = 0
+        self.peak_speed = 0.0
+
+    def tracer(self, job_id):
+        return JobTracer(self, job_id)
+
+    def record(self, stage, job, started, duration, attrs):
+        record = {'stage': stage, 'job': job, 'start': round(started, 3),
+                  'duration': round(duration, 4), **attrs}
+        with self.lock:
+            totals = self.stages.setdefault(stage, [0, 0.0])
+            totals[0] += 1
+            totals[1] += duration
+            if attrs.get('error'):
+                self.errors[stage] = self.errors.get(stage, 0) + 1
+            if stage == 'job':
+                self.jobs[attrs.get('status')] = self.jobs.get(attrs.get('status'), 0) + 1
+            elif stage == 'download':
+                self.downloaded_bytes += attrs.get('bytes') or 0
+                self.retries += attrs.get('retries') or 0
+                self.fragments += attrs.get('fragments') or 0
+                self.peak_speed = max(self.peak_speed, attrs.get('peak_speed') or 0)
+            if self.trace:
+                self.trace.write(json.dumps(record, default=str) + '\n')
+                self.trace.flush()
+
+    def prometheus(self):
+        """Return the totals in the Prometheus text exposition format"""
+        with self.lock:
+            lines = [
+                '# HELP ytdownload_stage_seconds Time spent in each stage of a job.',
+                '# TYPE ytdownload_stage_seconds summary',
+            ]
+            for stage, (count, seconds) in self.stages.items():
+                lines.append(f'ytdownload_stage_seconds_sum{{stage="{stage}"}} {seconds:.6f}')
+                lines.append(f'ytdownload_stage_seconds_count{{stage="{stage}"}} {count}')
+            lines += ['# HELP ytdownload_stage_errors_total Spans that ended with an error.',
+                      '# TYPE ytdownload_stage_errors_total counter']
+            lines += [f'ytdownload_stage_errors_total{{stage="{stage}"}} {count}'
+                      for stage, count in self.errors.items()]
+            lines += ['# HELP ytdownload_jobs_total Jobs by final status.',
+                      '# TYPE ytdownload_jobs_total counter']
+            lines += [f'ytdownload_jobs_total{{status="{status}"}} {count}'
+                      for status, count in self.jobs.items()]
+            for name, kind, help_text, value in (
+                    ('downloaded_bytes_total', 'counter', 'Bytes downloaded.', self.downloaded_bytes),
+                    ('download_retries_total', 'counter', 'HTTP and fragment retries.', self.retries),
+                    ('fragments_total', 'counter', 'Fragments of DASH/HLS downloads.', self.fragments),
+                    ('peak_speed_bytes', 'gauge', 'Fastest download seen, in bytes/sec.', self.peak_speed)):
+                lines += [f'# HELP ytdownload_{name} {help_text}', f'# TYPE ytdownload_{name} {kind}',
+                          f'ytdownload_{name} {value:g}']
+        return '\n'.join(lines) + '\n'
+
+    def write_metrics(self):
+        """Replace ``metrics_path`` (if set) with the current totals"""
+        if not self.metrics_path:
+            return
+        temp_path = f'{self.metrics_path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        os.replace(temp_path, self.metrics_path)
+
+    def close(self):
+        with self.lock:
+            if self.trace:
+                self.trace.close()
+                self.trace = None
+
+
+class _Transfer:
+    """A format download the tracer has seen progress for"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.clock = time.perf_counter()
+        self.peak = 0.0
+        self.fragments = None
+
+
+class JobTracer:
+    """Records the spans of one job; see ``JobMetrics``"""
+
+    def __init__(self, metrics, job_id):
+        self.metrics = metrics
+        self.job_id = job_id
+        self.lock = threading.Lock()
+        self.transfers = {}  # temporary file name -> _Transfer
+        self.retries = weakref.WeakKeyDictionary()  # ydl -> retries since its last download ended
+        self.local = threading.local()
+
+    def record(self, stage, started, duration, **attrs):
+        self.metrics.record(stage, self.job_id, started, duration, attrs)
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        """Time the block as ``stage``; the yielded dict takes further attributes"""
+        started, clock = time.time(), time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs['error'] = str(e) or type(e).__name__
+            raise
+        finally:
+            self.record(stage, started, time.perf_counter() - clock, **attrs)
+
+    def attach(self, ydl):
+        """Trace the downloads, retries and post-processors of ``ydl``; returns ``ydl``"""
+        self.retries[ydl] = 0
+        sleep_functions = ydl.params.get('retry_sleep_functions') or {}
+
+        def counting(sleep):
+            def retry_sleep(n):
+                with self.lock:
+                    self.retries[ydl] = self.retries.get(ydl, 0) + 1
+                return sleep(n) if callable(sleep) else sleep
+            return retry_sleep
+
+        ydl.params['retry_sleep_functions'] = {
+            kind: counting(sleep_functions.get(kind)) for kind in ('http', 'fragment')}
+        ydl.add_progress_hook(lambda d: self.progress_hook(ydl, d))
+        ydl.add_postprocessor_hook(self.postprocessor_hook)
+        return ydl
+
+    @staticmethod
+    def entry_attrs(info):
+        return {'entry': info.get('playlist_index'), 'id': info.get('id')}
+
+    def progress_hook(self, ydl, d):
+        key = d.get('tmpfilename') or d.get('filename')
+        if d['status'] == 'downloading':
+            with self.lock:
+                transfer = self.transfers.get(key)
+                if transfer is None:
+                    transfer = self.transfers[key] = _Transfer()
+                transfer.peak = max(transfer.peak, d.get('speed') or 0)
+                transfer.fragments = d.get('fragment_count') or transfer.fragments
+            return
+        if d['status'] not in ('finished', 'error'):
+            return
+        with self.lock:
+            transfer = self.transfers.pop(key, None) or _Transfer()
+            retries, self.retries[ydl] = self.retries.get(ydl, 0), 0
+        info = d.get('info_dict') or {}
+        duration = d.get('elapsed') or time.perf_counter() - transfer.clock
+        size = d.get('total_bytes') or d.get('downloaded_bytes') or 0
+        attrs = {
+            **self.entry_attrs(info),
+            'format': info.get('format_id'),
+            'bytes': size,
+            'average_speed': round(size / duration) if duration else None,
+            'peak_speed': round(transfer.peak),
+            'retries': retries,
+            'fragments': transfer.fragments,
+        }
+        if d['status'] == 'error':
+            attrs['error'] = 'download failed'
+        self.record('download', transfer.started, duration, **attrs)
+
+    def postprocessor_hook(self, d):
+        # Post-processors run synchronously on one thread, so a stack per thread pairs the hooks up
+        stack = self.local.__dict__.setdefault('postprocessing', [])
+        if d['status'] == 'started':
+            stack.append((time.time(), time.perf_counter()))
+        elif d['status'] == 'finished' and stack:
+            started, clock = stack.pop()
+            self.record('postprocess', started, time.perf_counter() - clock,
+                        postprocessor=d.get('postprocessor'), **self.entry_attrs(d.get('info_dict') or {}))
@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import deque
+
+import job_store
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+LANES = (INTERACTIVE, BULK)
+
+
+def lane_for(options):
+    """Playlists are bulk work; a single video is what someone is waiting for"""
+    return BULK if options.get('playlist') else INTERACTIVE
+
+
+class JobQueue:
+    """Runs download jobs in priority lanes, taking new jobs at any time.
+
+    ``submit`` queues a job in its lane (see ``lane_for``). Each lane runs up
+    to ``workers[lane]`` jobs at once, in the order they were submitted, on
+    engines of the same class as ``engine`` that share its caches and stores,
+    so a single video never waits for a playlist to finish.
+
+    With ``preempt``, bulk jobs give way while an interactive job runs: no
+    new playlist entry starts, and downloading entries pause at their next
+    fragment (see ``DownloadEngine.pause_point``), freeing the bandwidth.
+    They resume from their partial files once the interactive lane is idle.
+
+    The time every job waited in its lane is kept; ``stats()`` summarises it
+    per lane and each wait is also traced as a ``queue_wait`` span.
+    ``finished`` lists the latest jobs with their lane, wait and the time
+    from submission to the end of the job.
+    """
+
+    def __init__(self, engine, interactive_workers=2, bulk_workers=1, preempt=True, history=1000):
+        self.engine = engine
+        self.workers = {INTERACTIVE: interactive_workers, BULK: bulk_workers}
+        self.preempt = preempt
+        self.condition = threading.Condition()
+        self.pending = {lane: deque() for lane in LANES}
+        self.running = {lane: {} for lane in LANES}
+        self.waits = {lane: deque(maxlen=history) for lane in LANES}
+        self.finished = deque(maxlen=history)
+        self.pauses = 0
+        self.paused_seconds = 0.0
+
+    def submit(self, job_id, options, lane=None):
+        """Queue a job (already in the job store); returns its lane"""
+        lane = lane or lane_for(options)
+        with self.condition:
+            self.pending[lane].append((job_id, options, time.monotonic()))
+            self._start_jobs()
+        return lane
+
+    def bulk_paused(self):
+        """Whether bulk work should give way right now"""
+        return self.preempt and bool(self.running[INTERACTIVE])
+
+    def wait_for_bulk(self, stopped=None):
+        """Block a bulk job's thread until the interactive lane is idle, or ``stopped`` is set"""
+        with self.condition:
+            if not self.bulk_paused():
+                return
+            started = time.monotonic()
+            while self.bulk_paused() and not (stopped and stopped.is_set()):
+                # Also woken by the job's cancellation through ``stopped``
+                self.condition.wait(0.5)
+            self.pauses += 1
+            self.paused_seconds += time.monotonic() - started
+
+    def cancel(self, job_id):
+        """Cancel a running job, or drop it from its lane; returns False if it is unknown"""
+        with self.condition:
+            for lane in LANES:
+                engine = self.running[lane].get(job_id)
+                if engine:
+                    engine.cancel()
+                    return True
+                for queued in self.pending[lane]:
+                    if queued[0] == job_id:
+                        self.pending[lane].remove(queued)
+                        self.engine.job_store.set_job_status(job_id, job_store.CANCELLED)
+                        return True
+        return False
+
+    def stats(self):
+        with self.condition:
+            lanes = {}
+            for lane in LANES:
+                waits = sorted(self.waits[lane])
+                lanes[lane] = {
+                    'queued': len(self.pending[lane]),
+                    'running': len(self.running[lane]),
+                    'jobs': len(waits),
+                    'wait_mean': sum(waits) / len(waits) if waits else None,
+                    'wait_p95': waits[int(0.95 * (len(waits) - 1))] if waits else None,
+                    'wait_max': waits[-1] if waits else None,
+                }
+            return {'lanes': lanes, 'bulk_pauses': self.pauses, 'bulk_paused_seconds': self.paused_seconds}
+
+    def _start_jobs(self):
+        # Called with the condition held
+        for lane in LANES:
+            while self.pending[lane] and len(self.running[lane]) < self.workers[lane]:
+                job_id, options, queued = self.pending[lane].popleft()
+                base = self.engine
+                engine = type(base)(base.emit, base.on_progress, shared=base, ydl_params=base.ydl_params,
+                                    postprocess_workers=base.postprocess_workers,
+                                    postprocess_queue=base.postprocess_queue)
+                if lane == BULK:
+                    engine.lanes = self
+                self.running[lane][job_id] = engine
+                wait = time.monotonic() - queued
+                self.waits[lane].append(wait)
+                base.metrics.record('queue_wait', job_id, time.time() - wait, wait, {'lane': lane})
+                threading.Thread(target=self._run, args=(lane, job_id, options, engine, queued),
+                                 name=f'job-{job_id}', daemon=True).start()
+
+    def _run(self, lane, job_id, options, engine, queued):
+        started = time.monotonic()
+        try:
+            engine.download(job_id, options)
+        finally:
+            with self.condition:
+                del self.running[lane][job_id]
+                self.finished.append({'job_id': job_id, 'lane': lane, 'wait': started - queued,
+                                      'seconds': time.monotonic() - queued})
+                self._start_jobs()
+                self.condition.notify_all()
+            self.engine.emit('queue', self.stats())
@@ -0,0 +1,101 @@
+import json
+import sqlite3
+import threading
+import time
+
+# Job states; anything not finished or cancelled is resumed on the next start
+QUEUED = 'queued'
+RUNNING = 'running'
+FINISHED = 'finished'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+# Ran to the end with playlist entries that failed; resumed like a running job
+PARTIAL = 'partial'
+
+# Playlist entry states
+DOWNLOADING = 'downloading'
+
+
+class JobStore:
+    """Durable download queue backed by SQLite in WAL mode.
+
+    Each job keeps its URL and download options, and every playlist entry
+    records its status and partial file, so a restarted app can skip the
+    finished entries and let yt-dlp continue the ``.part`` files.
+    """
+
+    def __init__(self, path='download_jobs.sqlite'):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                options TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                job_id INTEGER NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+                playlist_index INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                filename TEXT,
+                updated REAL NOT NULL,
+                PRIMARY KEY (job_id, playlist_index)
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+        ''')
+        self.conn.commit()
+
+    def _execute(self, sql, params=()):
+        with self.lock:
+            cursor = self.conn.execute(sql, params)
+            self.conn.commit()
+            return cursor
+
+    def add_job(self, options):
+        now = time.time()
+        return self._execute(
+            'INSERT INTO jobs (url, options, status, created, updated) VALUES (?, ?, ?, ?, ?)',
+            (options['url'], json.dumps(options), QUEUED, now, now)).lastrowid
+
+    def set_job_status(self, job_id, status):
+        self._execute('UPDATE jobs SET status = ?, updated = ? WHERE id = ?',
+                      (status, time.time(), job_id))
+
+    def job_status(self, job_id):
+        with self.lock:
+            row = self.conn.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def unfinished_jobs(self):
+        """Return ``(job_id, options)`` for every job that did not run to completion"""
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT id, options FROM jobs WHERE status IN (?, ?, ?) ORDER BY id',
+                (QUEUED, RUNNING, PARTIAL)).fetchall()
+        return [(job_id, json.loads(options)) for job_id, options in rows]
+
+    def set_entry_status(self, job_id, playlist_index, status, filename=None):
+        self._execute(
+            '''INSERT INTO entries (job_id, playlist_index, status, filename, updated)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (job_id, playlist_index) DO UPDATE SET
+                   status = excluded.status,
+                   filename = COALESCE(excluded.filename, entries.filename),
+                   updated = excluded.updated''',
+            (job_id, playlist_index, status, filename, time.time()))
+
+    def finished_entries(self, job_id):
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT playlist_index FROM entries WHERE job_id = ? AND status = ?',
+                (job_id, FINISHED)).fetchall()
+        return {row[0] for row in rows}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
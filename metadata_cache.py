@@ -0,0 +1,131 @@
+import functools
+import json
+import sqlite3
+import threading
+import time
+
+import yt_dlp
+
+# Keys that only make sense while the stream URLs are still valid
+STREAM_KEYS = ('formats', 'url', 'requested_formats', 'fragments', 'manifest_url',
+               'http_headers', 'protocol')
+
+
+@functools.lru_cache(maxsize=1024)
+def url_id(url):
+    """Return ``(ie_key, id)`` for the extractor yt-dlp would use, without any network access.
+
+    Matching runs through every extractor (YouTube's come near the end), so
+    results are remembered: a job looks its URL up more than once.
+    """
+    for ie in yt_dlp.extractor.gen_extractor_classes():
+        if ie.suitable(url):
+            return ie.ie_key(), ie.get_temp_id(url)
+    return None, None
+
+
+def cache_key(url):
+    """Normalize a URL to an ``extractor:id`` key, falling back to the URL itself"""
+    url = url.strip()
+    ie_key, video_id = url_id(url)
+    if video_id:
+        return f"{ie_key}:{video_id}"
+    return url
+
+
+class MetadataCache:
+    """On-disk cache of extract_info results with TTL expiry and LRU eviction.
+
+    Stream URLs expire quickly, so every entry carries two deadlines: after
+    ``stream_ttl`` only the static metadata (title, duration, ...) is served,
+    and after ``metadata_ttl`` the entry is dropped entirely. A playlist
+    listing changes with every upload, so it is dropped after ``stream_ttl``.
+    """
+
+    def __init__(self, path='metadata_cache.sqlite', stream_ttl=30 * 60,
+                 metadata_ttl=7 * 24 * 3600, max_bytes=64 * 1024 * 1024):
+        self.stream_ttl = stream_ttl
+        self.metadata_ttl = metadata_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            stream_expires REAL NOT NULL,
+            meta_expires REAL NOT NULL,
+            last_access REAL NOT NULL
+        )''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+        self.conn.commit()
+
+    def get(self, key):
+        """Return the cached info dict for ``key`` or None.
+
+        Once the stream URLs have expired the static metadata is returned as a
+        ``url`` result, so yt-dlp re-resolves formats only when downloading.
+        """
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT data, stream_expires, meta_expires FROM entries WHERE key = ?',
+                (key,)).fetchone()
+            if row is None or row[2] < now:
+                self.misses += 1
+                return None
+            self.conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+            self.conn.commit()
+            info = json.loads(row[0])
+            if row[1] >= now:
+                self.hits += 1
+                return info
+
+            url = info.get('webpage_url') or info.get('original_url')
+            if not url:
+                self.misses += 1
+                return None
+            self.stale_hits += 1
+            info = {k: v for k, v in info.items() if k not in STREAM_KEYS}
+            info.update({'_type': 'url', 'url': url, 'ie_key': info.get('extractor_key')})
+            return info
+
+    def put(self, key, info):
+        # Private yt-dlp keys (e.g. __post_extractor) do not survive JSON
+        data = json.dumps({k: v for k, v in info.items() if not k.startswith('__')},
+                          default=repr)
+        now = time.time()
+        has_streams = any(k in info for k in STREAM_KEYS)
+        stream_expires = now + (self.stream_ttl if has_streams else self.metadata_ttl)
+        # Without its entries a listing is of no use, so it goes as a whole
+        meta_expires = now + (self.stream_ttl if 'entries' in info else self.metadata_ttl)
+        stream_expires = min(stream_expires, meta_expires)
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                (key, data, len(data), stream_expires, meta_expires, now))
+            self.conn.execute('DELETE FROM entries WHERE meta_expires < ?', (now,))
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute(
+                'SELECT key, size FROM entries ORDER BY last_access').fetchall():
+            self.conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        return {'hits': self.hits, 'stale_hits': self.stale_hits, 'misses': self.misses}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
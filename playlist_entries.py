@@ -0,0 +1,93 @@
+from format_planner import plan_audio, plan_video
+
+
+class EntryRecord:
+    """What a job keeps of one playlist entry.
+
+    Listings can carry complete info dicts per entry (every format with its
+    URL and headers, thumbnails, descriptions), a few hundred kilobytes each
+    that a job never reads again: entries are resolved just before they
+    download anyway. A record keeps the index, ID, title and duration, the
+    URL to resolve the entry from and, when the listing had formats, the
+    format the job would choose and its size. ``as_entry`` turns it back
+    into a url result for yt-dlp, which carries the size along (under
+    private keys yt-dlp ignores) so a listing served from the metadata
+    cache is still sized; ``sized_for`` is the ``(format_type, quality)``
+    the size was planned for, None when the listing gave the size itself.
+    """
+
+    __slots__ = ('index', 'id', 'title', 'duration', 'url', 'ie_key', 'format_id', 'size', 'sized_for')
+
+    def __init__(self, index, id, title=None, duration=None, url=None, ie_key=None,
+                 format_id=None, size=None, sized_for=None):
+        self.index = index
+        self.id = id
+        self.title = title
+        self.duration = duration
+        self.url = url
+        self.ie_key = ie_key
+        self.format_id = format_id
+        self.size = size
+        self.sized_for = sized_for
+
+    @classmethod
+    def from_entry(cls, index, entry, format_type='mp4', quality='best'):
+        """Compact an entry of a listing; ``format_type`` and ``quality`` pick the format it is sized by"""
+        if isinstance(entry, cls):
+            return entry
+        if entry.get('_type') in ('url', 'url_transparent'):
+            url, ie_key = entry.get('url'), entry.get('ie_key')
+        else:
+            url = entry.get('webpage_url') or entry.get('original_url')
+            ie_key = entry.get('extractor_key') or entry.get('ie_key')
+        format_id, size = None, entry.get('filesize') or entry.get('filesize_approx')
+        sized_for = None
+        if not size and entry.get('formats'):
+            plan_formats = plan_audio if format_type == 'mp3' else plan_video
+            plan = plan_formats(entry['formats'], quality)
+            if plan:
+                format_id, size, sized_for = plan.spec, plan.bytes, (format_type, quality)
+        elif not size and entry.get('__size'):
+            # A record turned into a url result; its planned size only holds for the same choice
+            planned = entry.get('__sized_for')
+            if planned is None or tuple(planned) == (format_type, quality):
+                format_id, size = entry.get('__format_id'), entry['__size']
+                sized_for = planned and tuple(planned)
+        return cls(index, entry.get('id'), entry.get('title'), entry.get('duration'), url, ie_key,
+                   format_id, size, sized_for)
+
+    def as_entry(self):
+        """The entry as a url result yt-dlp resolves when it is downloaded"""
+        entry = {'_type': 'url', 'url': self.url, 'ie_key': self.ie_key, 'id': self.id,
+                 'title': self.title, 'duration': self.duration,
+                 '__format_id': self.format_id, '__size': self.size,
+                 '__sized_for': self.sized_for and list(self.sized_for)}
+        return {k: v for k, v in entry.items() if v is not None}
+
+
+def compact_entry(index, entry, format_type='mp4', quality='best', resolvable=None):
+    """The record for a listed entry, or the entry itself if it cannot be resolved again.
+
+    Missing entries (None) stay as they are. A complete entry (not a url
+    result) is only replaced once ``resolvable(url, ie_key)`` confirms that
+    its page extracts to the same video on its own.
+    """
+    if not isinstance(entry, dict):
+        return entry
+    record = EntryRecord.from_entry(index, entry, format_type, quality)
+    if not record.url:
+        return entry
+    if entry.get('_type') not in ('url', 'url_transparent') and not (
+            resolvable and resolvable(record.url, record.ie_key)):
+        return entry
+    return record
+
+
+def compact_entries(entries, format_type='mp4', quality='best', resolvable=None):
+    return [compact_entry(index, entry, format_type, quality, resolvable)
+            for index, entry in enumerate(entries, 1)]
+
+
+def as_entries(entries):
+    """Entries as yt-dlp (and the metadata cache) take them, records turned back into url results"""
+    return [entry.as_entry() if isinstance(entry, EntryRecord) else entry for entry in entries]
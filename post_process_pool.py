@@ -0,0 +1,83 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PostProcessPool:
+    """Merges and transcodes finished downloads off the download threads.
+
+    A download hands its post-processing to ``submit`` and moves on to the
+    next entry. At most ``workers`` jobs run at once (one per core by
+    default); the heavy lifting happens in the ffmpeg processes they start.
+    Up to ``queue_depth`` more wait their turn; beyond that ``submit`` blocks,
+    so a fast connection cannot pile up unprocessed files on disk.
+
+    ``on_progress(state)`` receives the queued, running, done and failed
+    counts whenever one of them changes.
+    """
+
+    def __init__(self, workers=None, queue_depth=None, on_progress=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_depth = self.workers * 2 if queue_depth is None else queue_depth
+        self.on_progress = on_progress
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='postprocess')
+        self.slots = threading.BoundedSemaphore(self.workers + self.queue_depth)
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.done = 0
+        self.failed = 0
+
+    def submit(self, fn, *args):
+        """Run ``fn(*args)`` on the pool; blocks while the queue is full"""
+        self.slots.acquire()
+        self._update(queued=1)
+        future = self.executor.submit(self._run, fn, args)
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def _run(self, fn, args):
+        self._update(queued=-1, running=1)
+        try:
+            result = fn(*args)
+        except BaseException:
+            self._update(running=-1, failed=1)
+            raise
+        self._update(running=-1, done=1)
+        return result
+
+    def _update(self, queued=0, running=0, done=0, failed=0):
+        with self.lock:
+            self.queued += queued
+            self.running += running
+            self.done += done
+            self.failed += failed
+            state = self.stats()
+        if self.on_progress:
+            self.on_progress(state)
+
+    def stats(self):
+        return {'queued': self.queued, 'running': self.running, 'done': self.done, 'failed': self.failed}
+
+    def after(self, futures, callback):
+        """Call ``callback()`` once all ``futures`` succeeded (right away when there are none)"""
+        futures = [f for f in futures if f is not None]
+        if not futures:
+            callback()
+            return
+        remaining = [len(futures)]
+
+        def finished(_):
+            with self.lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            if not any(f.cancelled() or f.exception() for f in futures):
+                callback()
+
+        for future in futures:
+            future.add_done_callback(finished)
+
+    def close(self, cancel=False):
+        """Wait for the queued work, or drop what has not started when ``cancel`` is set"""
+        self.executor.shutdown(wait=True, cancel_futures=cancel)
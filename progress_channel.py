@@ -0,0 +1,33 @@
+import threading
+
+
+class ProgressChannel:
+    """Latest-value-wins progress updates from download threads to the UI.
+
+    yt-dlp calls progress hooks for every chunk it writes; publishing only
+    overwrites the state kept for that key, and the UI drains one snapshot
+    per frame, so the UI does work in proportion to its frame rate instead of
+    the download speed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latest = {}
+        self.published = 0
+        self.drained = 0
+
+    def publish(self, key, state):
+        with self.lock:
+            self.latest[key] = state
+            self.published += 1
+
+    def discard(self, key):
+        with self.lock:
+            self.latest.pop(key, None)
+
+    def drain(self):
+        """Return ``{key: state}`` published since the last call"""
+        with self.lock:
+            latest, self.latest = self.latest, {}
+            self.drained += len(latest)
+        return latest
@@ -0,0 +1,128 @@
+import json
+import threading
+import time
+
+# Options applied to a session each time it is handed out; everything else
+# is fixed when a YoutubeDL is created and makes up its profile
+JOB_KEYS = ('outtmpl', 'paths', 'format', 'progress_hooks', 'postprocessor_hooks', 'post_hooks',
+            'download_archive', 'retry_sleep_functions', 'concurrent_fragment_downloads',
+            'playlist_items', 'lazy_playlist')
+
+
+def profile_key(params):
+    """Key of the options a session cannot change once created (extractors, networking, postprocessors, ...)"""
+    return json.dumps({k: v for k, v in params.items() if k not in JOB_KEYS}, sort_keys=True, default=repr)
+
+
+class SessionPool:
+    """Warm YoutubeDL sessions reused across jobs.
+
+    Creating a YoutubeDL sets up all of yt-dlp's extractors (the better part
+    of 0.1 s) and starts from scratch on HTTP connections, cookies and TLS
+    sessions. ``acquire(params, factory)`` hands out an idle session created
+    with the same profile (see ``profile_key``) after calling its
+    ``reuse(params)`` to apply the job's own options, or creates one with
+    ``factory(params)``; ``release`` takes it back. A session is used by one
+    thread at a time.
+
+    Sessions are recycled, i.e. really closed, after ``max_uses`` jobs or
+    ``max_age`` seconds, when idle for ``idle_timeout`` seconds, or when
+    ``max_idle`` sessions of the same profile are already waiting.
+    """
+
+    def __init__(self, max_idle=8, max_uses=100, max_age=30 * 60, idle_timeout=5 * 60):
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.idle_timeout = idle_timeout
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.sessions = {}
+        self.created = 0
+        self.reused = 0
+        self.recycled = 0
+
+    def acquire(self, params, factory):
+        key = profile_key(params)
+        now = time.monotonic()
+        expired = []
+        ydl = None
+        with self.lock:
+            idle = self.idle.get(key, [])
+            while idle and ydl is None:
+                candidate = idle.pop()
+                if self._expired(candidate, now):
+                    del self.sessions[candidate]
+                    expired.append(candidate)
+                else:
+                    ydl = candidate
+            expired.extend(self._take_stale(now))
+        self._close(expired)
+        if ydl is not None:
+            ydl.reuse(params)
+            with self.lock:
+                self.reused += 1
+                self.sessions[ydl]['uses'] += 1
+            return ydl
+        # YoutubeDL fills its defaults into the dict it is given; the caller's
+        # is left alone, so options derived from it keep the same profile
+        ydl = factory(dict(params))
+        with self.lock:
+            self.created += 1
+            self.sessions[ydl] = {'key': key, 'created': now, 'idle_since': None, 'uses': 1}
+        return ydl
+
+    def release(self, ydl):
+        """Take back a session; returns False if it is not kept and should be closed"""
+        now = time.monotonic()
+        with self.lock:
+            state = self.sessions.get(ydl)
+            if state is None:
+                return False
+            idle = self.idle.setdefault(state['key'], [])
+            if self._expired(ydl, now) or len(idle) >= self.max_idle:
+                del self.sessions[ydl]
+                self.recycled += 1
+                return False
+            state['idle_since'] = now
+            idle.append(ydl)
+        # Cookies set by this job survive a crash before the session is closed
+        ydl.save_cookies()
+        return True
+
+    def close(self):
+        """Close every idle session"""
+        with self.lock:
+            sessions = [ydl for idle in self.idle.values() for ydl in idle]
+            self.idle.clear()
+            for ydl in sessions:
+                del self.sessions[ydl]
+        self._close(sessions)
+
+    def stats(self):
+        with self.lock:
+            return {'created': self.created, 'reused': self.reused, 'recycled': self.recycled,
+                    'idle': sum(len(idle) for idle in self.idle.values())}
+
+    def _expired(self, ydl, now):
+        state = self.sessions[ydl]
+        return state['uses'] >= self.max_uses or now - state['created'] >= self.max_age
+
+    def _take_stale(self, now):
+        # Called with the lock held
+        stale = []
+        for idle in self.idle.values():
+            for ydl in list(idle):
+                if now - self.sessions[ydl]['idle_since'] >= self.idle_timeout:
+                    idle.remove(ydl)
+                    stale.append(ydl)
+        for ydl in stale:
+            del self.sessions[ydl]
+        return stale
+
+    def _close(self, sessions):
+        for ydl in sessions:
+            with self.lock:
+                self.recycled += 1
+            ydl.session_pool = None
+            ydl.close()
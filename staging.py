@@ -0,0 +1,152 @@
+import errno
+import os
+import shutil
+import threading
+
+from yt_dlp.postprocessor import MoveFilesAfterDownloadPP
+from yt_dlp.utils import PostProcessingError, make_dir
+
+MB = 1024 * 1024
+
+
+def finalize(src, dest):
+    """Move ``src`` to ``dest`` so that ``dest`` never exists half-written.
+
+    On the same filesystem this is a rename. Across filesystems the file is
+    copied in one sequential pass to a hidden name next to ``dest``, renamed
+    into place and only then removed from ``src``. Returns the bytes copied.
+    """
+    try:
+        os.replace(src, dest)
+        return 0
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    temp = os.path.join(os.path.dirname(dest), f'.{os.path.basename(dest)}.moving')
+    try:
+        shutil.copyfile(src, temp)
+        shutil.copystat(src, temp)
+        os.replace(temp, dest)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+    size = os.path.getsize(dest)
+    os.remove(src)
+    return size
+
+
+class ScratchSpace:
+    """Fast local directory where jobs download and post-process.
+
+    Partial files, fragments and ffmpeg intermediates live in a directory
+    per job under ``root``; yt-dlp moves each finished file to the output
+    directory, and ``StagedMovePP`` makes that move a rename or a single
+    sequential copy.
+
+    ``acquire(key, size)`` admits an entry expected to need ``size`` bytes
+    while it downloads and is post-processed, blocking while the free space
+    left after what the admitted entries may still need would drop below
+    ``min_free``. An entry is always admitted when none is in flight, so a
+    job never stalls on a file larger than the disk can hold; its download
+    then fails as it would have without staging.
+    """
+
+    def __init__(self, root, min_free=512 * MB):
+        self.root = root
+        self.min_free = min_free
+        self.condition = threading.Condition()
+        self.reserved = {}
+        self.waits = 0
+        self.moved = 0
+        self.copied_bytes = 0
+        os.makedirs(root, exist_ok=True)
+
+    def job_dir(self, job_id):
+        path = os.path.join(self.root, f'job-{job_id}')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def remove_job_dir(self, job_id):
+        """Remove a job's directory, e.g. once it finished and no partial file is worth keeping"""
+        shutil.rmtree(os.path.join(self.root, f'job-{job_id}'), ignore_errors=True)
+
+    def free(self):
+        try:
+            return shutil.disk_usage(self.root).free
+        except OSError:
+            return None
+
+    def acquire(self, key, size, stopped=None):
+        """Wait until an entry of ``size`` bytes fits; ``stopped`` (an Event) ends the wait early"""
+        with self.condition:
+            waited = False
+            while self.reserved and not (stopped and stopped.is_set()):
+                free = self.free()
+                if free is None or free - sum(self.reserved.values()) - size >= self.min_free:
+                    break
+                waited = True
+                # Space also comes back when files leave for the output directory
+                self.condition.wait(1.0)
+            self.waits += waited
+            self.reserved[key] = size
+
+    def release(self, key):
+        with self.condition:
+            if self.reserved.pop(key, None) is not None:
+                self.condition.notify_all()
+
+    def release_all(self, prefix):
+        """Release every reservation whose key starts with ``prefix`` (a tuple), e.g. a job's"""
+        with self.condition:
+            for key in [k for k in self.reserved if k[:len(prefix)] == prefix]:
+                del self.reserved[key]
+            self.condition.notify_all()
+
+    def record_move(self, copied):
+        with self.condition:
+            self.moved += 1
+            self.copied_bytes += copied
+
+    def stats(self):
+        with self.condition:
+            return {'in_flight': len(self.reserved), 'reserved_bytes': sum(self.reserved.values()),
+                    'waits': self.waits, 'moved': self.moved, 'copied_bytes': self.copied_bytes,
+                    'free_bytes': self.free()}
+
+
+class StagedMovePP(MoveFilesAfterDownloadPP):
+    """MoveFilesAfterDownloadPP that finalizes each file with ``finalize``.
+
+    yt-dlp's own move copies straight to the final name across filesystems,
+    so the output directory briefly holds a half-written file.
+    """
+
+    def __init__(self, downloader, scratch, downloaded=True):
+        super().__init__(downloader, downloaded)
+        self.scratch = scratch
+
+    def run(self, info):
+        dl_path, dl_name = os.path.split(info['filepath'])
+        finaldir = info.get('__finaldir', dl_path)
+        finalpath = os.path.join(finaldir, dl_name)
+        if self._downloaded:
+            info['__files_to_move'][info['filepath']] = finalpath
+
+        for oldfile, newfile in info['__files_to_move'].items():
+            newfile = newfile or os.path.join(finaldir, os.path.basename(oldfile))
+            if os.path.abspath(oldfile) == os.path.abspath(newfile):
+                continue
+            if not os.path.exists(oldfile):
+                self.report_warning(f'File "{oldfile}" cannot be found')
+                continue
+            if os.path.exists(newfile) and not self.get_param('overwrites', True):
+                self.report_warning(
+                    f'Cannot move file "{oldfile}" out of temporary directory since "{newfile}" already exists. ')
+                continue
+            make_dir(newfile, PostProcessingError)
+            self.to_screen(f'Moving file "{oldfile}" to "{newfile}"')
+            self.scratch.record_move(finalize(oldfile, newfile))
+
+        info['filepath'] = finalpath
+        return [], info
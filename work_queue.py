@@ -0,0 +1,264 @@
+"""Job queue shared by download workers on several hosts.
+
+    python work_queue.py --port 8766 --db work_queue.sqlite   # stand-in queue server
+
+Workers claim a task for a limited time (a lease) and keep extending it
+while they download; a task whose lease ran out, because its worker died
+or lost the network, goes to the next worker that asks. A playlist is
+split into ``shards`` tasks, one per slice of entry indices, so several
+workers download it at once. Two stores implement the same methods:
+
+- ``SQLiteWorkQueue``: a SQLite file, e.g. on storage all hosts mount
+- ``RemoteWorkQueue``: a client of ``WorkQueueServer``, which serves a
+  ``SQLiteWorkQueue`` over HTTP (JSON), for hosts without shared storage
+  and for tests
+
+``open_work_queue(spec)`` picks one from a path or an ``http://`` URL.
+"""
+import argparse
+import json
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Task states
+QUEUED = 'queued'
+LEASED = 'leased'
+FINISHED = 'finished'
+FAILED = 'failed'
+
+
+class SQLiteWorkQueue:
+    """Work queue in a SQLite file.
+
+    Claims run in ``BEGIN IMMEDIATE`` transactions, so two workers never
+    lease the same task. The file uses a rollback journal rather than WAL,
+    which needs memory shared between the processes and so only works on
+    one host; it must live on a filesystem with working locks (SMB, NFS
+    with a lock manager). Lease times come from each worker's clock.
+
+    A failed task is queued again until it was tried ``max_attempts`` times,
+    as is one whose lease ran out; after that it is failed for good.
+    """
+
+    def __init__(self, path='work_queue.sqlite', max_attempts=3):
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=DELETE')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job INTEGER NOT NULL,
+                options TEXT NOT NULL,
+                shard INTEGER NOT NULL,
+                shards INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+        ''')
+
+    def _transaction(self, work):
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = work(self.conn)
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.conn.execute('COMMIT')
+            return result
+
+    def submit(self, options, shards=1):
+        """Queue a job (``DownloadEngine.options``); a playlist is split into ``shards`` tasks.
+
+        Returns the job number shared by its tasks.
+        """
+        shards = max(1, shards) if options.get('playlist') else 1
+        now = time.time()
+
+        def insert(conn):
+            job = (conn.execute('SELECT MAX(job) FROM tasks').fetchone()[0] or 0) + 1
+            conn.executemany(
+                'INSERT INTO tasks (job, options, shard, shards, status, created, updated) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(job, json.dumps(options), shard, shards, QUEUED, now, now) for shard in range(shards)])
+            return job
+        return self._transaction(insert)
+
+    def claim(self, worker, lease=60):
+        """Lease the oldest task that is queued or whose lease ran out; None when there is none"""
+        now = time.time()
+
+        def take(conn):
+            # Leases that ran out on the last attempt: the task took down every worker that tried it
+            conn.execute('UPDATE tasks SET status = ?, lease_expires = NULL, updated = ? '
+                         'WHERE status = ? AND lease_expires < ? AND attempts >= ?',
+                         (FAILED, now, LEASED, now, self.max_attempts))
+            row = conn.execute(
+                'SELECT id, job, options, shard, shards, attempts FROM tasks '
+                'WHERE status = ? OR (status = ? AND lease_expires < ?) ORDER BY id LIMIT 1',
+                (QUEUED, LEASED, now)).fetchone()
+            if not row:
+                return None
+            task_id, job, options, shard, shards, attempts = row
+            conn.execute('UPDATE tasks SET status = ?, worker = ?, lease_expires = ?, attempts = ?, updated = ? '
+                         'WHERE id = ?', (LEASED, worker, now + lease, attempts + 1, now, task_id))
+            return {'id': task_id, 'job': job, 'options': json.loads(options), 'shard': shard,
+                    'shards': shards, 'attempt': attempts + 1}
+        return self._transaction(take)
+
+    def heartbeat(self, task_id, worker, lease=60):
+        """Extend a lease; False if the task is no longer this worker's"""
+        now = time.time()
+        return self._transaction(lambda conn: conn.execute(
+            'UPDATE tasks SET lease_expires = ?, updated = ? WHERE id = ? AND worker = ? AND status = ?',
+            (now + lease, now, task_id, worker, LEASED)).rowcount == 1)
+
+    def complete(self, task_id, worker, status):
+        """Record how a leased task ended (``job_store`` status); False if it is no longer this worker's"""
+        now = time.time()
+
+        def finish(conn):
+            row = conn.execute('SELECT attempts FROM tasks WHERE id = ? AND worker = ? AND status = ?',
+                               (task_id, worker, LEASED)).fetchone()
+            if not row:
+                return False
+            if status == FINISHED:
+                new_status = FINISHED
+            else:
+                # Cancelled or failed: another attempt, perhaps on another worker
+                new_status = QUEUED if row[0] < self.max_attempts else FAILED
+            conn.execute('UPDATE tasks SET status = ?, lease_expires = NULL, updated = ? WHERE id = ?',
+                         (new_status, now, task_id))
+            return True
+        return self._transaction(finish)
+
+    def counts(self, job=None):
+        """Tasks per state, of one job or all of them"""
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT status, COUNT(*) FROM tasks' + (' WHERE job = ?' if job else '') + ' GROUP BY status',
+                (job,) if job else ()).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class WorkQueueServer(ThreadingHTTPServer):
+    """Serves a work queue's methods as ``POST /<method>`` with the keyword arguments as JSON"""
+
+    daemon_threads = True
+    METHODS = ('submit', 'claim', 'heartbeat', 'complete', 'counts')
+
+    def __init__(self, queue, host='127.0.0.1', port=0):
+        super().__init__((host, port), _WorkQueueHandler)
+        self.queue = queue
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _WorkQueueHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        method = self.path.strip('/')
+        try:
+            if method not in WorkQueueServer.METHODS:
+                raise LookupError(f"unknown method {method}")
+            kwargs = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            status, body = 200, {'result': getattr(self.server.queue, method)(**kwargs)}
+        except LookupError as e:
+            status, body = 404, {'error': str(e)}
+        except Exception as e:
+            status, body = 400, {'error': str(e)}
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class RemoteWorkQueue:
+    """Client of a ``WorkQueueServer``, with the methods of ``SQLiteWorkQueue``"""
+
+    def __init__(self, url, timeout=30):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def _call(self, method, **kwargs):
+        request = urllib.request.Request(f'{self.url}/{method}', data=json.dumps(kwargs).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.load(response)['result']
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(json.load(e).get('error', str(e))) from e
+
+    def submit(self, options, shards=1):
+        return self._call('submit', options=options, shards=shards)
+
+    def claim(self, worker, lease=60):
+        return self._call('claim', worker=worker, lease=lease)
+
+    def heartbeat(self, task_id, worker, lease=60):
+        return self._call('heartbeat', task_id=task_id, worker=worker, lease=lease)
+
+    def complete(self, task_id, worker, status):
+        return self._call('complete', task_id=task_id, worker=worker, status=status)
+
+    def counts(self, job=None):
+        return self._call('counts', job=job)
+
+    def close(self):
+        pass
+
+
+def open_work_queue(spec):
+    """The work queue at ``spec``: an ``http://`` URL of a queue server or the path of a SQLite file"""
+    if spec.startswith(('http://', 'https://')):
+        return RemoteWorkQueue(spec)
+    return SQLiteWorkQueue(spec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a work queue to download workers over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--db', default='work_queue.sqlite', help="SQLite file holding the queue")
+    args = parser.parse_args()
+    server = WorkQueueServer(SQLiteWorkQueue(args.db), args.host, args.port)
+    print(f"Work queue at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""Headless downloader sharing the GUI's download engine.
+
+Every event is printed as one JSON object per line on stdout, e.g.
+
+    python yt-download-cli.py --format mp3 --quality 192kbps URL
+    python yt-download-cli.py --batch-file urls.txt --playlist --workers 4
+
+With --queue, URLs are added to a work queue shared by several hosts and
+--worker downloads from it:
+
+    python yt-download-cli.py --queue /mnt/share/work_queue.sqlite -o /mnt/share/videos --playlist --shards 4 URL
+    python yt-download-cli.py --queue /mnt/share/work_queue.sqlite --worker
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+
+from yt_dlp.utils import parse_bytes
+
+from download_engine import QUALITIES, DownloadEngine
+from download_worker import DownloadWorker
+from work_queue import open_work_queue
+
+
+class JsonLinesReporter:
+    """Prints engine events as JSON lines, limiting progress lines per download"""
+
+    def __init__(self, progress_interval=1.0, stream=sys.stdout):
+        self.progress_interval = progress_interval
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.last_progress = {}
+        self.job_id = None
+        self.errors = 0
+
+    def write(self, record):
+        with self.lock:
+            self.stream.write(json.dumps(record) + '\n')
+            self.stream.flush()
+
+    def emit(self, msg_type, msg):
+        if msg_type == 'error':
+            self.errors += 1
+        self.write({'event': msg_type, 'job': self.job_id, 'time': time.time(), 'data': msg})
+
+    def on_progress(self, key, state):
+        if state is None:
+            self.last_progress.pop(key, None)
+            return
+        now = time.monotonic()
+        if now - self.last_progress.get(key, 0) < self.progress_interval:
+            return
+        self.last_progress[key] = now
+        data = state if isinstance(state, dict) else {'progress': state}
+        self.write({'event': 'progress', 'job': self.job_id, 'time': time.time(), 'data': data})
+
+
+def read_batch_file(path):
+    """Return the URLs in a batch file, skipping blank lines and # comments"""
+    stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    with stream:
+        return [line.strip() for line in stream if line.strip() and not line.lstrip().startswith('#')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download videos and playlists without the GUI.")
+    parser.add_argument('urls', nargs='*', help="video or playlist URLs")
+    parser.add_argument('-a', '--batch-file', help="file with one URL per line ('-' for stdin)")
+    parser.add_argument('-f', '--format', choices=['mp4', 'mp3'], default='mp4')
+    parser.add_argument('-q', '--quality',
+                        help='; '.join(f"{format_type}: {', '.join(qualities)}"
+                                       for format_type, qualities in QUALITIES.items()))
+    parser.add_argument('-t', '--template', default='%(title)s.%(ext)s', help="filename template")
+    parser.add_argument('-o', '--output', default='.', help="output directory")
+    parser.add_argument('--playlist', action='store_true', help="download URLs as playlists")
+    parser.add_argument('--start', default='1', help="first playlist video")
+    parser.add_argument('--end', default='', help="last playlist video (default: all)")
+    parser.add_argument('--workers', default='3', help="playlist videos downloaded at the same time")
+    parser.add_argument('--postprocess-workers', type=int,
+                        help="playlist merges/conversions run at the same time (default: one per core)")
+    parser.add_argument('--postprocess-queue', type=int,
+                        help="finished downloads that may wait for post-processing before downloads pause")
+    parser.add_argument('--no-stream-audio', dest='stream_audio', action='store_false',
+                        help="mp3: download the whole file before encoding instead of encoding while downloading")
+    parser.add_argument('--limit-rate', type=parse_bytes, default=0, metavar='RATE',
+                        help="bandwidth shared by all downloads in bytes/sec, e.g. 500K or 4M")
+    parser.add_argument('--trace', metavar='FILE',
+                        help="append a JSON line per job stage (extract, download, ...) with its timing")
+    parser.add_argument('--metrics-file', metavar='FILE',
+                        help="write stage totals in the Prometheus text format after every job")
+    parser.add_argument('--no-dedup', dest='dedup', action='store_false',
+                        help="download playlist videos again even if another playlist already has them")
+    parser.add_argument('--scratch-dir', metavar='DIR',
+                        help="download and post-process on this fast local directory (SSD, tmpfs), "
+                             "then move finished files to the output directory")
+    parser.add_argument('--scratch-min-free', type=parse_bytes, default='512M', metavar='SIZE',
+                        help="free space kept on the scratch directory; playlist videos wait for it")
+    parser.add_argument('--resume', action='store_true', help="also resume unfinished jobs")
+    parser.add_argument('--queue', metavar='QUEUE',
+                        help="work queue shared by several hosts, a SQLite file or the URL of a "
+                             "work_queue.py server; URLs are added to it instead of being downloaded")
+    parser.add_argument('--shards', type=int, default=1,
+                        help="--queue: split each playlist into this many tasks for different workers")
+    parser.add_argument('--worker', action='store_true', help="download tasks from --queue")
+    parser.add_argument('--until-drained', action='store_true',
+                        help="--worker: exit once no task is queued or running anywhere")
+    parser.add_argument('--lease', type=float, default=60,
+                        help="--worker: seconds without a heartbeat before another worker takes a task over")
+    parser.add_argument('--progress-interval', type=float, default=1.0,
+                        help="seconds between progress lines per download")
+    args = parser.parse_args(argv)
+
+    urls = list(args.urls)
+    if args.batch_file:
+        urls.extend(read_batch_file(args.batch_file))
+    if args.worker and not args.queue:
+        parser.error("--worker needs --queue")
+    if not urls and not args.resume and not args.worker:
+        parser.error("no URLs given")
+    if args.quality and args.quality not in QUALITIES[args.format]:
+        parser.error(f"--quality for {args.format} must be one of {', '.join(QUALITIES[args.format])}")
+    quality = args.quality or ('best' if args.format == 'mp4' else '192kbps')
+    url_options = [DownloadEngine.options(url, format_type=args.format, quality=quality,
+                                          template=args.template, output_dir=args.output,
+                                          playlist=args.playlist, start=args.start, end=args.end,
+                                          workers=args.workers, stream_audio=args.stream_audio)
+                   for url in urls]
+    # Before anything is queued: a worker elsewhere would only fail on them
+    for options in url_options:
+        try:
+            DownloadEngine.check_options(options)
+        except ValueError as e:
+            parser.error(str(e))
+
+    # stdout is reserved for JSON lines; yt-dlp's own output goes to stderr
+    reporter = JsonLinesReporter(args.progress_interval, stream=sys.stdout)
+    sys.stdout = sys.stderr
+    if args.queue:
+        queue = open_work_queue(args.queue)
+        for options in url_options:
+            reporter.write({'event': 'queued', 'job': queue.submit(options, args.shards), 'time': time.time(),
+                            'data': {'url': options['url']}})
+        if not args.worker:
+            return 0
+    engine = DownloadEngine(reporter.emit, reporter.on_progress, bandwidth_limit=args.limit_rate,
+                            postprocess_workers=args.postprocess_workers,
+                            postprocess_queue=args.postprocess_queue,
+                            trace_path=args.trace, metrics_path=args.metrics_file, dedup=args.dedup,
+                            scratch_dir=args.scratch_dir, scratch_min_free=args.scratch_min_free)
+
+    if args.worker:
+        def on_task(task, job_id):
+            reporter.job_id = task['id']
+        DownloadWorker(queue, engine, lease=args.lease, heartbeat=args.lease / 4,
+                       on_task=on_task).run(until_drained=args.until_drained)
+        return 1 if reporter.errors else 0
+
+    jobs = engine.job_store.unfinished_jobs() if args.resume else []
+    for options in url_options:
+        jobs.append((engine.job_store.add_job(options), options))
+
+    for job_id, options in jobs:
+        reporter.job_id = job_id
+        engine.download(job_id, options)
+    return 1 if reporter.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
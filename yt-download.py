@@ -1,20 +1,20 @@
-import yt_dlp
-import os
-import re
-import subprocess
+import time
+# Startup is measured from here; yt_dlp and the engine are imported in the background
+STARTED = time.perf_counter()
+import json
 import sys
-from pathlib import Path
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import threading
 from queue import Queue
-import webbrowser
-import json
-from datetime import datetime
+import job_store
+from ffmpeg_probe import probe_ffmpeg
+from history_view import HistoryView
+from progress_channel import ProgressChannel
+IMPORTED = time.perf_counter()
 
-# FFmpeg path configuration
-FFMPEG_PATH = r"C:\ffmpeg\bin\ffmpeg.exe"
-FFPROBE_PATH = r"C:\ffmpeg\bin\ffprobe.exe"
+# Maximum number of progress redraws per second
+UI_FRAME_RATE = 10
 
 # Theme configurations
 LIGHT_THEME = {
@@ -58,7 +58,7 @@ class ModernButton(ttk.Button):
         self.state(['!active'])
 
 class YouTubeDownloaderGUI:
-    def __init__(self, root):
+    def __init__(self, root, report_startup=False):
         self.root = root
         self.root.title("YouTube Downloader Pro")
         self.root.geometry("1000x800")
@@ -66,10 +66,16 @@ class YouTubeDownloaderGUI:
         
         # Initialize variables
         self.current_theme = 'light'
-        self.download_history = []
-        self.current_video_number = 0
-        self.total_playlist_videos = 0
-        self.load_history()
+        self.active_downloads = {}
+        self.report_startup = report_startup
+        self.startup_times = {'import': IMPORTED - STARTED}
+        
+        # Queue for thread communication; progress goes through the coalescing channel
+        self.queue = Queue()
+        self.progress_channel = ProgressChannel()
+        # Created by load_engine once yt_dlp is imported
+        self.engine = None
+        self.jobs = None
         
         # Initialize style
         self.style = ttk.Style()
@@ -92,18 +98,58 @@ class YouTubeDownloaderGUI:
         self.create_progress_section()
         self.create_history_section()
         
-        # Check FFmpeg installation
-        self.check_ffmpeg_installation()
-        
-        # Queue for thread communication
-        self.queue = Queue()
-        
         # Apply initial theme
         self.apply_theme(self.current_theme)
         
         # Create tooltips
         self.create_tooltips()
         
+        # The window shows right away; downloads are enabled once the engine is loaded
+        self.download_btn['state'] = 'disabled'
+        self.status_label['text'] = "Loading..."
+        self.root.bind('<Expose>', self.on_first_paint, add='+')
+        threading.Thread(target=self.load_engine, daemon=True).start()
+        
+        # Single UI update loop shared by all downloads
+        self.update_gui()
+        
+    def load_engine(self):
+        """Import yt-dlp, open the stores and probe FFmpeg off the Tk thread"""
+        try:
+            from download_engine import DownloadEngine
+            from job_queue import JobQueue
+            engine = DownloadEngine(lambda msg_type, msg: self.queue.put((msg_type, msg)),
+                                    self.publish_progress)
+            # Single videos run ahead of playlist entries, which pause for them
+            self.queue.put(('engine_ready', (engine, JobQueue(engine), probe_ffmpeg())))
+        except Exception as e:
+            self.queue.put(('error', f"Could not load the downloader: {e}"))
+            
+    def on_engine_ready(self, engine, jobs, ffmpeg):
+        self.engine = engine
+        self.jobs = jobs
+        self.startup_times['ready'] = time.perf_counter() - STARTED
+        self.history_view.set_store(engine.history_store)
+        self.download_btn['state'] = 'normal'
+        self.status_label['text'] = "Ready"
+        self.check_startup_report()
+        if self.report_startup:
+            return
+        self.check_ffmpeg_installation(ffmpeg)
+        # Offer to resume jobs left over from a previous run
+        self.root.after(500, self.resume_unfinished_jobs)
+        
+    def on_first_paint(self, event):
+        if 'first_paint' not in self.startup_times:
+            self.startup_times['first_paint'] = time.perf_counter() - STARTED
+            self.check_startup_report()
+            
+    def check_startup_report(self):
+        """With --startup-time, print the startup timings in seconds and quit once all are known"""
+        if self.report_startup and {'first_paint', 'ready'} <= self.startup_times.keys():
+            print(json.dumps({name: round(seconds, 4) for name, seconds in self.startup_times.items()}))
+            self.root.destroy()
+        
     def create_menu(self):
         menubar = tk.Menu(self.root)
         self.root.config(menu=menubar)
@@ -165,6 +211,11 @@ class YouTubeDownloaderGUI:
         self.end_entry = ttk.Entry(playlist_frame, textvariable=self.end_var, width=5)
         self.end_entry.grid(row=0, column=4, sticky="w")
         
+        self.workers_var = tk.StringVar(value="3")
+        ttk.Label(playlist_frame, text="Parallel:").grid(row=0, column=5, sticky="w", padx=5)
+        self.workers_spin = ttk.Spinbox(playlist_frame, from_=1, to=8, textvariable=self.workers_var, width=3)
+        self.workers_spin.grid(row=0, column=6, sticky="w")
+        
         # Format and Quality
         ttk.Label(options_frame, text="Format:").grid(row=1, column=0, sticky="w", pady=5)
         self.format_var = tk.StringVar(value="mp4")
@@ -223,6 +274,10 @@ class YouTubeDownloaderGUI:
         self.duration_label = ttk.Label(self.info_frame, text="Duration: ")
         self.duration_label.grid(row=1, column=0, sticky="w")
         
+        # Playlist size, time and disk space estimate
+        self.estimate_label = ttk.Label(self.info_frame, text="")
+        self.estimate_label.grid(row=2, column=0, sticky="w")
+        
         # Progress Bar
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(progress_frame, variable=self.progress_var, maximum=100)
@@ -237,35 +292,9 @@ class YouTubeDownloaderGUI:
         history_frame.grid_columnconfigure(0, weight=1)
         history_frame.grid_rowconfigure(0, weight=1)
         
-        # Create Treeview with scrollbars
-        self.history_tree = ttk.Treeview(history_frame, 
-                                       columns=("Date", "Title", "Format", "Quality"),
-                                       show="headings",
-                                       selectmode="browse")
-        
-        # Configure columns
-        self.history_tree.heading("Date", text="Date")
-        self.history_tree.heading("Title", text="Title")
-        self.history_tree.heading("Format", text="Format")
-        self.history_tree.heading("Quality", text="Quality")
-        
-        self.history_tree.column("Date", width=150)
-        self.history_tree.column("Title", width=400)
-        self.history_tree.column("Format", width=100)
-        self.history_tree.column("Quality", width=100)
-        
-        # Add scrollbars
-        y_scrollbar = ttk.Scrollbar(history_frame, orient="vertical", command=self.history_tree.yview)
-        x_scrollbar = ttk.Scrollbar(history_frame, orient="horizontal", command=self.history_tree.xview)
-        self.history_tree.configure(yscrollcommand=y_scrollbar.set, xscrollcommand=x_scrollbar.set)
-        
-        # Grid layout
-        self.history_tree.grid(row=0, column=0, sticky="nsew")
-        y_scrollbar.grid(row=0, column=1, sticky="ns")
-        x_scrollbar.grid(row=1, column=0, sticky="ew")
-        
-        # Load history
-        self.load_history_to_tree()
+        # Only the visible rows exist as Treeview items; queries run on the view's worker thread
+        self.history_view = HistoryView(history_frame)
+        self.history_view.grid(row=0, column=0, sticky="nsew")
         
     def create_tooltips(self):
         # Create tooltips for various widgets
@@ -273,10 +302,14 @@ class YouTubeDownloaderGUI:
         self.create_tooltip(self.playlist_check, "Check this to download an entire playlist")
         self.create_tooltip(self.start_entry, "Starting video number for playlist download")
         self.create_tooltip(self.end_entry, "Ending video number for playlist download (leave empty for all)")
+        self.create_tooltip(self.workers_spin, "Number of playlist videos to download at the same time")
         self.create_tooltip(self.format_combo, "Select the output format (MP4 for video, MP3 for audio)")
         self.create_tooltip(self.quality_combo, "Select the quality of the download")
         self.create_tooltip(self.template_entry, "Customize the output filename format")
         self.create_tooltip(self.output_entry, "Select where to save the downloaded files")
+        self.create_tooltip(self.history_view.search_entry, "Filter the history by title, format or quality")
+        self.create_tooltip(self.history_view.from_entry, "Only show downloads from this day on (YYYY-MM-DD)")
+        self.create_tooltip(self.history_view.to_entry, "Only show downloads up to this day (YYYY-MM-DD)")
         
     def create_tooltip(self, widget, text):
         def show_tooltip(event):
@@ -379,53 +412,17 @@ class YouTubeDownloaderGUI:
                            background=theme_config['button_bg'],
                            foreground=theme_config['button_fg'])
         
-    def load_history(self):
-        try:
-            if os.path.exists('download_history.json'):
-                with open('download_history.json', 'r') as f:
-                    self.download_history = json.load(f)
-        except Exception as e:
-            print(f"Error loading history: {e}")
-            self.download_history = []
-            
-    def save_history(self):
-        try:
-            with open('download_history.json', 'w') as f:
-                json.dump(self.download_history, f)
-        except Exception as e:
-            print(f"Error saving history: {e}")
-            
-    def load_history_to_tree(self):
-        for item in self.history_tree.get_children():
-            self.history_tree.delete(item)
-        for entry in self.download_history:
-            self.history_tree.insert('', 'end', values=(
-                entry['date'],
-                entry['title'],
-                entry['format'],
-                entry['quality']
-            ))
-            
     def clear_history(self):
         if messagebox.askyesno("Clear History", "Are you sure you want to clear the download history?"):
-            self.download_history = []
-            self.save_history()
-            self.load_history_to_tree()
+            store = self.engine and self.engine.history_store
+            if store:
+                # A large history takes a moment to delete; the 'history' message refreshes the view
+                threading.Thread(target=lambda: (store.clear(), self.queue.put(('history', None))),
+                                 daemon=True).start()
             
-    def add_to_history(self, title, format_type, quality):
-        entry = {
-            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'title': title,
-            'format': format_type,
-            'quality': quality
-        }
-        self.download_history.append(entry)
-        self.save_history()
-        self.load_history_to_tree()
-        
-    def check_ffmpeg_installation(self):
-        """Check if FFmpeg is installed and accessible"""
-        if not os.path.exists(FFMPEG_PATH):
+    def check_ffmpeg_installation(self, ffmpeg=None):
+        """Check if FFmpeg is installed and accessible; ``ffmpeg`` is a result of probe_ffmpeg"""
+        if not (ffmpeg or probe_ffmpeg())['available']:
             response = messagebox.askyesno(
                 "FFmpeg Not Found",
                 "FFmpeg is not installed. This is required for high-quality downloads and MP3 conversion.\n\n"
@@ -433,6 +430,7 @@ class YouTubeDownloaderGUI:
                 icon='warning'
             )
             if response:
+                import webbrowser
                 webbrowser.open('https://github.com/BtbN/FFmpeg-Builds/releases')
                 messagebox.showinfo(
                     "Installation Instructions",
@@ -464,184 +462,82 @@ class YouTubeDownloaderGUI:
             self.quality_combo['values'] = ["320kbps", "192kbps", "128kbps", "64kbps"]
             self.quality_var.set("192kbps")
             
-    def get_video_info(self, url):
-        try:
-            with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-                info = ydl.extract_info(url, download=False)
-                return {
-                    'title': info.get('title', 'Unknown Title'),
-                    'duration': info.get('duration', 0)
-                }
-        except Exception as e:
-            self.queue.put(('error', str(e)))
-            return None
-            
     def format_duration(self, seconds):
         hours = seconds // 3600
         minutes = (seconds % 3600) // 60
         seconds = seconds % 60
         return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
         
-    def download_video(self):
-        url = self.url_var.get()
-        if not url:
-            self.queue.put(('error', "Please enter a YouTube URL"))
+    def format_estimate(self, estimate):
+        gb = 1024 ** 3
+        if estimate['remaining_bytes'] is None:
+            return f"Estimating size... ({estimate['entries']} of {estimate['total'] or '?'} videos listed)"
+        text = f"Remaining: ~{estimate['remaining_bytes'] / gb:.2f} GB"
+        if estimate['eta'] is not None:
+            text += f", about {self.format_duration(int(estimate['eta']))} left"
+        if estimate['free_bytes'] is not None:
+            text += f", {estimate['free_bytes'] / gb:.1f} GB free"
+        if estimate['fits'] is False:
+            text += " - not enough disk space!"
+        return text
+        
+    def get_download_options(self):
+        """Snapshot the download settings so the job can be stored and resumed"""
+        return self.engine.options(
+            self.url_var.get(),
+            format_type=self.format_var.get(),
+            quality=self.quality_var.get(),
+            template=self.template_var.get(),
+            output_dir=self.output_var.get(),
+            playlist=self.playlist_var.get(),
+            start=self.start_var.get(),
+            end=self.end_var.get(),
+            workers=self.workers_var.get(),
+        )
+        
+    def resume_unfinished_jobs(self):
+        jobs = self.engine.job_store.unfinished_jobs()
+        if not jobs:
             return
+        if messagebox.askyesno("Resume Downloads",
+                               f"{len(jobs)} download(s) did not finish last time.\n\n"
+                               "Resume them now? Finished videos will be skipped."):
+            self.status_label['text'] = "Resuming downloads..."
+            self.active_downloads = {}
+            for job_id, options in jobs:
+                self.jobs.submit(job_id, options)
+        else:
+            for job_id, _ in jobs:
+                self.engine.job_store.set_job_status(job_id, job_store.CANCELLED)
             
-        # Reset playlist counters
-        self.current_video_number = 0
-        self.total_playlist_videos = 0
+    def publish_progress(self, key, state):
+        # None is published too, so the ended download leaves the progress bar
+        self.progress_channel.publish(key, state)
             
-        # Get video information
-        video_info = self.get_video_info(url)
-        if not video_info:
+    def apply_progress(self):
+        """Redraw the progress bar once from the latest state of every download"""
+        latest = self.progress_channel.drain()
+        if not latest:
             return
-            
-        # Update video information
-        self.queue.put(('info', video_info))
-        
-        # Configure yt-dlp options
-        output_dir = self.output_var.get()
-        
-        # If playlist download is enabled, create a playlist folder
-        if self.playlist_var.get():
-            try:
-                with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-                    playlist_info = ydl.extract_info(url, download=False)
-                    if 'entries' in playlist_info:
-                        playlist_title = playlist_info.get('title', 'Playlist')
-                        # Clean the playlist title to make it a valid folder name
-                        playlist_title = re.sub(r'[<>:"/\\|?*]', '_', playlist_title)
-                        playlist_dir = os.path.join(output_dir, playlist_title)
-                        os.makedirs(playlist_dir, exist_ok=True)
-                        output_dir = playlist_dir
-                        
-                        # Get playlist information
-                        total_videos = len(playlist_info['entries'])
-                        self.total_playlist_videos = total_videos
-                        start_idx = int(self.start_var.get()) - 1 if self.start_var.get() else 0
-                        end_idx = int(self.end_var.get()) - 1 if self.end_var.get() else total_videos
-                        
-                        # Update status with playlist information
-                        self.queue.put(('info', {
-                            'title': f"Playlist: {playlist_title}",
-                            'duration': 0,
-                            'total_videos': total_videos,
-                            'start_idx': start_idx + 1,
-                            'end_idx': end_idx,
-                            'current_video': start_idx + 1
-                        }))
-                        
-                        # Modify template to include video number for playlists
-                        template = self.template_var.get()
-                        if '%(playlist_index)s' not in template:
-                            # Add playlist index at the start of the filename
-                            template = '%(playlist_index)s. ' + template
-                            self.template_var.set(template)
-            except Exception as e:
-                self.queue.put(('error', f"Error getting playlist info: {str(e)}"))
-                return
-        
-        ydl_opts = {
-            'outtmpl': os.path.join(output_dir, self.template_var.get()),
-            'quiet': True,
-            'progress': True,
-            'progress_hooks': [self.progress_hook],
-            # Add retry options
-            'retries': 10,  # Number of retries for network errors
-            'fragment_retries': 10,  # Number of retries for fragment downloads
-            'retry_sleep': 5,  # Sleep time between retries
-            'retry_sleep_functions': {'fragment': lambda n: 5 * (n + 1)},  # Exponential backoff
-            'socket_timeout': 30,  # Socket timeout in seconds
-            'extractor_retries': 3,  # Number of retries for extractor errors
-            'ignoreerrors': True,  # Continue on download errors
-            'no_warnings': False,  # Show warnings for debugging
-            'verbose': True,  # Show verbose output for debugging
-            'no_check_certificates': True,  # Skip HTTPS certificate validation
-            'prefer_insecure': True,  # Prefer insecure connections if available
-            'sleep_interval': 5,  # Sleep between requests
-            'max_sleep_interval': 30,  # Maximum sleep interval
-            'throttledratelimit': 100000,  # Rate limit for throttled requests
-            'concurrent_fragments': 3,  # Number of fragments to download concurrently
-        }
-        
-        # Add FFmpeg options if available
-        if os.path.exists(FFMPEG_PATH):
-            ydl_opts.update({
-                'ffmpeg_location': FFMPEG_PATH,
-                'ffprobe_location': FFPROBE_PATH,
-            })
-        
-        # Add playlist options if enabled
-        if self.playlist_var.get():
-            ydl_opts.update({
-                'playliststart': int(self.start_var.get()) if self.start_var.get() else 1,
-                'playlistend': int(self.end_var.get()) if self.end_var.get() else None,
-                'playlist_items': f"{self.start_var.get()}-{self.end_var.get()}" if self.end_var.get() else None,
-            })
-        
-        if self.format_var.get() == "mp3":
-            if not os.path.exists(FFMPEG_PATH):
-                self.queue.put(('error', "FFmpeg is required for MP3 downloads. Please install FFmpeg first."))
-                return
-            ydl_opts.update({
-                'format': 'bestaudio/best',
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': self.quality_var.get().replace('kbps', ''),
-                }],
-            })
-        else:
-            quality = self.quality_var.get()
-            if quality == "best":
-                format_str = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best'
+        total_videos = None
+        # Keyed by (job_id, playlist_index): several jobs, and several videos of a playlist, run at once
+        for key, state in latest.items():
+            if state is None:
+                self.active_downloads.pop(key, None)
+            elif key[1] is None:
+                self.active_downloads[key] = state
             else:
-                height = quality.replace('p', '')
-                format_str = f'bestvideo[height<={height}][ext=mp4]+bestaudio[ext=m4a]/best[height<={height}][ext=mp4]/best[ext=mp4]'
-            ydl_opts['format'] = format_str
-            
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
-            self.queue.put(('complete', "Download completed successfully!"))
-            self.add_to_history(video_info['title'], self.format_var.get(), self.quality_var.get())
-        except Exception as e:
-            self.queue.put(('error', str(e)))
+                self.active_downloads[key] = state['progress']
+                total_videos = state['total_videos']
+        if self.active_downloads:
+            self.progress_var.set(sum(self.active_downloads.values()) / len(self.active_downloads))
+        if total_videos is not None:
+            videos = ", ".join(str(index) for _, index in sorted(self.active_downloads) if index is not None)
+            self.status_label['text'] = f"Downloading video {videos} of {total_videos or '?'}"
             
-    def progress_hook(self, d):
-        if d['status'] == 'downloading':
-            try:
-                total = d.get('total_bytes', 0)
-                downloaded = d.get('downloaded_bytes', 0)
-                if total > 0:
-                    progress = (downloaded / total) * 100
-                    # Add playlist index to progress message if available
-                    if 'playlist_index' in d:
-                        # Update current video number
-                        current_video = d['playlist_index']
-                        if current_video != self.current_video_number:
-                            self.current_video_number = current_video
-                        self.queue.put(('progress', {
-                            'progress': progress,
-                            'playlist_index': current_video,
-                            'title': d.get('filename', ''),
-                            'total_videos': self.total_playlist_videos
-                        }))
-                    else:
-                        self.queue.put(('progress', progress))
-            except:
-                pass
-        elif d['status'] == 'finished':
-            # Video finished downloading
-            if 'playlist_index' in d:
-                self.queue.put(('video_complete', {
-                    'playlist_index': d['playlist_index'],
-                    'total_videos': self.total_playlist_videos
-                }))
-                
     def update_gui(self):
         try:
+            self.apply_progress()
             while True:
                 msg_type, msg = self.queue.get_nowait()
                 if msg_type == 'error':
@@ -657,19 +553,46 @@ class YouTubeDownloaderGUI:
                     else:
                         self.title_label['text'] = f"Title: {msg['title']}"
                         self.duration_label['text'] = f"Duration: {self.format_duration(msg['duration'])}"
-                elif msg_type == 'progress':
-                    if isinstance(msg, dict):
-                        self.progress_var.set(msg['progress'])
-                        self.status_label['text'] = f"Downloading video {msg['playlist_index']} of {msg['total_videos']}"
-                    else:
-                        self.progress_var.set(msg)
                 elif msg_type == 'video_complete':
                     # Update status when a video in playlist is complete
                     if isinstance(msg, dict):
                         current = msg['playlist_index']
                         total = msg['total_videos']
-                        if current < total:
-                            self.status_label['text'] = f"Completed video {current} of {total}. Starting next video..."
+                        self.active_downloads.pop((msg['job_id'], current), None)
+                        if not total or current < total:
+                            self.status_label['text'] = f"Completed video {current} of {total or '?'}. Starting next video..."
+                elif msg_type == 'plan':
+                    size = f"~{msg['bytes'] / 1024 / 1024:.1f} MB" if msg['bytes'] else "unknown size"
+                    self.status_label['text'] = f"Format {msg['description']}, {size}"
+                elif msg_type == 'engine_ready':
+                    self.on_engine_ready(*msg)
+                elif msg_type == 'estimate':
+                    self.estimate_label['text'] = self.format_estimate(msg)
+                elif msg_type == 'postprocess':
+                    if msg['running'] or msg['queued']:
+                        self.status_label['text'] = (f"Converting {msg['running']} video(s), "
+                                                     f"{msg['queued']} waiting, {msg['done']} done")
+                elif msg_type == 'history':
+                    self.history_view.refresh()
+                elif msg_type == 'stats':
+                    if msg['skipped']:
+                        print(f"Skipped {msg['skipped']} already downloaded playlist entries")
+                    print(f"Extractor calls for {msg['url']}: {msg['extractor_calls']}")
+                    print(f"Metadata cache: {msg['metadata_cache']}")
+                    dedup = msg.get('dedup')
+                    if dedup and dedup['bytes_saved']:
+                        print(f"Reused {dedup['linked'] + dedup['manifest']} stored videos: "
+                              f"{dedup['bytes_saved'] / 1024 / 1024:.1f} MB and "
+                              f"{dedup['seconds_saved']:.0f}s of downloading saved")
+                elif msg_type == 'queue':
+                    for lane, lane_stats in msg['lanes'].items():
+                        if lane_stats['jobs']:
+                            print(f"{lane.capitalize()} jobs: {lane_stats['jobs']} started, "
+                                  f"waited {lane_stats['wait_mean']:.1f}s on average, "
+                                  f"{lane_stats['wait_max']:.1f}s at most")
+                elif msg_type == 'cancelled':
+                    self.status_label['text'] = msg
+                    self.download_btn['state'] = 'normal'
                 elif msg_type == 'complete':
                     self.status_label['text'] = msg
                     self.download_btn['state'] = 'normal'
@@ -677,18 +600,23 @@ class YouTubeDownloaderGUI:
         except:
             pass
         finally:
-            self.root.after(100, self.update_gui)
+            self.root.after(1000 // UI_FRAME_RATE, self.update_gui)
             
     def start_download(self):
-        self.download_btn['state'] = 'disabled'
-        self.progress_var.set(0)
+        if self.engine is None:
+            return
+        # More downloads can be queued while these run, whose progress stays
+        if not self.active_downloads:
+            self.progress_var.set(0)
+            self.estimate_label['text'] = ""
         self.status_label['text'] = "Starting download..."
-        threading.Thread(target=self.download_video, daemon=True).start()
-        self.update_gui()
+        options = self.get_download_options()
+        job_id = self.engine.job_store.add_job(options)
+        self.jobs.submit(job_id, options)
 
 def main():
     root = tk.Tk()
-    app = YouTubeDownloaderGUI(root)
+    app = YouTubeDownloaderGUI(root, report_startup='--startup-time' in sys.argv[1:])
     root.mainloop()
 
 if __name__ == "__main__":